@@ -0,0 +1,79 @@
+"""
+Compares pickling TelemetryData against the fixed layout record codec. To run:
+```
+python -m benchmarks.benchmark_telemetry_codec
+```
+"""
+
+import pickle
+import timeit
+
+from modules.telemetry import telemetry
+from modules.telemetry import telemetry_codec
+
+
+NUMBER_OF_RUNS = 100_000
+
+
+def read_fields(data: object) -> "tuple[object, ...]":
+    """
+    Reads the fields the command stage uses.
+    """
+    return data.x, data.y, data.z, data.yaw
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    data = telemetry.TelemetryData(
+        time_since_boot=123456,
+        x=1.0,
+        y=2.0,
+        z=3.0,
+        x_velocity=0.1,
+        y_velocity=0.2,
+        z_velocity=None,
+        roll=0.01,
+        pitch=0.02,
+        yaw=0.03,
+        roll_speed=None,
+        pitch_speed=None,
+        yaw_speed=0.5,
+    )
+    codec = telemetry_codec.TELEMETRY_DATA_CODEC
+
+    pickled = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    packed = codec.encode(data)
+    # What actually crosses the queue: the packed record is itself pickled by the queue
+    pickled_packed = pickle.dumps(packed, pickle.HIGHEST_PROTOCOL)
+
+    cases = {
+        "pickle.dumps(TelemetryData)": lambda: pickle.dumps(data, pickle.HIGHEST_PROTOCOL),
+        "pickle.loads(TelemetryData)": lambda: pickle.loads(pickled),
+        "codec.encode": lambda: codec.encode(data),
+        "codec.decode": lambda: codec.decode(packed),
+        "codec.view + 4 fields": lambda: read_fields(codec.view(packed)),
+        "pickle round trip of packed": lambda: pickle.loads(
+            pickle.dumps(codec.encode(data), pickle.HIGHEST_PROTOCOL)
+        ),
+        "pickle round trip of object": lambda: pickle.loads(
+            pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        ),
+    }
+
+    print(f"Pickled TelemetryData: {len(pickled)} bytes")
+    print(f"Packed record: {len(packed)} bytes ({len(pickled_packed)} bytes once pickled)")
+    for name, case in cases.items():
+        seconds = timeit.timeit(case, number=NUMBER_OF_RUNS)
+        print(f"{name:32} {seconds / NUMBER_OF_RUNS * 1e6:8.3f} us")
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
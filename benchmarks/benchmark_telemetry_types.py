@@ -0,0 +1,151 @@
+"""
+Compares memory use, construction, and pickling of TelemetryData and Position
+against the previous classes with a per instance dictionary. To run:
+```
+python -m benchmarks.benchmark_telemetry_types
+```
+"""
+
+import gc
+import pickle
+import timeit
+import tracemalloc
+
+from modules.command import command
+from modules.telemetry import telemetry
+
+
+NUMBER_OF_INSTANCES = 1_000_000
+NUMBER_OF_PICKLES = 100_000
+
+
+class DictTelemetryData:  # pylint: disable=too-many-instance-attributes
+    """
+    Previous TelemetryData: attributes in a per instance dictionary.
+    """
+
+    def __init__(
+        self,
+        time_since_boot: int | None = None,
+        x: float | None = None,
+        y: float | None = None,
+        z: float | None = None,
+        x_velocity: float | None = None,
+        y_velocity: float | None = None,
+        z_velocity: float | None = None,
+        roll: float | None = None,
+        pitch: float | None = None,
+        yaw: float | None = None,
+        roll_speed: float | None = None,
+        pitch_speed: float | None = None,
+        yaw_speed: float | None = None,
+    ) -> None:
+        self.time_since_boot = time_since_boot
+        self.x = x
+        self.y = y
+        self.z = z
+        self.x_velocity = x_velocity
+        self.y_velocity = y_velocity
+        self.z_velocity = z_velocity
+        self.roll = roll
+        self.pitch = pitch
+        self.yaw = yaw
+        self.roll_speed = roll_speed
+        self.pitch_speed = pitch_speed
+        self.yaw_speed = yaw_speed
+
+
+class DictPosition:
+    """
+    Previous Position: attributes in a per instance dictionary.
+    """
+
+    def __init__(self, x: float, y: float, z: float) -> None:
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def make_telemetry(telemetry_type: type) -> object:
+    """
+    Constructs a reading with keywords, the way Telemetry does.
+    """
+    return telemetry_type(
+        time_since_boot=123456,
+        x=1.0,
+        y=2.0,
+        z=3.0,
+        x_velocity=0.1,
+        y_velocity=0.2,
+        z_velocity=0.3,
+        roll=0.01,
+        pitch=0.02,
+        yaw=0.03,
+        roll_speed=0.4,
+        pitch_speed=0.5,
+        yaw_speed=0.6,
+    )
+
+
+def make_position(position_type: type) -> object:
+    """
+    Constructs a position positionally, the way Command does.
+    """
+    return position_type(1.0, 2.0, 3.0)
+
+
+def measure_memory(make: "(type) -> object", instance_type: type) -> float:  # type: ignore
+    """
+    Returns the bytes allocated per instance while holding NUMBER_OF_INSTANCES of them,
+    not counting the list holding them.
+    """
+    instances = [None] * NUMBER_OF_INSTANCES
+    gc.collect()
+    tracemalloc.start()
+    for i in range(NUMBER_OF_INSTANCES):
+        instances[i] = make(instance_type)
+
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del instances
+    return allocated / NUMBER_OF_INSTANCES
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    cases = {
+        "TelemetryData with __dict__": (make_telemetry, DictTelemetryData),
+        "TelemetryData with __slots__": (make_telemetry, telemetry.TelemetryData),
+        "Position with __dict__": (make_position, DictPosition),
+        "Position with __slots__": (make_position, command.Position),
+    }
+
+    print(f"{NUMBER_OF_INSTANCES} instances")
+    for name, (make, instance_type) in cases.items():
+        seconds = timeit.timeit(lambda m=make, t=instance_type: m(t), number=NUMBER_OF_INSTANCES)
+        size = measure_memory(make, instance_type)
+
+        instance = make(instance_type)
+        pickled = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+        round_trip_seconds = timeit.timeit(
+            lambda i=instance: pickle.loads(pickle.dumps(i, pickle.HIGHEST_PROTOCOL)),
+            number=NUMBER_OF_PICKLES,
+        )
+
+        print(
+            f"{name:30} construct {seconds:6.3f} s, {size:6.1f} bytes each, "
+            f"pickled {len(pickled):4} bytes, "
+            f"round trip {round_trip_seconds / NUMBER_OF_PICKLES * 1e6:6.3f} us"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
@@ -0,0 +1,71 @@
+"""
+Compares the per iteration overhead of checking exit and pause in a worker loop. To run:
+```
+python -m benchmarks.benchmark_worker_controller
+```
+"""
+
+import multiprocessing as mp
+import timeit
+
+from utilities.workers import worker_controller
+
+
+NUMBER_OF_RUNS = 100_000
+
+
+class QueueWorkerController:
+    """
+    Previous implementation: exit request in a queue, pause as a semaphore.
+    """
+
+    def __init__(self) -> None:
+        self.__pause = mp.BoundedSemaphore(1)
+        self.__exit_queue = mp.Queue(1)
+
+    def check_pause(self) -> None:
+        """
+        Semaphore acquire and release on every call.
+        """
+        self.__pause.acquire()
+        self.__pause.release()
+
+    def is_exit_requested(self) -> bool:
+        """
+        Queue size check on every call.
+        """
+        return not self.__exit_queue.empty()
+
+
+def loop_iteration(
+    controller: "QueueWorkerController | worker_controller.WorkerController",
+) -> None:
+    """
+    Checks a worker loop does on every iteration.
+    """
+    if not controller.is_exit_requested():
+        controller.check_pause()
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    controllers = {
+        "mp.Queue + BoundedSemaphore": QueueWorkerController(),
+        "shared memory flag word": worker_controller.WorkerController(),
+    }
+
+    for name, controller in controllers.items():
+        seconds = timeit.timeit(lambda c=controller: loop_iteration(c), number=NUMBER_OF_RUNS)
+        print(f"{name:32} {seconds / NUMBER_OF_RUNS * 1e9:8.1f} ns per iteration")
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
@@ -4,8 +4,6 @@ Bootcamp F2025
 Main process to setup and manage all the other working processes
 """
 
-import multiprocessing as mp
-import queue
 import time
 
 from pymavlink import mavutil
@@ -17,10 +15,23 @@ from modules.command import command
 from modules.command import command_worker
 from modules.heartbeat import heartbeat_receiver_worker
 from modules.heartbeat import heartbeat_sender_worker
+from modules.mavlink_router import mavlink_connection_handle
+from modules.mavlink_router import mavlink_router_worker
+from modules.telemetry import telemetry_codec
 from modules.telemetry import telemetry_worker
+from utilities.mavlink import link_stats
+from utilities.serialization import record_history
+from utilities.workers import batch_queue
+from utilities.workers import latest_value_mailbox
+from utilities.workers import notifying_queue
+from utilities.workers import overflow_queue
+from utilities.workers import periodic_scheduler
 from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_selector
 from utilities.workers import worker_controller
 from utilities.workers import worker_manager
+from utilities.workers import worker_shutdown
+from utilities.workers import worker_supervisor
 
 
 # MAVLink connection
@@ -33,6 +44,63 @@ CONNECTION_STRING = "tcp:localhost:12345"
 HEARTBEAT_QUEUE_MAXSIZE = 10
 TELEMETRY_QUEUE_MAXSIZE = 10
 COMMAND_QUEUE_MAXSIZE = 10
+MISSION_QUEUE_MAXSIZE = 2
+
+# Set queue backends (MANAGER, SHARED_MEMORY, or LATEST_VALUE)
+# LATEST_VALUE only keeps the newest telemetry, so the command worker never acts on stale samples
+HEARTBEAT_QUEUE_BACKEND = queue_proxy_wrapper.QueueBackend.MANAGER
+TELEMETRY_QUEUE_BACKEND = queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+COMMAND_QUEUE_BACKEND = queue_proxy_wrapper.QueueBackend.MANAGER
+
+# Set overflow policies (BLOCK, DROP_NEWEST, DROP_OLDEST, or SPILL_TO_DISK)
+# Anything but BLOCK never stalls the producer, so a slow main loop cannot stall the pipeline
+HEARTBEAT_QUEUE_OVERFLOW_POLICY = overflow_queue.OverflowPolicy.DROP_OLDEST
+TELEMETRY_QUEUE_OVERFLOW_POLICY = overflow_queue.OverflowPolicy.BLOCK
+COMMAND_QUEUE_OVERFLOW_POLICY = overflow_queue.OverflowPolicy.DROP_OLDEST
+
+# Record queue depth, blocking, and latency statistics, logged every QUEUE_STATS_PERIOD seconds
+INSTRUMENT_QUEUES = True
+QUEUE_STATS_PERIOD = 10  # seconds
+
+# Set batch sizes (<= 1 to move each item individually)
+# Larger batches move more items per queue round trip, but hold items back until the batch is full
+TELEMETRY_BATCH_SIZE = 1
+COMMAND_BATCH_SIZE = 1
+
+# Telemetry readings with attitude and position interpolated to the same time, this often
+# (<= 0 pairs the latest attitude and position as they arrive instead)
+TELEMETRY_OUTPUT_PERIOD = 100  # ms
+
+# Telemetry samples kept for queries after the command worker takes them
+TELEMETRY_HISTORY_CAPACITY = 4096
+
+# Time allowed for workers to exit before they are terminated
+SHUTDOWN_TIMEOUT = 2  # seconds
+
+# Crashed workers are restarted after a delay doubling with each crash, up to the maximum
+# Workers crashing more than CRASH_LOOP_LIMIT times within CRASH_LOOP_WINDOW are not restarted
+RESTART_INITIAL_BACKOFF = 0.1  # seconds
+RESTART_MAX_BACKOFF = 10  # seconds
+CRASH_LOOP_LIMIT = 5
+CRASH_LOOP_WINDOW = 60  # seconds
+
+# Router receive queues hold raw packets, sized for bursts of every message type
+ROUTER_QUEUE_MAXSIZE = 64
+
+# Time between heartbeats sent
+HEARTBEAT_PERIOD = 1  # seconds
+
+# Time between messages requested from the drone, by message ID
+MESSAGE_INTERVALS = {
+    mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE: 0.1,  # seconds
+    mavutil.mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED: 0.1,  # seconds
+}
+
+# Consecutive missed heartbeats before the drone is reported disconnected
+HEARTBEAT_DISCONNECT_THRESHOLD = 5
+
+# System ID of the drone, heartbeats of other systems do not make it connected
+VEHICLE_SYSTEM_ID = 1
 
 # Set worker counts
 HEARTBEAT_SENDER_COUNT = 1
@@ -67,13 +135,12 @@ def main() -> int:
     # Get Pylance to stop complaining
     assert main_logger is not None
 
-    # Create a connection to the drone. Assume that this is safe to pass around to all processes
-    # In reality, this will not work, but to simplify the bootamp, preetend it is allowed
+    # Only the MAVLink router process connects to the drone, at CONNECTION_STRING
+    # It waits for the "drone" to connect (first heartbeat) before sending anything from workers
+    # Other workers get a handle that sends and receives through the router
     # To test, you will run each of your workers individually to see if they work
     # (test "drones" are provided for you test your workers)
-    # NOTE: If you want to have type annotations for the connection, it is of type mavutil.mavfile
-    connection = mavutil.mavlink_connection(CONNECTION_STRING)
-    connection.wait_heartbeat(timeout=30)  # Wait for the "drone" to connect
+    # NOTE: Handles provide the parts of mavutil.mavfile that workers use (mav, recv_match, select and recv)
 
     # =============================================================================================
     #                          ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
@@ -82,24 +149,147 @@ def main() -> int:
     controller = worker_controller.WorkerController()
 
     # Create a multiprocess manager for synchronized queues
-    manager = mp.Manager()
+    # Manager also serves batch queues so that batches are a single round trip
+    manager = batch_queue.BatchQueueManager()
+    # Manager lives until main returns
+    manager.start()  # pylint: disable=consider-using-with
 
     # Create queues
+    # Queues that output to main ring its doorbell, so main waits on all of them at once
+    main_doorbell = notifying_queue.Doorbell()
     heartbeat_to_main_queue = queue_proxy_wrapper.QueueProxyWrapper(
-        manager, HEARTBEAT_QUEUE_MAXSIZE
+        manager,
+        HEARTBEAT_QUEUE_MAXSIZE,
+        HEARTBEAT_QUEUE_BACKEND,
+        INSTRUMENT_QUEUES,
+        HEARTBEAT_QUEUE_OVERFLOW_POLICY,
+        doorbell=main_doorbell,
     )
     telemetry_to_command_queue = queue_proxy_wrapper.QueueProxyWrapper(
-        manager, TELEMETRY_QUEUE_MAXSIZE
+        manager,
+        TELEMETRY_QUEUE_MAXSIZE,
+        TELEMETRY_QUEUE_BACKEND,
+        INSTRUMENT_QUEUES,
+        TELEMETRY_QUEUE_OVERFLOW_POLICY,
+        doorbell=main_doorbell,
+        # Main follows telemetry through the tap, the command worker takes every item
+        tap=True,
     )
-    command_to_main_queue = queue_proxy_wrapper.QueueProxyWrapper(manager, COMMAND_QUEUE_MAXSIZE)
+    command_to_main_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        manager,
+        COMMAND_QUEUE_MAXSIZE,
+        COMMAND_QUEUE_BACKEND,
+        INSTRUMENT_QUEUES,
+        COMMAND_QUEUE_OVERFLOW_POLICY,
+        doorbell=main_doorbell,
+    )
+
+    # Waypoint arrays replacing the command workers' mission, only the newest one waiting is flown
+    # Manager backend, since missions of thousands of waypoints do not fit a shared memory slot
+    mission_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        manager,
+        MISSION_QUEUE_MAXSIZE,
+        queue_proxy_wrapper.QueueBackend.MANAGER,
+        overflow_policy=overflow_queue.OverflowPolicy.DROP_OLDEST,
+    )
+
+    # Packet loss, message rates, and throughput of the link, recorded by the router
+    router_link_stats = link_stats.LinkStats()
+
+    # Current heartbeat state, read without taking items from the heartbeat queue
+    heartbeat_status = latest_value_mailbox.LatestValueMailbox()
+
+    # Telemetry kept after it leaves the queue, readable here and in the command workers
+    telemetry_history = record_history.RecordHistory(
+        telemetry_codec.TELEMETRY_DATA_CODEC.dtype, TELEMETRY_HISTORY_CAPACITY, "time_since_boot"
+    )
+
+    # Router queues: one send queue shared by all handles, one receive queue per subscribing handle
+    # Receive queues drop the oldest packet, so a slow worker never stalls the router
+    mavlink_send_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, ROUTER_QUEUE_MAXSIZE, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+    )
+    heartbeat_receive_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None,
+        ROUTER_QUEUE_MAXSIZE,
+        queue_proxy_wrapper.QueueBackend.SHARED_MEMORY,
+        overflow_policy=overflow_queue.OverflowPolicy.DROP_OLDEST,
+    )
+    telemetry_receive_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None,
+        ROUTER_QUEUE_MAXSIZE,
+        queue_proxy_wrapper.QueueBackend.SHARED_MEMORY,
+        overflow_policy=overflow_queue.OverflowPolicy.DROP_OLDEST,
+    )
+    command_receive_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None,
+        ROUTER_QUEUE_MAXSIZE,
+        queue_proxy_wrapper.QueueBackend.SHARED_MEMORY,
+        overflow_policy=overflow_queue.OverflowPolicy.DROP_OLDEST,
+    )
+
+    # Connection handles, each worker type only receives the messages it subscribes to
+    result, heartbeat_sender_connection = mavlink_connection_handle.MavlinkConnectionHandle.create(
+        mavlink_send_queue, None, []
+    )
+    if not result:
+        print("Failed to create connection handle for heartbeat sender worker")
+        return -1
+
+    result, heartbeat_receiver_connection = (
+        mavlink_connection_handle.MavlinkConnectionHandle.create(
+            mavlink_send_queue, heartbeat_receive_queue, ["HEARTBEAT"]
+        )
+    )
+    if not result:
+        print("Failed to create connection handle for heartbeat receiver worker")
+        return -1
+
+    result, telemetry_connection = mavlink_connection_handle.MavlinkConnectionHandle.create(
+        mavlink_send_queue, telemetry_receive_queue, ["ATTITUDE", "LOCAL_POSITION_NED"]
+    )
+    if not result:
+        print("Failed to create connection handle for telemetry worker")
+        return -1
+
+    # Command worker matches acknowledgements to the commands it sent
+    result, command_connection = mavlink_connection_handle.MavlinkConnectionHandle.create(
+        mavlink_send_queue, command_receive_queue, ["COMMAND_ACK"]
+    )
+    if not result:
+        print("Failed to create connection handle for command worker")
+        return -1
 
     # Create worker properties for each worker type (what inputs it takes, how many workers)
+    # MAVLink router
+    result, router_properties = worker_manager.WorkerProperties.create(
+        count=1,  # Only one process may own the connection
+        target=mavlink_router_worker.mavlink_router_worker,
+        work_arguments=(
+            CONNECTION_STRING,
+            [heartbeat_receiver_connection, telemetry_connection, command_connection],
+            router_link_stats,
+        ),
+        input_queues=[mavlink_send_queue],
+        output_queues=[],
+        controller=controller,
+        local_logger=main_logger,
+    )
+    if not result:
+        print("Failed to create arguments for MAVLink router worker")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert router_properties is not None
+
     # Heartbeat sender
     result, heartbeat_sender_properties = worker_manager.WorkerProperties.create(
         count=HEARTBEAT_SENDER_COUNT,  # How many workers
         target=heartbeat_sender_worker.heartbeat_sender_worker,  # What's the function that this worker runs
         work_arguments=(  # The function's arguments excluding input/output queues and controller
-            connection,
+            heartbeat_sender_connection,
+            HEARTBEAT_PERIOD,
+            MESSAGE_INTERVALS,
         ),
         input_queues=[],  # Note that input/output queues must be in the proper order
         output_queues=[],
@@ -115,7 +305,13 @@ def main() -> int:
     result, heartbeat_receiver_properties = worker_manager.WorkerProperties.create(
         count=HEARTBEAT_RECEIVER_COUNT,
         target=heartbeat_receiver_worker.heartbeat_receiver_worker,
-        work_arguments=(connection,),
+        work_arguments=(
+            heartbeat_receiver_connection,
+            HEARTBEAT_DISCONNECT_THRESHOLD,
+            VEHICLE_SYSTEM_ID,
+            QUEUE_STATS_PERIOD,
+            heartbeat_status,
+        ),
         input_queues=[],
         output_queues=[heartbeat_to_main_queue],
         controller=controller,
@@ -131,7 +327,7 @@ def main() -> int:
     result, telemetry_properties = worker_manager.WorkerProperties.create(
         count=TELEMETRY_COUNT,
         target=telemetry_worker.telemetry_worker,
-        work_arguments=(connection,),
+        work_arguments=(telemetry_connection, TELEMETRY_BATCH_SIZE, TELEMETRY_OUTPUT_PERIOD),
         input_queues=[],
         output_queues=[telemetry_to_command_queue],
         controller=controller,
@@ -147,10 +343,12 @@ def main() -> int:
         count=COMMAND_COUNT,
         target=command_worker.command_worker,
         work_arguments=(
-            connection,
+            command_connection,
             command.Position(0, 0, 0),  # Just a dummy position command to test with
+            COMMAND_BATCH_SIZE,
+            telemetry_history,
         ),
-        input_queues=[telemetry_to_command_queue],
+        input_queues=[telemetry_to_command_queue, mission_queue],
         output_queues=[command_to_main_queue],
         controller=controller,
         local_logger=main_logger,
@@ -159,6 +357,10 @@ def main() -> int:
     assert command_properties is not None
 
     # Create the workers (processes) and obtain their managers
+    result, router_manager = worker_manager.WorkerManager.create(
+        worker_properties=router_properties,
+        local_logger=main_logger,
+    )
     result, heartbeat_sender_manager = worker_manager.WorkerManager.create(
         worker_properties=heartbeat_sender_properties,
         local_logger=main_logger,
@@ -176,6 +378,7 @@ def main() -> int:
         local_logger=main_logger,
     )
     workers = [
+        router_manager,
         heartbeat_sender_manager,
         heartbeat_receiver_manager,
         telemetry_manager,
@@ -185,51 +388,140 @@ def main() -> int:
     for worker in workers:
         worker.start_workers()
 
+    # Restart crashed workers in the background
+    result, supervisor = worker_supervisor.WorkerSupervisor.create(
+        workers,
+        controller,
+        main_logger,
+        RESTART_INITIAL_BACKOFF,
+        RESTART_MAX_BACKOFF,
+        CRASH_LOOP_LIMIT,
+        CRASH_LOOP_WINDOW,
+    )
+    if not result:
+        print("Failed to create worker supervisor")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert supervisor is not None
+
+    supervisor.start()
+
     main_logger.info("Started")
 
-    # Main's work: read from all queues that output to main, and log any commands that we make
+    # Statistics are read from shared memory while the workers keep running
+    def log_stats() -> None:
+        _, status = heartbeat_status.peek()
+        main_logger.info(f"Heartbeat status: {status}")
+        main_logger.info(f"Link: {router_link_stats.snapshot()}")
+
+        if INSTRUMENT_QUEUES:
+            main_logger.info(f"Heartbeat queue: {heartbeat_to_main_queue.stats()}")
+            main_logger.info(f"Telemetry queue: {telemetry_to_command_queue.stats()}")
+            main_logger.info(f"Command queue: {command_to_main_queue.stats()}")
+
+        main_logger.info(
+            "Dropped items: "
+            f"heartbeat {heartbeat_to_main_queue.dropped_count()}, "
+            f"telemetry {telemetry_to_command_queue.dropped_count()}, "
+            f"command {command_to_main_queue.dropped_count()}"
+        )
+        for target_name, stats in supervisor.get_stats().items():
+            main_logger.info(f"Restarts of {target_name}: {stats}")
+
+        # Aggregates over the drone's last stats period, computed on the shared array
+        latest_time = telemetry_history.latest_key()
+        if latest_time is not None:
+            window_start = latest_time - QUEUE_STATS_PERIOD * 1000
+            main_logger.info(
+                f"Telemetry history: {len(telemetry_history)} samples, "
+                "mean velocity ("
+                f"{telemetry_history.mean('x_velocity', window_start, latest_time)}, "
+                f"{telemetry_history.mean('y_velocity', window_start, latest_time)}, "
+                f"{telemetry_history.mean('z_velocity', window_start, latest_time)}) m/s, "
+                f"yaw rate {telemetry_history.min('yaw_speed', window_start, latest_time)} to "
+                f"{telemetry_history.max('yaw_speed', window_start, latest_time)} rad/s"
+            )
+
+    # Periodic work of main runs between reading the queues, on deadlines that do not drift
+    scheduler = periodic_scheduler.PeriodicScheduler()
+    scheduler.add("stats", QUEUE_STATS_PERIOD, log_stats, QUEUE_STATS_PERIOD)
+
+    # Main's work: wake on whichever queue that outputs to main has items, and log them
+    # Telemetry is followed through its tap, so the command worker still gets every sample
+    def log_heartbeat(heartbeat_msg: object) -> None:
+        # Link summaries arrive together as a list, statuses alone
+        if isinstance(heartbeat_msg, list):
+            heartbeat_msg = "; ".join(str(summary) for summary in heartbeat_msg)
+
+        main_logger.info(f"Received heartbeat message: {heartbeat_msg}")
+
+    def log_telemetry(telemetry_msg: bytes) -> None:
+        main_logger.info(f"Received telemetry message: {telemetry_codec.unpack(telemetry_msg)}")
+
+    def log_command(command_msg: object) -> None:
+        main_logger.info(f"Received command message: {command_msg}")
+
+    selector = queue_selector.QueueSelector(main_doorbell)
+    selector.register(heartbeat_to_main_queue, log_heartbeat)
+    selector.register_tap(telemetry_to_command_queue, log_telemetry)
+    selector.register(command_to_main_queue, log_command)
+
     # Continue running for 100 seconds or until the drone disconnects
     start_time = time.time()
     controller_is_active = True
     while (time.time() - start_time < 100) and controller_is_active:
-        # Check heartbeat receiver queue
-        try:
-            heartbeat_msg = heartbeat_to_main_queue.get(timeout=0.1)
-            main_logger.info(f"Received heartbeat message: {heartbeat_msg}")
-        except queue.Empty:
-            continue
-
-        # Check telemetry queue
-        try:
-            telemetry_msg = telemetry_to_command_queue.get(timeout=0.1)
-            main_logger.info(f"Received telemetry message: {telemetry_msg}")
-        except queue.Empty:
-            continue
-
-        # Check command queue
-        try:
-            command_msg = command_to_main_queue.get(timeout=0.1)
-            main_logger.info(f"Received command message: {command_msg}")
-        except queue.Empty:
-            continue
+        scheduler.run_pending()
 
-    # Stop the processes
-    main_logger.info("Requested exit")
-    controller.request_exit()
-
-    # Fill and drain queues from END TO START
-    command_to_main_queue.fill_and_drain_queue()
-    telemetry_to_command_queue.fill_and_drain_queue()
+        # Wait for the next item or the next periodic task, whichever is first
+        timeout = 100 - (time.time() - start_time)
+        time_until_next = scheduler.time_until_next()
+        if time_until_next is not None:
+            timeout = min(timeout, time_until_next)
 
-    heartbeat_to_main_queue.fill_and_drain_queue()
-    main_logger.info("Queues cleared")
+        selector.select(max(timeout, 0.0))
 
-    # Clean up worker processes
-    for worker in workers:
-        worker.join()
+    # Stop the processes
+    # Workers acknowledge exit while queues are drained and refilled with sentinels,
+    # so no worker stays blocked on a queue and no fixed delays are needed
+    main_logger.info("Requested exit")
+    # Workers exiting on request must not be restarted
+    supervisor.stop()
+    result = worker_shutdown.shutdown_workers(
+        controller,
+        workers,
+        [
+            heartbeat_to_main_queue,
+            telemetry_to_command_queue,
+            command_to_main_queue,
+            mission_queue,
+            mavlink_send_queue,
+            heartbeat_receive_queue,
+            telemetry_receive_queue,
+            command_receive_queue,
+        ],
+        main_logger,
+        SHUTDOWN_TIMEOUT,
+    )
+    if not result:
+        main_logger.warning("Some workers had to be terminated")
 
     main_logger.info("Stopped")
 
+    # Shared memory queues are only released once no worker can use them
+    command_to_main_queue.close()
+    mission_queue.close()
+    telemetry_to_command_queue.close()
+    heartbeat_to_main_queue.close()
+    mavlink_send_queue.close()
+    heartbeat_receive_queue.close()
+    telemetry_receive_queue.close()
+    command_receive_queue.close()
+    heartbeat_status.close()
+    heartbeat_status.unlink()
+    telemetry_history.close()
+    telemetry_history.unlink()
+
     # We can reset controller in case we want to reuse it
     # Alternatively, create a new WorkerController instance
     controller.clear_exit()
@@ -15,8 +15,10 @@ from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
 from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_autoscaler
 from utilities.workers import worker_controller
 from utilities.workers import worker_manager
+from utilities.workers import worker_shutdown
 
 
 # Play with these numbers to see queue bottlenecks
@@ -25,9 +27,30 @@ ADD_RANDOM_TO_CONCATENATOR_QUEUE_MAX_SIZE = 5
 
 # Play with these numbers to see process bottlenecks
 COUNTUP_WORKER_COUNT = 2
-ADD_RANDOM_WORKER_COUNT = 2
+ADD_RANDOM_WORKER_COUNT = 1
 CONCATENATOR_WORKER_COUNT = 2
 
+# Worker counts of the consumers change within these bounds, depending on their input queues
+# Watch the log: Add Random is the bottleneck and scales up, Concatenator waits and scales down
+ADD_RANDOM_WORKER_COUNT_MIN = 1
+ADD_RANDOM_WORKER_COUNT_MAX = 4
+CONCATENATOR_WORKER_COUNT_MIN = 1
+CONCATENATOR_WORKER_COUNT_MAX = 4
+AUTOSCALE_PERIOD = 0.5  # seconds
+
+
+def run_autoscalers(
+    autoscalers: "list[worker_autoscaler.WorkerAutoscaler]", duration: float
+) -> None:
+    """
+    Runs the autoscalers every AUTOSCALE_PERIOD for the duration in seconds.
+    """
+    end_time = time.monotonic() + duration
+    while time.monotonic() < end_time:
+        time.sleep(min(AUTOSCALE_PERIOD, max(end_time - time.monotonic(), 0.0)))
+        for autoscaler in autoscalers:
+            autoscaler.run()
+
 
 # main() is required for early return
 def main() -> int:
@@ -64,13 +87,17 @@ def main() -> int:
 
     # Queue maxsize should always be >= the larger of producers/consumers count
     # Example: Producers 3, consumers 2, so queue maxsize minimum is 3
+    # Instrumented so that the autoscalers can see how deep the queues are and how long
+    # the consumers wait on them
     countup_to_add_random_queue = queue_proxy_wrapper.QueueProxyWrapper(
         mp_manager,
         COUNTUP_TO_ADD_RANDOM_QUEUE_MAX_SIZE,
+        instrument=True,
     )
     add_random_to_concatenator_queue = queue_proxy_wrapper.QueueProxyWrapper(
         mp_manager,
         ADD_RANDOM_TO_CONCATENATOR_QUEUE_MAX_SIZE,
+        instrument=True,
     )
 
     # Worker properties
@@ -181,8 +208,39 @@ def main() -> int:
 
     main_logger.info("Started", True)
 
+    # Consumer stages change their worker count while running
+    result, add_random_autoscaler = worker_autoscaler.WorkerAutoscaler.create(
+        add_random_manager,
+        countup_to_add_random_queue,
+        ADD_RANDOM_WORKER_COUNT_MIN,
+        ADD_RANDOM_WORKER_COUNT_MAX,
+        main_logger,
+    )
+    if not result:
+        print("Failed to create autoscaler for Add Random")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert add_random_autoscaler is not None
+
+    result, concatenator_autoscaler = worker_autoscaler.WorkerAutoscaler.create(
+        concatenator_manager,
+        add_random_to_concatenator_queue,
+        CONCATENATOR_WORKER_COUNT_MIN,
+        CONCATENATOR_WORKER_COUNT_MAX,
+        main_logger,
+    )
+    if not result:
+        print("Failed to create autoscaler for Concatenator")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert concatenator_autoscaler is not None
+
+    autoscalers = [add_random_autoscaler, concatenator_autoscaler]
+
     # Run for some time and then pause
-    time.sleep(2)
+    run_autoscalers(autoscalers, 4)
     controller.request_pause()
 
     main_logger.info("Paused", True)
@@ -191,22 +249,21 @@ def main() -> int:
     controller.request_resume()
     main_logger.info("Resumed", True)
 
-    time.sleep(2)
+    run_autoscalers(autoscalers, 4)
 
     # Stop the processes
-    controller.request_exit()
-
-    main_logger.info("Requested exit", True)
-
-    # Fill and drain queues from END TO START
-    countup_to_add_random_queue.fill_and_drain_queue()
-    add_random_to_concatenator_queue.fill_and_drain_queue()
-
-    main_logger.info("Queues cleared", True)
-
-    # Clean up worker processes
-    for manager in worker_managers:
-        manager.join_workers()
+    main_logger.info("Requesting exit", True)
+
+    # Queues are drained and filled with sentinels until every worker acknowledges exit,
+    # then workers are joined, terminating any that are stuck
+    result = worker_shutdown.shutdown_workers(
+        controller,
+        worker_managers,
+        [countup_to_add_random_queue, add_random_to_concatenator_queue],
+        main_logger,
+    )
+    if not result:
+        main_logger.warning("Some workers had to be terminated", True)
 
     main_logger.info("Stopped", True)
 
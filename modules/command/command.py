@@ -4,10 +4,15 @@ Decision-making logic.
 
 import math
 
+import numpy as np
 from pymavlink import mavutil
 
+from utilities.mavlink import command_tracker
+from utilities.mavlink import message_dispatcher
 from ..common.modules.logger import logger
+from ..mavlink_router import mavlink_connection_handle
 from ..telemetry import telemetry
+from ..telemetry import telemetry_batch
 
 
 class Position:
@@ -15,15 +20,37 @@ class Position:
     3D vector struct.
     """
 
+    # No per instance dictionary, one is created per command run
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, x: float, y: float, z: float) -> None:
         self.x = x
         self.y = y
         self.z = z
 
+    def __reduce__(self) -> "tuple[type, tuple[float, float, float]]":
+        """
+        Pickles as the constructor arguments, smaller and faster than the slot state.
+        """
+        return Position, (self.x, self.y, self.z)
+
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+# Largest altitude error in m and heading error in degrees left uncorrected
+ALTITUDE_TOLERANCE = 0.5
+YAW_TOLERANCE = 5
+
+# Wait in seconds for a COMMAND_ACK, growing by the backoff factor for each retry
+COMMAND_ACK_TIMEOUT = 1.0
+COMMAND_MAX_ATTEMPTS = 3
+COMMAND_BACKOFF = 2.0
+
+# Bound on how far the vectorized heading error can be from the exact one, in degrees
+VECTORIZED_YAW_ERROR = 1e-6
+
+
 class Command:  # pylint: disable=too-many-instance-attributes
     """
     Command class to make a decision based on recieved telemetry,
@@ -62,16 +89,58 @@ class Command:  # pylint: disable=too-many-instance-attributes
         self.local_logger = local_logger
         self.runcount = 0
         self.total_velocity = Position(0.0, 0.0, 0.0)
+        # Position and heading of the latest reading, retried turns are recomputed from it
+        self.__latest_pose: "tuple[float | None, float | None, float | None]" = (None, None, None)
+
+        # Commands are not sent again while a matching one waits for its COMMAND_ACK
+        self.__tracker = command_tracker.CommandTracker(
+            COMMAND_ACK_TIMEOUT, COMMAND_MAX_ATTEMPTS, COMMAND_BACKOFF
+        )
+        # Time the router received the packet being dispatched, None for a direct connection
+        self.__ack_receive_time: float | None = None
+        self.__dispatcher = message_dispatcher.MessageDispatcher()
+        self.__dispatcher.subscribe_decoded(
+            mavutil.mavlink.MAVLINK_MSG_ID_COMMAND_ACK,
+            lambda ack: self.__tracker.handle_ack(ack, self.__ack_receive_time),
+        )
+
+    def __update_in_flight(self) -> None:
+        """
+        Takes the acknowledgements received so far, then retries commands that timed out.
+        Through the router, latencies are to when each acknowledgement was received,
+        otherwise they are to the next run.
+        """
+        if isinstance(self.connection, mavlink_connection_handle.MavlinkConnectionHandle):
+            for receive_time, packet in self.connection.recv_timed():
+                self.__ack_receive_time = receive_time
+                self.__dispatcher.feed(packet)
+
+            self.__ack_receive_time = None
+        else:
+            while self.__dispatcher.receive(self.connection, 0.0) > 0:
+                pass
+
+        self.__tracker.check_timeouts()
+
+    def get_command_stats(self) -> "dict[int, command_tracker.CommandStats]":
+        """
+        Returns the acknowledgement statistics of each command ID sent.
+        """
+        return self.__tracker.get_stats()
 
     def run(self, telemetry_data: telemetry.TelemetryData) -> str:
         """
         Make a decision based on received telemetry data.
         """
+        self.__latest_pose = (telemetry_data.x, telemetry_data.y, telemetry_data.yaw)
+        self.__update_in_flight()
+
         # Log average velocity for this trip so far
+        # Missing velocities add nothing, so one gap does not spoil the whole average
         self.runcount += 1
-        self.total_velocity.x += telemetry_data.x_velocity
-        self.total_velocity.y += telemetry_data.y_velocity
-        self.total_velocity.z += telemetry_data.z_velocity
+        self.total_velocity.x += telemetry_data.x_velocity or 0.0
+        self.total_velocity.y += telemetry_data.y_velocity or 0.0
+        self.total_velocity.z += telemetry_data.z_velocity or 0.0
         average_velocity = Position(
             self.total_velocity.x / self.runcount,
             self.total_velocity.y / self.runcount,
@@ -83,12 +152,118 @@ class Command:  # pylint: disable=too-many-instance-attributes
 
         # Calculating vertical
         dz = self.target.z - telemetry_data.z
-        if abs(dz) > 0.5:
-            self.connection.mav.command_long_send(
+        if abs(dz) > ALTITUDE_TOLERANCE:
+            self.__send_change_altitude()
+            return f"CHANGE ALTITUDE: {dz}"
+
+        # Calculating yaw adjustment
+        delta_yaw = self.__delta_yaw(telemetry_data.x, telemetry_data.y, telemetry_data.yaw)
+        if abs(delta_yaw) > YAW_TOLERANCE:
+            self.__send_change_yaw(delta_yaw)
+            return f"CHANGE YAW: {delta_yaw}"
+        return None
+
+    def run_batch(
+        self, batch: telemetry_batch.TelemetryBatch, is_sending_commands: bool = True
+    ) -> "list[str | None]":
+        """
+        Same as calling run() on each reading of the batch in order, with the same decisions,
+        but evaluated across the whole batch at once.
+
+        is_sending_commands: Whether to send the commands decided on, False for replays.
+        """
+        count = len(batch)
+        if count == 0:
+            return []
+
+        latest = batch[count - 1]
+        self.__latest_pose = (latest.x, latest.y, latest.yaw)
+        self.__update_in_flight()
+
+        # Running average velocity, summed in the same order as run() so the totals are identical
+        # Missing velocities add nothing, like in run()
+        totals = [
+            np.cumsum(np.concatenate(([total], np.nan_to_num(velocities, nan=0.0))))[1:]
+            for total, velocities in (
+                (self.total_velocity.x, batch.x_velocity),
+                (self.total_velocity.y, batch.y_velocity),
+                (self.total_velocity.z, batch.z_velocity),
+            )
+        ]
+        self.runcount += count
+        self.total_velocity.x, self.total_velocity.y, self.total_velocity.z = (
+            total[-1].item() for total in totals
+        )
+        self.local_logger.info(
+            "Average velocity so far: ("
+            f"{self.total_velocity.x / self.runcount}, "
+            f"{self.total_velocity.y / self.runcount}, "
+            f"{self.total_velocity.z / self.runcount})"
+        )
+
+        # Calculating vertical
+        dz = self.target.z - batch.z
+        is_altitude_change = np.abs(dz) > ALTITUDE_TOLERANCE
+
+        # Calculating yaw adjustment
+        target_yaw_deg = np.degrees(np.arctan2(self.target.y - batch.y, self.target.x - batch.x))
+        delta_yaw = target_yaw_deg - np.degrees(batch.yaw)
+        delta_yaw = np.where(delta_yaw > 180, delta_yaw - 360, delta_yaw)
+        delta_yaw = np.where(delta_yaw < -180, delta_yaw + 360, delta_yaw)
+        # Vectorized atan2 can differ from math.atan2 in the last bits, so every yaw change
+        # and anything close to the tolerance is recomputed exactly like run()
+        is_yaw_candidate = ~is_altitude_change & (
+            np.abs(delta_yaw) > YAW_TOLERANCE - VECTORIZED_YAW_ERROR
+        )
+
+        decisions: "list[str | None]" = [None] * count
+        dz_values = dz.tolist()
+        for i in np.flatnonzero(is_altitude_change | is_yaw_candidate).tolist():
+            if is_altitude_change[i]:
+                decisions[i] = f"CHANGE ALTITUDE: {dz_values[i]}"
+                if is_sending_commands:
+                    self.__send_change_altitude()
+                continue
+
+            exact_delta_yaw = self.__delta_yaw(
+                batch.x[i].item(), batch.y[i].item(), batch.yaw[i].item()
+            )
+            if abs(exact_delta_yaw) > YAW_TOLERANCE:
+                decisions[i] = f"CHANGE YAW: {exact_delta_yaw}"
+                if is_sending_commands:
+                    self.__send_change_yaw(exact_delta_yaw)
+
+        return decisions
+
+    def __delta_yaw(self, x: float, y: float, yaw: float) -> float:
+        """
+        Returns the turn in degrees to face the target, in [-180, 180] .
+        """
+        target_yaw_rad = math.atan2(self.target.y - y, self.target.x - x)
+        target_yaw_deg = math.degrees(target_yaw_rad)
+        current_yaw_deg = math.degrees(yaw)
+        delta_yaw = target_yaw_deg - current_yaw_deg
+
+        if delta_yaw > 180:
+            delta_yaw -= 360
+        elif delta_yaw < -180:
+            delta_yaw += 360
+
+        return delta_yaw
+
+    def __send_change_altitude(self) -> None:
+        """
+        Sends the command to climb or descend to the target altitude,
+        unless the same command is waiting for its acknowledgement.
+        """
+        self.__tracker.send(
+            mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT,
+            (self.target.z,),
+            lambda confirmation: self.connection.mav.command_long_send(
                 1,
                 0,
                 mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT,
-                0,
+                confirmation,
                 1.0,
                 0,
                 0,
@@ -96,39 +271,40 @@ class Command:  # pylint: disable=too-many-instance-attributes
                 0,
                 0,
                 self.target.z,
-            )
-            return f"CHANGE ALTITUDE: {dz}"
-
-        # Calculating yaw adjustment
-        target_yaw_rad = math.atan2(
-            self.target.y - telemetry_data.y, self.target.x - telemetry_data.x
+            ),
         )
-        target_yaw_deg = math.degrees(target_yaw_rad)
-        current_yaw_deg = math.degrees(telemetry_data.yaw)
-        delta_yaw = target_yaw_deg - current_yaw_deg
 
-        if delta_yaw > 180:
-            delta_yaw -= 360
-        elif delta_yaw < -180:
-            delta_yaw += 360
+    def __send_change_yaw(self, delta_yaw: float) -> None:
+        """
+        Sends the command to turn by the relative angle in degrees,
+        unless a turn towards the target is waiting for its acknowledgement.
+        Retries turn by the heading error of the latest reading instead, since the first turn
+        may have been made with only its acknowledgement lost.
+        """
+
+        def send(confirmation: int) -> None:
+            turn = delta_yaw
+            x, y, yaw = self.__latest_pose
+            if confirmation > 0 and x is not None and y is not None and yaw is not None:
+                turn = self.__delta_yaw(x, y, yaw)
 
-        if abs(delta_yaw) > 5:
-            direction = 1 if delta_yaw > 0 else -1
             self.connection.mav.command_long_send(
                 1,
                 0,
                 mavutil.mavlink.MAV_CMD_CONDITION_YAW,
-                0,
-                abs(delta_yaw),
+                confirmation,
+                abs(turn),
                 5.0,
-                direction,
+                1 if turn > 0 else -1,
                 1,  # Relative angle
                 0,
                 0,
                 0,
             )
-            return f"CHANGE YAW: {delta_yaw}"
-        return None
+
+        self.__tracker.send(
+            mavutil.mavlink.MAV_CMD_CONDITION_YAW, (self.target.x, self.target.y), send
+        )
 
 
 # =================================================================================================
@@ -7,24 +7,42 @@ import pathlib
 
 from pymavlink import mavutil
 
+from utilities.serialization import record_history
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 from . import command
+from . import mission
 from ..common.modules.logger import logger
+from ..telemetry import telemetry_codec
 
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+# Distance from the current waypoint at which the next waypoint is already targeted
+MISSION_LOOKAHEAD = 5.0  # m
+
+
 def command_worker(
     connection: mavutil.mavfile,
     target: command.Position,
-    controller: worker_controller.WorkerController,
+    batch_size: int,
+    history: record_history.RecordHistory | None,
     input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    mission_queue: queue_proxy_wrapper.QueueProxyWrapper | None,
     output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
 ) -> None:
     """
     Defines the command worker
+
+    batch_size: Maximum number of samples taken from the input queue at once, 1 or less takes
+    each sample individually.
+    history: Shared history the packed telemetry samples are kept in once taken from the queue,
+    None to not keep them.
+    target: Position flown to until a mission is received, and after a mission is rejected.
+    mission_queue: Waypoint arrays of mission.WAYPOINT_DTYPE, each replacing the current mission,
+    None to only fly to the target.
     """
 
     # =============================================================================================
@@ -55,16 +73,96 @@ def command_worker(
         controller.request_exit()
         return
 
+    mission_object = None
+
     while not controller.is_exit_requested():
+        # Only the newest mission waiting is flown, without restarting the worker
+        waypoints = None
+        while mission_queue is not None:
+            try:
+                new_waypoints = mission_queue.queue.get_nowait()
+            except queue_proxy_wrapper.queue.Empty:
+                break
+
+            # Sentinels are ignored, the telemetry queue carries the exit request
+            if new_waypoints is not None:
+                waypoints = new_waypoints
+
+        if waypoints is not None:
+            result, new_mission = mission.Mission.create(waypoints, MISSION_LOOKAHEAD, local_logger)
+            if result:
+                mission_object = new_mission
+                local_logger.info(f"Flying new mission of {len(waypoints)} waypoints")
+            else:
+                mission_object = None
+                command_object.target = target
+                local_logger.error("Rejected new mission, flying to the fixed target")
+
         try:
-            telemetry_data = input_queue.queue.get(timeout=1)  # Adjust timeout as needed
-            c_output = command_object.run(telemetry_data)
-            if c_output:
-                output_queue.queue.put(c_output)
+            if input_queue.backend == queue_proxy_wrapper.QueueBackend.LATEST_VALUE:
+                # Only the freshest sample is used, anything older was overwritten
+                sequence, telemetry_data, overwritten = input_queue.queue.get_latest(timeout=1)
+                if overwritten > 0:
+                    local_logger.warning(
+                        f"Skipped {overwritten} stale telemetry samples before sample {sequence}"
+                    )
+                telemetry_samples = [telemetry_data]
+            elif batch_size > 1:
+                telemetry_samples = input_queue.get_many(batch_size, timeout=1)
+            else:
+                telemetry_samples = [input_queue.queue.get(timeout=1)]  # Adjust timeout as needed
 
         except queue_proxy_wrapper.queue.Empty:
             continue
 
+        # Exit on sentinel, after handling the samples before it
+        is_sentinel_received = None in telemetry_samples
+        if is_sentinel_received:
+            telemetry_samples = telemetry_samples[: telemetry_samples.index(None)]
+
+        if history is not None:
+            history.extend([telemetry_codec.pack(item) for item in telemetry_samples])
+
+        outputs = []
+        if len(telemetry_samples) > 1:
+            # Readings are evaluated together, packed or not
+            batch = telemetry_codec.unpack_batch(telemetry_samples)
+            if mission_object is not None:
+                # Every sample advances the mission, so a waypoint passed within the batch counts
+                # The whole batch is evaluated against the target after its latest sample
+                for reading in batch:
+                    command_object.target = mission_object.update(reading)
+
+            decisions = command_object.run_batch(batch)
+            outputs = [c_output for c_output in decisions if c_output]
+        else:
+            for telemetry_data in telemetry_samples:
+                # Fields are only unpacked when the command reads them
+                reading = telemetry_codec.unpack(telemetry_data)
+                if mission_object is not None:
+                    command_object.target = mission_object.update(reading)
+
+                c_output = command_object.run(reading)
+                if c_output:
+                    outputs.append(c_output)
+
+        if batch_size > 1:
+            output_queue.put_many(outputs)
+        else:
+            for c_output in outputs:
+                output_queue.queue.put(c_output)
+
+        if is_sentinel_received:
+            break
+
+    if mission_object is not None:
+        local_logger.info(
+            f"Reached {mission_object.get_index()} of {len(mission_object)} mission waypoints"
+        )
+
+    for command_id, stats in command_object.get_command_stats().items():
+        local_logger.info(f"{mavutil.mavlink.enums['MAV_CMD'][command_id].name}: {stats}")
+
 
 # =================================================================================================
 #                            ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
@@ -0,0 +1,152 @@
+"""
+Waypoint mission for the command stage.
+"""
+
+import numpy as np
+
+from . import command
+from ..common.modules.logger import logger
+from ..telemetry import telemetry
+
+
+# One waypoint, a mission is an array of these in flying order
+WAYPOINT_DTYPE = np.dtype(
+    [
+        ("x", np.float64),  # m
+        ("y", np.float64),  # m
+        ("z", np.float64),  # m
+        ("acceptance_radius", np.float64),  # m
+    ]
+)
+
+
+def make_waypoints(positions: "list[command.Position]", acceptance_radius: float) -> np.ndarray:
+    """
+    Returns the positions as a waypoint array with the same acceptance radius.
+    """
+    waypoints = np.empty(len(positions), WAYPOINT_DTYPE)
+    waypoints["x"] = [position.x for position in positions]
+    waypoints["y"] = [position.y for position in positions]
+    waypoints["z"] = [position.z for position in positions]
+    waypoints["acceptance_radius"] = acceptance_radius
+    return waypoints
+
+
+class Mission:
+    """
+    Ordered waypoints held as one array per field.
+
+    A waypoint is reached within its acceptance radius, then the next one becomes current.
+    Within the look ahead distance of the current waypoint, the target is already the next one,
+    so its yaw and altitude changes are issued before the current waypoint is reached.
+    After the last waypoint, the target stays on it.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        waypoints: np.ndarray,
+        lookahead: float,
+        local_logger: logger.Logger,
+    ) -> "tuple[bool, Mission | None]":
+        """
+        Creates a mission starting at the first waypoint.
+
+        waypoints: Array of WAYPOINT_DTYPE in flying order.
+        lookahead: Distance in m from the current waypoint at which to target the next one,
+            0 to only target the next one once the current one is reached.
+
+        Returns whether the mission was able to be created and the mission.
+        """
+        if not isinstance(waypoints, np.ndarray) or waypoints.dtype != WAYPOINT_DTYPE:
+            local_logger.error("Mission: Waypoints must be an array of WAYPOINT_DTYPE")
+            return False, None
+
+        if len(waypoints) == 0:
+            local_logger.error("Mission: No waypoints")
+            return False, None
+
+        if np.any(waypoints["acceptance_radius"] <= 0.0) or lookahead < 0.0:
+            local_logger.error(
+                "Mission: Acceptance radii must be positive, look ahead not negative"
+            )
+            return False, None
+
+        return True, Mission(cls.__create_key, waypoints, lookahead)
+
+    def __init__(
+        self, class_private_create_key: object, waypoints: np.ndarray, lookahead: float
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is Mission.__create_key, "Use create() method"
+
+        # Contiguous copies, so the caller's array can be reused
+        self.__x = np.ascontiguousarray(waypoints["x"])
+        self.__y = np.ascontiguousarray(waypoints["y"])
+        self.__z = np.ascontiguousarray(waypoints["z"])
+        self.__acceptance_radius = np.ascontiguousarray(waypoints["acceptance_radius"])
+        self.__lookahead = lookahead
+        self.__index = 0
+
+    def __len__(self) -> int:
+        return len(self.__x)
+
+    def __distance(self, index: int, x: float, y: float, z: float) -> float:
+        """
+        Returns the distance in m from the waypoint.
+        """
+        return float(
+            np.sqrt(
+                (self.__x[index] - x) ** 2 + (self.__y[index] - y) ** 2 + (self.__z[index] - z) ** 2
+            )
+        )
+
+    def __position(self, index: int) -> command.Position:
+        """
+        Returns the waypoint as a position.
+        """
+        return command.Position(
+            self.__x[index].item(), self.__y[index].item(), self.__z[index].item()
+        )
+
+    def get_index(self) -> int:
+        """
+        Returns the index of the current waypoint, the number of waypoints once complete.
+        """
+        return self.__index
+
+    def is_complete(self) -> bool:
+        """
+        Returns whether every waypoint was reached.
+        """
+        return self.__index >= len(self.__x)
+
+    def update(self, telemetry_data: telemetry.TelemetryData) -> command.Position:
+        """
+        Advances past every waypoint reached, then returns the position to steer to.
+        Without a position, returns the current waypoint without advancing.
+        """
+        x, y, z = telemetry_data.x, telemetry_data.y, telemetry_data.z
+        count = len(self.__x)
+        if x is None or y is None or z is None:
+            return self.__position(min(self.__index, count - 1))
+
+        distance = 0.0
+        while self.__index < count:
+            distance = self.__distance(self.__index, x, y, z)
+            if distance > self.__acceptance_radius[self.__index]:
+                break
+
+            self.__index += 1
+
+        if self.__index >= count:
+            return self.__position(count - 1)
+
+        if distance <= self.__lookahead and self.__index + 1 < count:
+            return self.__position(self.__index + 1)
+
+        return self.__position(self.__index)
@@ -0,0 +1,473 @@
+"""
+Mission upload and download over the MAVLink mission protocol.
+"""
+
+import collections
+import hashlib
+import os
+import pathlib
+import time
+
+import numpy as np
+from pymavlink import mavutil
+
+from utilities.mavlink import message_dispatcher
+from . import mission
+from ..common.modules.logger import logger
+
+
+# MISSION_ITEM_INT local positions are integers in 1e-4 m
+POSITION_SCALE = 1e4
+
+# Waypoints as sent in MISSION_ITEM_INT, so uploaded and downloaded missions hash the same
+ITEM_DTYPE = np.dtype(
+    [
+        ("x", np.int32),  # 1e-4 m
+        ("y", np.int32),  # 1e-4 m
+        ("z", np.float32),  # m
+        ("acceptance_radius", np.float32),  # m
+    ]
+)
+
+
+def encode(waypoints: np.ndarray) -> np.ndarray:
+    """
+    Returns the waypoints of mission.WAYPOINT_DTYPE as items of ITEM_DTYPE .
+    """
+    items = np.empty(len(waypoints), ITEM_DTYPE)
+    items["x"] = np.round(waypoints["x"] * POSITION_SCALE)
+    items["y"] = np.round(waypoints["y"] * POSITION_SCALE)
+    items["z"] = waypoints["z"]
+    items["acceptance_radius"] = waypoints["acceptance_radius"]
+    return items
+
+
+def decode(items: np.ndarray) -> np.ndarray:
+    """
+    Returns the items of ITEM_DTYPE as waypoints of mission.WAYPOINT_DTYPE .
+    """
+    waypoints = np.empty(len(items), mission.WAYPOINT_DTYPE)
+    waypoints["x"] = items["x"] / POSITION_SCALE
+    waypoints["y"] = items["y"] / POSITION_SCALE
+    waypoints["z"] = items["z"]
+    waypoints["acceptance_radius"] = items["acceptance_radius"]
+    return waypoints
+
+
+def mission_hash(items: np.ndarray) -> str:
+    """
+    Returns the content hash of the items of ITEM_DTYPE .
+    """
+    return hashlib.sha256(np.ascontiguousarray(items, ITEM_DTYPE).tobytes()).hexdigest()
+
+
+class MissionTransfer:  # pylint: disable=too-many-instance-attributes
+    """
+    Uploads and downloads missions of MAV_CMD_NAV_WAYPOINT items in MAV_FRAME_LOCAL_NED .
+
+    Downloads are driven by this side, so instead of one item per round trip, requests for
+    up to `window` items are outstanding at once. Only items that time out are requested again.
+
+    Uploads are driven by the vehicle, which requests each item in turn. PX4 and ArduPilot
+    reject items they did not request with MAV_MISSION_INVALID_SEQUENCE, so only the requested
+    item is sent, unless pipelined uploads are enabled for a vehicle that keeps items arriving
+    ahead of their request. Then the window of items after the requested one is sent as well.
+
+    Every mission transferred is kept in the cache directory under its content hash,
+    along with the hash of the mission last known to be on the vehicle.
+    Uploading that mission again is skipped.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        connection: mavutil.mavfile,
+        cache_directory: pathlib.Path,
+        window: int,
+        timeout: float,
+        max_retries: int,
+        local_logger: logger.Logger,
+        target_system: int = 1,
+        target_component: int = 0,
+        pipelined_upload: bool = False,
+    ) -> "tuple[bool, MissionTransfer | None]":
+        """
+        connection: Connection to the vehicle.
+        cache_directory: Directory of transferred missions, created if missing.
+        window: Maximum number of items in flight at once.
+        timeout: Time in seconds to wait for a reply before sending again.
+        max_retries: Consecutive timeouts before a transfer is given up.
+        pipelined_upload: Send items ahead of their request when uploading, only for vehicles
+        that accept unrequested items.
+
+        Returns whether the transfer was able to be created and the transfer.
+        """
+        if connection is None:
+            local_logger.error("Connection not provided")
+            return False, None
+
+        if window < 1 or timeout <= 0.0 or max_retries < 0:
+            local_logger.error("Mission transfer window and timeout must be positive")
+            return False, None
+
+        try:
+            cache_directory.mkdir(parents=True, exist_ok=True)
+        except OSError as exception:
+            local_logger.error(f"Could not create mission cache {cache_directory}: {exception}")
+            return False, None
+
+        return True, MissionTransfer(
+            cls.__create_key,
+            connection,
+            cache_directory,
+            window,
+            timeout,
+            max_retries,
+            local_logger,
+            target_system,
+            target_component,
+            pipelined_upload,
+        )
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        class_private_create_key: object,
+        connection: mavutil.mavfile,
+        cache_directory: pathlib.Path,
+        window: int,
+        timeout: float,
+        max_retries: int,
+        local_logger: logger.Logger,
+        target_system: int,
+        target_component: int,
+        pipelined_upload: bool,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is MissionTransfer.__create_key, "Use create() method"
+
+        self.__connection = connection
+        self.__cache_directory = cache_directory
+        self.__window = window
+        self.__timeout = timeout
+        self.__max_retries = max_retries
+        self.__logger = local_logger
+        self.__target_system = target_system
+        self.__target_component = target_component
+        # Items sent per request when uploading
+        self.__upload_window = window if pipelined_upload else 1
+
+        # Messages of the vehicle received but not yet handled by the transfer
+        self.__received: "collections.deque[mavutil.mavlink.MAVLink_message]" = collections.deque()
+        self.__dispatcher = message_dispatcher.MessageDispatcher()
+        for message_id in (
+            mavutil.mavlink.MAVLINK_MSG_ID_MISSION_COUNT,
+            mavutil.mavlink.MAVLINK_MSG_ID_MISSION_REQUEST,
+            mavutil.mavlink.MAVLINK_MSG_ID_MISSION_REQUEST_INT,
+            mavutil.mavlink.MAVLINK_MSG_ID_MISSION_ITEM_INT,
+            mavutil.mavlink.MAVLINK_MSG_ID_MISSION_ACK,
+        ):
+            self.__dispatcher.subscribe_decoded(message_id, self.__on_message)
+
+    def __on_message(self, message: mavutil.mavlink.MAVLink_message) -> None:
+        """
+        Keeps messages from the vehicle, addressed to anyone.
+        """
+        if message.get_srcSystem() == self.__target_system:
+            self.__received.append(message)
+
+    def __receive(self, deadline: float) -> None:
+        """
+        Waits until the deadline for messages, unless some are already received.
+        """
+        remaining = deadline - time.monotonic()
+        if len(self.__received) == 0 and remaining > 0.0:
+            self.__dispatcher.receive(self.__connection, remaining)
+
+    # Cache
+
+    def __mission_path(self, digest: str) -> pathlib.Path:
+        """
+        Returns the path of the cached items of the mission, stored as raw ITEM_DTYPE records.
+        """
+        return self.__cache_directory / f"{digest}.mission"
+
+    def __vehicle_hash_path(self) -> pathlib.Path:
+        """
+        Returns the path of the hash of the mission on the vehicle.
+        """
+        return self.__cache_directory / f"vehicle_{self.__target_system}_{self.__target_component}"
+
+    def __write(self, path: pathlib.Path, write: "(pathlib.Path) -> None") -> None:  # type: ignore
+        """
+        Replaces the file at once, so a failed write never leaves a partial file.
+        """
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        write(temporary_path)
+        os.replace(temporary_path, path)
+
+    def __remember(self, items: np.ndarray) -> str:
+        """
+        Caches the mission as the one on the vehicle.
+
+        Returns the hash of the mission.
+        """
+        digest = mission_hash(items)
+        try:
+            mission_path = self.__mission_path(digest)
+            if not mission_path.exists():
+                self.__write(mission_path, lambda path: path.write_bytes(items.tobytes()))
+
+            self.__write(self.__vehicle_hash_path(), lambda path: path.write_text(digest))
+        except OSError as exception:
+            self.__logger.warning(f"Could not cache mission {digest}: {exception}")
+
+        return digest
+
+    def get_vehicle_hash(self) -> "str | None":
+        """
+        Returns the hash of the mission last transferred to or from the vehicle,
+        None if there is none.
+        """
+        try:
+            return self.__vehicle_hash_path().read_text().strip()
+        except OSError:
+            return None
+
+    def load_cached(self, digest: str) -> "tuple[bool, np.ndarray | None]":
+        """
+        Returns whether the mission with the hash is cached and its waypoints.
+        """
+        try:
+            data = self.__mission_path(digest).read_bytes()
+        except OSError:
+            return False, None
+
+        if len(data) % ITEM_DTYPE.itemsize != 0:
+            self.__logger.warning(f"Cached mission {digest} is corrupt")
+            return False, None
+
+        return True, decode(np.frombuffer(data, ITEM_DTYPE))
+
+    # Upload
+
+    def __send_items(self, items: np.ndarray, requested: int, sent_times: np.ndarray) -> int:
+        """
+        Sends the requested item unless it was sent within half a timeout, so is still in flight.
+        With pipelined uploads, then sends the items of the window after it that were never sent.
+        Items after the requested one that were sent are assumed received.
+
+        Returns the number of items sent.
+        """
+        now = time.monotonic()
+        sent_count = 0
+        for seq in range(requested, min(requested + self.__upload_window, len(items))):
+            if seq == requested:
+                if now - sent_times[seq] < self.__timeout / 2:
+                    continue
+            elif sent_times[seq] > -np.inf:
+                continue
+
+            item = items[seq]
+            self.__connection.mav.mission_item_int_send(
+                self.__target_system,
+                self.__target_component,
+                seq,
+                mavutil.mavlink.MAV_FRAME_LOCAL_NED,
+                mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+                1 if seq == 0 else 0,  # Current
+                1,  # Autocontinue
+                0,  # Hold time
+                float(item["acceptance_radius"]),
+                0,  # Pass through the waypoint
+                0,  # Yaw
+                int(item["x"]),
+                int(item["y"]),
+                float(item["z"]),
+            )
+            sent_times[seq] = now
+            sent_count += 1
+
+        return sent_count
+
+    def upload(self, waypoints: np.ndarray, force: bool = False) -> bool:
+        """
+        Replaces the mission on the vehicle, unless the vehicle already has it.
+
+        waypoints: Array of mission.WAYPOINT_DTYPE in flying order.
+        force: Upload even if the cache says the vehicle has the mission.
+
+        Returns whether the vehicle has the mission.
+        """
+        items = encode(waypoints)
+        digest = mission_hash(items)
+        if not force and digest == self.get_vehicle_hash():
+            self.__logger.info(f"Vehicle already has mission {digest}, not uploading")
+            return True
+
+        count = len(items)
+        start_time = time.monotonic()
+        sent_times = np.full(count, -np.inf)
+        sent_count = 0
+        requested = None
+        retries = 0
+
+        self.__received.clear()
+        self.__connection.mav.mission_count_send(
+            self.__target_system, self.__target_component, count
+        )
+        deadline = time.monotonic() + self.__timeout
+        while True:
+            if time.monotonic() >= deadline:
+                if retries >= self.__max_retries:
+                    self.__logger.error(f"Mission upload timed out waiting for item {requested}")
+                    return False
+
+                retries += 1
+                if requested is None:
+                    self.__connection.mav.mission_count_send(
+                        self.__target_system, self.__target_component, count
+                    )
+                else:
+                    sent_count += self.__send_items(items, requested, sent_times)
+
+                deadline = time.monotonic() + self.__timeout
+
+            self.__receive(deadline)
+            while len(self.__received) > 0:
+                message = self.__received.popleft()
+                message_type = message.get_type()
+                if message_type in ("MISSION_REQUEST_INT", "MISSION_REQUEST"):
+                    if message.seq >= count:
+                        continue
+
+                    requested = message.seq
+                    retries = 0
+                    sent_count += self.__send_items(items, requested, sent_times)
+                    deadline = time.monotonic() + self.__timeout
+                elif message_type == "MISSION_ACK":
+                    if message.type != mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                        self.__logger.error(f"Vehicle rejected mission upload: {message.type}")
+                        return False
+
+                    # Acknowledgements of earlier transfers are ignored
+                    if np.all(sent_times > -np.inf):
+                        self.__logger.info(
+                            f"Uploaded mission {digest} of {count} items "
+                            f"in {time.monotonic() - start_time:.3f} s, "
+                            f"{sent_count - count} items sent again"
+                        )
+                        self.__remember(items)
+                        return True
+
+    # Download
+
+    def __request_item(self, seq: int) -> None:
+        """
+        Requests the item from the vehicle.
+        """
+        self.__connection.mav.mission_request_int_send(
+            self.__target_system, self.__target_component, seq
+        )
+
+    def __wait_for_count(self) -> "int | None":
+        """
+        Requests the mission size until the vehicle replies.
+
+        Returns the number of items, None if the vehicle does not reply.
+        """
+        for _ in range(self.__max_retries + 1):
+            self.__connection.mav.mission_request_list_send(
+                self.__target_system, self.__target_component
+            )
+            deadline = time.monotonic() + self.__timeout
+            while time.monotonic() < deadline:
+                self.__receive(deadline)
+                while len(self.__received) > 0:
+                    message = self.__received.popleft()
+                    if message.get_type() == "MISSION_COUNT":
+                        return message.count
+
+        return None
+
+    def download(self) -> "tuple[bool, np.ndarray | None]":
+        """
+        Reads the mission on the vehicle.
+
+        Returns whether the mission was able to be read and its waypoints.
+        """
+        start_time = time.monotonic()
+        self.__received.clear()
+        count = self.__wait_for_count()
+        if count is None:
+            self.__logger.error("Mission download timed out waiting for the mission size")
+            return False, None
+
+        items = np.zeros(count, ITEM_DTYPE)
+        is_received = np.zeros(count, np.bool_)
+        requested_times = np.full(count, -np.inf)
+        retries = np.zeros(count, np.int64)
+        # Requested but not yet received
+        outstanding: "set[int]" = set()
+        next_seq = 0
+        request_count = 0
+
+        while True:
+            # Slide the window over items never requested
+            while len(outstanding) < self.__window and next_seq < count:
+                self.__request_item(next_seq)
+                requested_times[next_seq] = time.monotonic()
+                outstanding.add(next_seq)
+                next_seq += 1
+                request_count += 1
+
+            if len(outstanding) == 0:
+                break
+
+            # Only the items that timed out are requested again
+            now = time.monotonic()
+            for seq in sorted(outstanding):
+                if now - requested_times[seq] < self.__timeout:
+                    continue
+
+                if retries[seq] >= self.__max_retries:
+                    self.__logger.error(f"Mission download timed out waiting for item {seq}")
+                    return False, None
+
+                retries[seq] += 1
+                self.__request_item(seq)
+                requested_times[seq] = now
+                request_count += 1
+
+            deadline = min(requested_times[seq] for seq in outstanding) + self.__timeout
+            self.__receive(deadline)
+            while len(self.__received) > 0:
+                message = self.__received.popleft()
+                if message.get_type() != "MISSION_ITEM_INT":
+                    continue
+
+                seq = message.seq
+                if seq >= count or is_received[seq]:
+                    continue
+
+                if message.command != mavutil.mavlink.MAV_CMD_NAV_WAYPOINT:
+                    self.__logger.warning(
+                        f"Mission item {seq} is not a waypoint: {message.command}"
+                    )
+
+                items[seq] = (message.x, message.y, message.z, message.param2)
+                is_received[seq] = True
+                outstanding.discard(seq)
+
+        self.__connection.mav.mission_ack_send(
+            self.__target_system, self.__target_component, mavutil.mavlink.MAV_MISSION_ACCEPTED
+        )
+        digest = self.__remember(items)
+        self.__logger.info(
+            f"Downloaded mission {digest} of {count} items "
+            f"in {time.monotonic() - start_time:.3f} s, {request_count - count} items requested again"
+        )
+        return True, decode(items)
@@ -2,17 +2,166 @@
 Heartbeat receiving logic.
 """
 
+import math
+import time
+
 from pymavlink import mavutil
 
+from utilities.mavlink import liveness_tracker
+from utilities.mavlink import message_dispatcher
 from ..common.modules.logger.logger import Logger  # pylint: disable=unused-import, no-name-in-module
 
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
-class HeartbeatReceiver:
+# Time between heartbeats of the drone
+HEARTBEAT_PERIOD = 1.0  # seconds
+# Most systems listed in a HeartbeatStatus, the rest are only counted, so its size stays bounded
+STATUS_SYSTEM_LIMIT = 16
+
+
+class LinkSummary:  # pylint: disable=too-many-instance-attributes
+    """
+    Heartbeat arrival statistics of one system over a summary period.
+    """
+
+    def __init__(
+        self,
+        system: int,
+        component: int,
+        interval_count: int,
+        min_interval: float,  # s
+        mean_interval: float,  # s
+        max_interval: float,  # s
+        jitter: float,  # s
+        missed_count: int,
+    ) -> None:
+        self.system = system
+        self.component = component
+        self.interval_count = interval_count
+        self.min_interval = min_interval
+        self.mean_interval = mean_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.missed_count = missed_count
+
+    @property
+    def loss_rate(self) -> float:
+        """
+        Fraction of heartbeats expected in the period that were missed.
+        """
+        expected_count = self.interval_count + self.missed_count
+        return self.missed_count / expected_count if expected_count > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"system {self.system} component {self.component}: "
+            f"{self.interval_count} intervals, "
+            f"min {self.min_interval:.3f} s mean {self.mean_interval:.3f} s "
+            f"max {self.max_interval:.3f} s, jitter {self.jitter * 1000:.1f} ms, "
+            f"{self.missed_count} missed ({self.loss_rate:.1%} loss)"
+        )
+
+    def __repr__(self) -> str:
+        # Readable inside the list of summaries put in the queue
+        return str(self)
+
+
+class HeartbeatStatus:
+    """
+    Connection state published by the heartbeat receiver worker.
+
+    Bounded in size whatever the number of systems: lists at most STATUS_SYSTEM_LIMIT of the
+    connected systems, and counts the rest. Link summaries go through the queue instead.
+    """
+
+    def __init__(
+        self,
+        is_connected: bool,
+        connected: "list[tuple[int, int]]",
+        summaries: "list[LinkSummary]",
+    ) -> None:
+        """
+        connected: (system ID, component ID) of every connected system.
+        summaries: Link summaries of the last period, only their missed heartbeats are kept.
+        """
+        self.is_connected = is_connected
+        self.connected_count = len(connected)
+        self.connected = sorted(connected)[:STATUS_SYSTEM_LIMIT]
+        self.missed_count = sum(summary.missed_count for summary in summaries)
+
+    def truncate(self) -> None:
+        """
+        Drops the list of systems, keeping the counts.
+        """
+        self.connected = []
+
+    def __str__(self) -> str:
+        listed = ", ".join(f"{system}/{component}" for system, component in self.connected)
+        hidden_count = self.connected_count - len(self.connected)
+        if hidden_count > 0:
+            listed += f" and {hidden_count} more"
+
+        return (
+            f"{'connected' if self.is_connected else 'disconnected'}, "
+            f"{self.connected_count} systems ({listed}), "
+            f"{self.missed_count} heartbeats missed last period"
+        )
+
+
+class LinkAccumulator:
+    """
+    Running heartbeat interval sums of one system since the last summary.
     """
-    HeartbeatReceiver class to send a heartbeat
+
+    __slots__ = ("count", "total", "total_squared", "minimum", "maximum", "missed_count")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0  # s
+        self.total_squared = 0.0  # s^2
+        self.minimum = math.inf  # s
+        self.maximum = 0.0  # s
+        self.missed_count = 0
+
+    def add(self, interval: float) -> None:
+        """
+        Adds the time since the previous heartbeat.
+        """
+        self.count += 1
+        self.total += interval
+        self.total_squared += interval * interval
+        self.minimum = min(self.minimum, interval)
+        self.maximum = max(self.maximum, interval)
+        # Heartbeats that should have arrived in the gap
+        self.missed_count += max(round(interval / HEARTBEAT_PERIOD) - 1, 0)
+
+    def summarize(self, system: int, component: int) -> LinkSummary:
+        """
+        Returns the statistics of the intervals added.
+        """
+        if self.count == 0:
+            return LinkSummary(system, component, 0, 0.0, 0.0, 0.0, 0.0, self.missed_count)
+
+        mean = self.total / self.count
+        variance = max(self.total_squared / self.count - mean * mean, 0.0)
+        return LinkSummary(
+            system,
+            component,
+            self.count,
+            self.minimum,
+            mean,
+            self.maximum,
+            math.sqrt(variance),
+            self.missed_count,
+        )
+
+
+class HeartbeatReceiver:  # pylint: disable=too-many-instance-attributes
+    """
+    HeartbeatReceiver class to track the heartbeats of every system on the connection.
+    Only the heartbeats of the vehicle decide whether it is connected.
     """
 
     __private_key = object()
@@ -22,37 +171,113 @@ class HeartbeatReceiver:
         cls,
         connection: mavutil.mavfile,
         threshold: int,
+        vehicle_system: int = 1,
     ) -> tuple[bool, "HeartbeatReceiver | None"]:
         """
         Factory method to create a HeartbeatReceiver instance.
+
+        threshold: Heartbeat periods without a heartbeat before a system is disconnected.
+        vehicle_system: System ID of the drone, other systems are only tracked for reporting.
         """
 
-        return True, cls(cls.__private_key, threshold, connection)
+        return True, cls(cls.__private_key, threshold, connection, vehicle_system)
 
     def __init__(
         self,
         key: object,
         threshold: int,
         connection: mavutil.mavfile,
+        vehicle_system: int,
     ) -> None:
         assert key is HeartbeatReceiver.__private_key, "Use create() method"
-        self.__threshold = threshold
         self.__connection = connection
-        self.missed_heartbeats = 0
+        self.__vehicle_system = vehicle_system
+
+        # Systems are disconnected by the deadline after their last heartbeat,
+        # however often run() is called
+        self.__tracker = liveness_tracker.LivenessTracker(threshold * HEARTBEAT_PERIOD)
+        # Before the first heartbeat, the drone has as long as it would after one
+        self.__first_deadline = time.monotonic() + threshold * HEARTBEAT_PERIOD
+        self.__lost: "list[tuple[int, int]]" = []
+        self.__accumulators: "dict[tuple[int, int], LinkAccumulator]" = {}
+
+        # Only the header of heartbeats is read, so they are not decoded and others are skipped
+        self.__heartbeat_count = 0
+        self.__dispatcher = message_dispatcher.MessageDispatcher()
+        self.__dispatcher.subscribe(mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT, self.__on_heartbeat)
+
+    def __on_heartbeat(self, packet: bytes) -> None:
+        """
+        Records the heartbeat of the system and component in the header.
+        """
+        if packet[0] == message_dispatcher.MAVLINK_V2_MARKER:
+            key = (packet[5], packet[6])
+        else:
+            key = (packet[3], packet[4])
+
+        previous_time = self.__tracker.last_seen(*key)
+        self.__tracker.record(*key)
+        self.__heartbeat_count += 1
+
+        accumulator = self.__accumulators.get(key)
+        if accumulator is None:
+            accumulator = LinkAccumulator()
+            self.__accumulators[key] = accumulator
+
+        # The first heartbeat after a disconnection starts a new series of intervals
+        if previous_time is not None:
+            accumulator.add(self.__tracker.last_seen(*key) - previous_time)
 
     def run(self) -> bool:
         """
-        Run the heartbeat receiver logic.
+        Waits for a heartbeat, the next disconnection deadline, or a heartbeat period,
+        whichever is first.
+
+        Returns whether the vehicle is connected.
+        """
+        self.__heartbeat_count = 0
+        deadline = time.monotonic() + HEARTBEAT_PERIOD
+        next_deadline = self.__tracker.next_deadline()
+        if next_deadline is not None:
+            deadline = min(deadline, next_deadline)
+
+        while self.__heartbeat_count == 0 and time.monotonic() < deadline:
+            self.__dispatcher.receive(self.__connection, deadline - time.monotonic())
+
+        self.__lost = self.__tracker.expire()
+        # Any component of the vehicle, such as the autopilot or a companion computer
+        is_vehicle_alive = any(
+            system == self.__vehicle_system for system, _ in self.__tracker.get_alive()
+        )
+        if not is_vehicle_alive and self.__first_deadline is not None:
+            return time.monotonic() < self.__first_deadline
+
+        self.__first_deadline = None
+        return is_vehicle_alive
+
+    def get_connected(self) -> "list[tuple[int, int]]":
+        """
+        Returns the (system ID, component ID) of each connected system.
+        """
+        return self.__tracker.get_alive()
+
+    def get_lost(self) -> "list[tuple[int, int]]":
+        """
+        Returns the (system ID, component ID) of each system disconnected by the last run().
         """
-        msg = self.__connection.recv_match(type="HEARTBEAT", blocking=True, timeout=1.0)
-        if msg is None:
-            self.missed_heartbeats += 1
-            if self.missed_heartbeats >= self.__threshold:
-                return False
-            return True
+        return self.__lost
 
-        self.missed_heartbeats = 0
-        return True
+    def get_link_summaries(self) -> "list[LinkSummary]":
+        """
+        Returns the heartbeat statistics of each system since the previous call,
+        then starts over.
+        """
+        summaries = [
+            accumulator.summarize(system, component)
+            for (system, component), accumulator in self.__accumulators.items()
+        ]
+        self.__accumulators = {}
+        return summaries
 
 
 # =================================================================================================
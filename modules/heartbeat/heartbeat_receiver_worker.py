@@ -7,6 +7,8 @@ import pathlib
 
 from pymavlink import mavutil
 
+from utilities.workers import latest_value_mailbox
+from utilities.workers import periodic_scheduler
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 from . import heartbeat_receiver
@@ -18,12 +20,23 @@ from ..common.modules.logger import logger
 # =================================================================================================
 def heartbeat_receiver_worker(
     connection: mavutil.mavfile,
-    controller: worker_controller.WorkerController,
-    queue_wrapper: queue_proxy_wrapper.QueueProxyWrapper,
     threshold: int,
+    vehicle_system: int,
+    summary_period: float,
+    status: latest_value_mailbox.LatestValueMailbox | None,
+    queue_wrapper: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
 ) -> None:
     """
-    Worker function that receives heartbeats from the drone and puts the connection status in a queue.
+    Worker function that receives heartbeats from the drone. Puts the connection status in a queue
+    when it changes, and the heartbeat statistics of each system every summary period.
+
+    Arguments are in the order WorkerProperties passes them: work arguments, output queue, controller.
+
+    vehicle_system: System ID of the drone, heartbeats of other systems are only reported.
+    summary_period: Time in seconds between link summaries.
+    status: Slot overwritten with the current heartbeat_receiver.HeartbeatStatus , for reading
+    with peek() instead of waiting for the queue, None to not publish it.
     """
 
     # =============================================================================================
@@ -50,6 +63,7 @@ def heartbeat_receiver_worker(
     result, receiver = heartbeat_receiver.HeartbeatReceiver.create(
         connection,
         threshold,
+        vehicle_system,
     )
 
     if not result:
@@ -59,19 +73,47 @@ def heartbeat_receiver_worker(
     local_logger.info("HeartbeatReceiver object created successfully")
     # Main loop: do work.
 
-    num_missed_consec = 0
+    summaries = []
+
+    def publish_summaries() -> None:
+        nonlocal summaries
+        summaries = receiver.get_link_summaries()
+        queue_wrapper.queue.put(summaries)
+        for summary in summaries:
+            local_logger.info(f"Heartbeats of {summary}")
+
+    scheduler = periodic_scheduler.PeriodicScheduler()
+    scheduler.add("summary", summary_period, publish_summaries, summary_period)
+
+    # Only transitions are put in the queue, starting with the first state
+    was_connected = None
     while controller.is_exit_requested() is False:
         is_connected = receiver.run()
-        queue_wrapper.queue.put(is_connected)
-
-        if is_connected:
-            local_logger.info("Heartbeat received")
-            num_missed_consec = 0
-        else:
-            num_missed_consec += 1
-            local_logger.error(
-                f"Connection Lost! Consecutive missed heartbeats: {num_missed_consec}"
+        for system, component in receiver.get_lost():
+            local_logger.warning(f"No heartbeat from system {system} component {component}")
+
+        if is_connected != was_connected:
+            queue_wrapper.queue.put(is_connected)
+            if is_connected:
+                local_logger.info("Connected")
+            else:
+                local_logger.error("Connection Lost!")
+
+            was_connected = is_connected
+
+        scheduler.run_pending()
+
+        if status is not None:
+            current = heartbeat_receiver.HeartbeatStatus(
+                is_connected, receiver.get_connected(), summaries
             )
+            try:
+                status.put(current)
+            except ValueError as exception:
+                # Slot configured too small even for the bounded list, keep the counts
+                local_logger.error(f"Heartbeat status truncated: {exception}")
+                current.truncate()
+                status.put(current)
 
 
 # =================================================================================================
@@ -4,10 +4,10 @@ Heartbeat worker that sends heartbeats periodically.
 
 import os
 import pathlib
-import time
 
 from pymavlink import mavutil
 
+from utilities.workers import periodic_scheduler
 from utilities.workers import worker_controller
 from . import heartbeat_sender
 from ..common.modules.logger import logger
@@ -16,13 +16,24 @@ from ..common.modules.logger import logger
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+# Message rates are requested again this often, in case the drone restarted
+RATE_REQUEST_PERIOD = 10  # seconds
+# Job timing statistics are logged this often
+STATS_PERIOD = 60  # seconds
+
+
 def heartbeat_sender_worker(
     connection: mavutil.mavfile,
-    # Add other necessary worker arguments here
-    controller: worker_controller,
+    period: float,
+    message_intervals: "dict[int, float]",
+    controller: worker_controller.WorkerController,
 ) -> None:
     """
-    Heartbeat sender worker function that sends heartbeats periodically.
+    Heartbeat sender worker function that sends heartbeats periodically,
+    along with the other periodic tasks of the link.
+
+    period: Time in seconds between heartbeats.
+    message_intervals: Message ID to the time in seconds between messages to request from the drone.
     """
     # =============================================================================================
     #                          ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
@@ -53,12 +64,40 @@ def heartbeat_sender_worker(
 
     local_logger.info("HeartbeatSender connection established")
 
-    # Main loop: do work.
-    if result is True:
-        while not controller.is_exit_requested():
-            sender.run()
-            local_logger.info("Heartbeat Sent")
-            time.sleep(1)
+    def send_heartbeat() -> None:
+        sender.run()
+        local_logger.info("Heartbeat Sent")
+
+    def request_message_intervals() -> None:
+        for message_id, interval in message_intervals.items():
+            connection.mav.command_long_send(
+                1,
+                0,
+                mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL,
+                0,
+                message_id,
+                interval * 1e6,  # us
+                0,
+                0,
+                0,
+                0,
+                0,
+            )
+
+    def log_stats() -> None:
+        for name, stats in scheduler.get_stats().items():
+            local_logger.info(f"Job {name}: {stats}")
+
+    # Deadlines are kept on the monotonic clock, so send time and logging do not add up as drift
+    scheduler = periodic_scheduler.PeriodicScheduler()
+    scheduler.add("heartbeat", period, send_heartbeat)
+    if len(message_intervals) > 0:
+        scheduler.add("rate_request", RATE_REQUEST_PERIOD, request_message_intervals)
+    scheduler.add("stats", STATS_PERIOD, log_stats, STATS_PERIOD)
+
+    # Wakes up as soon as exit is requested
+    scheduler.run(controller.wait_for_exit_request)
+    log_stats()
 
 
 # =================================================================================================
@@ -0,0 +1,249 @@
+"""
+Worker side of the MAVLink router.
+"""
+
+import queue
+import time
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_proxy_wrapper
+
+
+# MAVLink message name to message ID, such as "HEARTBEAT" to 0
+MESSAGE_IDS = {
+    message_class.msgname: message_id
+    for message_id, message_class in mavutil.mavlink.mavlink_map.items()
+}
+
+
+class QueueWriter:
+    """
+    File-like object that puts each written MAVLink packet into a queue.
+    """
+
+    def __init__(self, send_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        self.__send_queue = send_queue
+
+    def write(self, buffer: bytes) -> None:
+        """
+        Sends the packet through the router.
+        """
+        self.__send_queue.queue.put(bytes(buffer))
+
+
+class MavlinkConnectionHandle:  # pylint: disable=too-many-instance-attributes
+    """
+    Lightweight stand in for `mavutil.mavfile` passed to workers instead of the connection.
+    The router process owns the connection.
+
+    Provides the part of `mavfile` that workers use: `mav` for sending, and `recv_match()`
+    or `select()` and `recv()` for receiving. Received messages only come from this handle's
+    own queue, so a worker never takes messages meant for another worker. The queue holds
+    (receive time, packet) pairs, `recv_timed()` keeps the time the router received each packet. The handle can be
+    pickled and sent to a worker process, `mav` is created in the process that first uses it.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        receive_queue: "queue_proxy_wrapper.QueueProxyWrapper | None",
+        message_types: "list[str]",
+        source_system: int = 255,
+        source_component: int = 0,
+    ) -> "tuple[bool, MavlinkConnectionHandle | None]":
+        """
+        Creates a connection handle, pass it to the router to subscribe it.
+
+        send_queue: Queue of packets to the router, shared by all handles.
+        receive_queue: Queue of packets from the router, one per handle, None to only send.
+        message_types: MAVLink message names to receive, such as "HEARTBEAT" .
+        source_system: System ID of sent messages.
+        source_component: Component ID of sent messages.
+
+        Returns whether the handle was able to be created and the handle.
+        """
+        if receive_queue is None and len(message_types) > 0:
+            return False, None
+
+        message_ids = []
+        for message_type in message_types:
+            if message_type not in MESSAGE_IDS:
+                return False, None
+
+            message_ids.append(MESSAGE_IDS[message_type])
+
+        return True, MavlinkConnectionHandle(
+            cls.__create_key,
+            send_queue,
+            receive_queue,
+            message_ids,
+            source_system,
+            source_component,
+        )
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        receive_queue: "queue_proxy_wrapper.QueueProxyWrapper | None",
+        message_ids: "list[int]",
+        source_system: int,
+        source_component: int,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert (
+            class_private_create_key is MavlinkConnectionHandle.__create_key
+        ), "Use create() method"
+
+        self.__send_queue = send_queue
+        self.__receive_queue = receive_queue
+        self.__message_ids = message_ids
+        self.__source_system = source_system
+        self.__source_component = source_component
+
+        # Created on first use in the process using the handle
+        self.__mav = None
+        self.__parser = None
+
+        # Receive time and packet taken from the queue by select() and not yet returned by recv()
+        self.__selected_packet: "tuple[float, bytes] | None" = None
+
+    def __getstate__(self) -> dict:
+        """
+        Sends the queues and settings to another process, not the MAVLink objects.
+        """
+        state = self.__dict__.copy()
+        state["_MavlinkConnectionHandle__mav"] = None
+        state["_MavlinkConnectionHandle__parser"] = None
+        state["_MavlinkConnectionHandle__selected_packet"] = None
+        return state
+
+    @property
+    def mav(self) -> mavutil.mavlink.MAVLink:
+        """
+        MAVLink encoder whose sends go through the router.
+        """
+        if self.__mav is None:
+            self.__mav = mavutil.mavlink.MAVLink(
+                QueueWriter(self.__send_queue), self.__source_system, self.__source_component
+            )
+
+        return self.__mav
+
+    def get_message_ids(self) -> "list[int]":
+        """
+        Returns the IDs of the messages routed to this handle.
+        """
+        return self.__message_ids
+
+    def get_receive_queue(self) -> "queue_proxy_wrapper.QueueProxyWrapper | None":
+        """
+        Returns the queue of packets routed to this handle.
+        """
+        return self.__receive_queue
+
+    def select(self, timeout: float) -> bool:
+        """
+        Waits for up to timeout seconds for a packet, same as `mavfile.select()` .
+        """
+        assert self.__receive_queue is not None, "Handle was created without a receive queue"
+
+        if self.__selected_packet is not None:
+            return True
+
+        try:
+            item = self.__receive_queue.queue.get(True, timeout)
+        except queue.Empty:
+            return False
+
+        # Sentinel during shutdown
+        if item is None:
+            return False
+
+        self.__selected_packet = item
+        return True
+
+    def recv_timed(self) -> "list[tuple[float, bytes]]":
+        """
+        Returns every packet available without waiting, each with the time in seconds
+        (`time.monotonic()`) the router received it.
+        """
+        assert self.__receive_queue is not None, "Handle was created without a receive queue"
+
+        items = []
+        if self.__selected_packet is not None:
+            items.append(self.__selected_packet)
+            self.__selected_packet = None
+
+        try:
+            while True:
+                item = self.__receive_queue.queue.get_nowait()
+                if item is None:
+                    break
+
+                items.append(item)
+        except queue.Empty:
+            pass
+
+        return items
+
+    def recv(self, n: "int | None" = None) -> bytes:
+        """
+        Returns every packet available without waiting, concatenated like a byte stream.
+
+        n: Unused, for compatibility with `mavfile.recv()` .
+        """
+        _ = n
+        return b"".join(packet for _, packet in self.recv_timed())
+
+    def recv_match(
+        self,
+        type: "str | list[str] | None" = None,  # pylint: disable=redefined-builtin
+        blocking: bool = False,
+        timeout: float | None = None,
+    ) -> "mavutil.mavlink.MAVLink_message | None":
+        """
+        Returns the next routed message of the type, same arguments as `mavfile.recv_match()` .
+
+        type: Message name or names, None for any routed message.
+        blocking: Whether to wait for a message.
+        timeout: Time waiting in seconds, None waits forever.
+
+        Returns None if there is no message.
+        """
+        assert self.__receive_queue is not None, "Handle was created without a receive queue"
+
+        if type is not None and not isinstance(type, (list, set)):
+            type = [type]
+
+        if self.__parser is None:
+            self.__parser = mavutil.mavlink.MAVLink(None)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            item = self.__selected_packet
+            self.__selected_packet = None
+            try:
+                if item is None:
+                    item = self.__receive_queue.queue.get(blocking, remaining)
+            except queue.Empty:
+                return None
+
+            # Sentinel during shutdown
+            if item is None:
+                return None
+
+            _, packet = item
+            message = self.__parser.parse_char(packet)
+            if message is None:
+                continue
+
+            if type is None or message.get_type() in type:
+                return message
@@ -0,0 +1,148 @@
+"""
+Routes MAVLink messages between the connection and the workers.
+"""
+
+import queue
+import time
+
+from pymavlink import mavutil
+
+from utilities.mavlink import link_stats
+from utilities.mavlink import message_dispatcher
+from utilities.mavlink import packet_sequencer
+from utilities.workers import queue_proxy_wrapper
+from . import mavlink_connection_handle
+from ..common.modules.logger import logger
+
+
+class MavlinkRouter:
+    """
+    Only user of the connection. Frames the received stream once and puts each packet
+    into the receive queue of every handle subscribed to its message ID, looked up by ID.
+    Packets of IDs without a subscriber are skipped without being decoded.
+    A full receive queue drops a packet instead of stalling the other subscribers.
+    Every packet, subscribed or not, can be counted in link statistics.
+    Packets are queued with their receive time, see `MavlinkConnectionHandle.recv_timed()` .
+    Sent packets are renumbered per sender, since every worker encodes with its own counter.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        connection: mavutil.mavfile,
+        handles: "list[mavlink_connection_handle.MavlinkConnectionHandle]",
+        stats: link_stats.LinkStats | None,
+        local_logger: logger.Logger,
+    ) -> "tuple[bool, MavlinkRouter | None]":
+        """
+        Creates a router.
+
+        connection: Connection to the drone, not used by anything else.
+        handles: Handles of the workers, their receive queues are subscribed.
+        stats: Link statistics recording every packet received, None to not record them.
+        local_logger: Existing logger from process.
+
+        Returns whether the router was able to be created and the router.
+        """
+        if connection is None:
+            local_logger.error("MavlinkRouter: No connection provided", True)
+            return False, None
+
+        receive_queues = []
+        subscribers = {}
+        for handle in handles:
+            receive_queue = handle.get_receive_queue()
+            if receive_queue is None:
+                continue
+
+            receive_queues.append(receive_queue)
+            for message_id in handle.get_message_ids():
+                subscribers.setdefault(message_id, []).append(receive_queue)
+
+        return True, MavlinkRouter(cls.__create_key, connection, receive_queues, subscribers, stats)
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        connection: mavutil.mavfile,
+        receive_queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+        subscribers: "dict[int, list[queue_proxy_wrapper.QueueProxyWrapper]]",
+        stats: link_stats.LinkStats | None,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is MavlinkRouter.__create_key, "Use create() method"
+
+        self.__connection = connection
+        # Refused puts, queues with an overflow policy count their own drops instead
+        self.__refused_count = 0
+        self.__receive_queues = receive_queues
+        self.__stats = stats
+        # Time in seconds the data being routed was received
+        self.__receive_time = 0.0
+        self.__sequencer = packet_sequencer.PacketSequencer()
+
+        self.__dispatcher = message_dispatcher.MessageDispatcher()
+        for message_id, subscribed_queues in subscribers.items():
+            self.__dispatcher.subscribe(message_id, self.__make_forwarder(subscribed_queues))
+
+        if stats is not None:
+            self.__dispatcher.observe(stats.record)
+
+    def __make_forwarder(
+        self, receive_queues: "list[queue_proxy_wrapper.QueueProxyWrapper]"
+    ) -> "(bytes) -> None":  # type: ignore
+        """
+        Returns a handler putting packets into the receive queues with their receive time.
+        """
+
+        def forward(packet: bytes) -> None:
+            item = (self.__receive_time, packet)
+            for receive_queue in receive_queues:
+                try:
+                    receive_queue.queue.put_nowait(item)
+                except queue.Full:
+                    self.__refused_count += 1
+
+        return forward
+
+    def run(self, timeout: float) -> bool:
+        """
+        Receives available data and routes every complete packet in it.
+
+        timeout: Time waiting in seconds for data.
+
+        Returns whether data was received.
+        """
+        data = None
+        if self.__connection.select(timeout):
+            data = self.__connection.recv(message_dispatcher.RECEIVE_SIZE)
+
+        if not data:
+            # Statistics are otherwise published as packets arrive
+            if self.__stats is not None:
+                self.__stats.publish_if_due(time.monotonic_ns())
+
+            return False
+
+        self.__receive_time = time.monotonic()
+        self.__dispatcher.feed(data)
+        return True
+
+    def send(self, packet: bytes) -> None:
+        """
+        Writes a packet from a worker to the connection, renumbered for its sender.
+        """
+        self.__connection.write(self.__sequencer.stamp(packet))
+
+    def get_dropped_count(self) -> int:
+        """
+        Returns the number of packets dropped because a receive queue was full,
+        by its overflow policy or by refusing the put.
+        """
+        return self.__refused_count + sum(
+            receive_queue.dropped_count() for receive_queue in self.__receive_queues
+        )
@@ -0,0 +1,103 @@
+"""
+MAVLink router worker that owns the connection to the drone.
+"""
+
+import os
+import pathlib
+import queue
+import threading
+
+from pymavlink import mavutil
+
+from utilities.mavlink import link_stats
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_controller
+from . import mavlink_connection_handle
+from . import mavlink_router
+from ..common.modules.logger import logger
+
+
+# Longest time between exit checks while no message arrives
+RECEIVE_TIMEOUT = 0.1  # seconds
+# Longest wait for the drone to connect before routing anyway
+CONNECT_TIMEOUT = 30  # seconds
+
+
+def send_packets(
+    router: mavlink_router.MavlinkRouter,
+    send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+) -> None:
+    """
+    Writes packets from the workers to the connection until the sentinel (None).
+    """
+    while True:
+        packet = send_queue.queue.get()
+        if packet is None:
+            break
+
+        router.send(packet)
+
+
+def mavlink_router_worker(
+    connection_string: str,
+    handles: "list[mavlink_connection_handle.MavlinkConnectionHandle]",
+    stats: link_stats.LinkStats | None,
+    send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Worker process.
+
+    connection_string: Where to connect to the drone, only this process connects.
+    handles: Handles passed to the other workers instead of the connection.
+    stats: Link statistics of the packets received, readable from other processes.
+    send_queue: Packets sent by the other workers.
+    controller: How the main process communicates to this worker process.
+    """
+    # Instantiate logger
+    worker_name = pathlib.Path(__file__).stem
+    process_id = os.getpid()
+    result, local_logger = logger.Logger.create(f"{worker_name}_{process_id}", True)
+    if not result:
+        print("ERROR: Worker failed to create logger")
+        return
+
+    # Get Pylance to stop complaining
+    assert local_logger is not None
+
+    local_logger.info("Logger initialized", True)
+
+    connection = mavutil.mavlink_connection(connection_string)
+    # Wait for the "drone" to connect, worker sends stay queued until then
+    # The heartbeat taken here is not routed, the heartbeat receiver gets the next one
+    if connection.wait_heartbeat(timeout=CONNECT_TIMEOUT) is None:
+        local_logger.warning(f"No heartbeat within {CONNECT_TIMEOUT} s, routing anyway", True)
+
+    result, router = mavlink_router.MavlinkRouter.create(connection, handles, stats, local_logger)
+    if not result:
+        local_logger.error("Failed to create MavlinkRouter object", True)
+        return
+
+    # Get Pylance to stop complaining
+    assert router is not None
+
+    # Sends and receives do not wait for each other
+    sender = threading.Thread(target=send_packets, args=(router, send_queue), daemon=True)
+    sender.start()
+
+    while not controller.is_exit_requested():
+        router.run(RECEIVE_TIMEOUT)
+
+    # Stop the sender if shutdown has not already given it a sentinel
+    try:
+        send_queue.queue.put_nowait(None)
+    except queue.Full:
+        pass
+
+    sender.join(RECEIVE_TIMEOUT)
+    # Packets since the last publish
+    if stats is not None:
+        stats.publish()
+
+    local_logger.info(f"Dropped {router.get_dropped_count()} packets for full queues", True)
+    connection.close()
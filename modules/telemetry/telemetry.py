@@ -3,17 +3,40 @@ Telemetry gathering logic.
 """
 
 import time
+from collections.abc import Iterator
 
 from pymavlink import mavutil
 
+from utilities.mavlink import message_dispatcher
 from ..common.modules.logger import logger
 
 
+# Longest time for both messages to arrive
+TIMEOUT = 1.0  # seconds
+
+
 class TelemetryData:  # pylint: disable=too-many-instance-attributes
     """
     Python struct to represent Telemtry Data. Contains the most recent attitude and position reading.
     """
 
+    # No per instance dictionary, one is created per reading in every stage
+    __slots__ = (
+        "time_since_boot",
+        "x",
+        "y",
+        "z",
+        "x_velocity",
+        "y_velocity",
+        "z_velocity",
+        "roll",
+        "pitch",
+        "yaw",
+        "roll_speed",
+        "pitch_speed",
+        "yaw_speed",
+    )
+
     def __init__(
         self,
         time_since_boot: int | None = None,  # ms
@@ -44,6 +67,26 @@ class TelemetryData:  # pylint: disable=too-many-instance-attributes
         self.pitch_speed = pitch_speed
         self.yaw_speed = yaw_speed
 
+    def __reduce__(self) -> "tuple[type, tuple[float | None, ...]]":
+        """
+        Pickles as the constructor arguments in order, smaller and faster than the slot state.
+        """
+        return TelemetryData, (
+            self.time_since_boot,
+            self.x,
+            self.y,
+            self.z,
+            self.x_velocity,
+            self.y_velocity,
+            self.z_velocity,
+            self.roll,
+            self.pitch,
+            self.yaw,
+            self.roll_speed,
+            self.pitch_speed,
+            self.yaw_speed,
+        )
+
     def __str__(self) -> str:
         return f"""{{
             time_since_boot: {self.time_since_boot},
@@ -96,52 +139,120 @@ class Telemetry:
         self.__connection = connection
         self._local_logger = local_logger
 
+        self.__attitude_msg = None
+        self.__position_msg = None
+
+        # Only ATTITUDE and LOCAL_POSITION_NED are decoded, every other message is skipped
+        self.__dispatcher = message_dispatcher.MessageDispatcher()
+        self.__dispatcher.subscribe_decoded(
+            mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, self.__on_attitude
+        )
+        self.__dispatcher.subscribe_decoded(
+            mavutil.mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED, self.__on_position
+        )
+
+    def __on_attitude(self, msg: mavutil.mavlink.MAVLink_attitude_message) -> None:
+        """
+        Keeps the most recent ATTITUDE message.
+        """
+        self.__attitude_msg = msg
+
+    def __on_position(self, msg: mavutil.mavlink.MAVLink_local_position_ned_message) -> None:
+        """
+        Keeps the most recent LOCAL_POSITION_NED message.
+        """
+        self.__position_msg = msg
+
+    @staticmethod
+    def __combine(
+        attitude_msg: mavutil.mavlink.MAVLink_attitude_message,
+        position_msg: mavutil.mavlink.MAVLink_local_position_ned_message,
+    ) -> TelemetryData:
+        """
+        Combines the attitude and position into a single reading.
+        """
+        # Calculate the latest timestamp
+        timestamp = max(attitude_msg.time_boot_ms, position_msg.time_boot_ms)
+
+        return TelemetryData(
+            roll=attitude_msg.roll,
+            pitch=attitude_msg.pitch,
+            yaw=attitude_msg.yaw,
+            x=position_msg.y,  # East is X
+            y=position_msg.x,  # North is Y
+            z=-position_msg.z,  # -Down is Up
+            time_since_boot=timestamp,
+        )
+
     def run(
         self,
     ) -> tuple[bool, TelemetryData | None]:
         """
         Receive LOCAL_POSITION_NED and ATTITUDE messages from the drone,
         combining them together to form a single TelemetryData object.
+
+        Returns as soon as both are received, the wait is on the connection and not polled.
         """
         # Read MAVLink message LOCAL_POSITION_NED (32)
         # Read MAVLink message ATTITUDE (30)
         # Return the most recent of both, and use the most recent message's timestamp
-
-        attitude_msg = None
-        position_msg = None
+        self.__attitude_msg = None
+        self.__position_msg = None
 
         # Requirement: 1 second timeout to get both
-        # We'll use a loop to keep checking the buffer
-        start_time = time.time()
+        deadline = time.monotonic() + TIMEOUT
+        while self.__attitude_msg is None or self.__position_msg is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.0:
+                return False, None
 
-        while time.time() - start_time < 1.0:
-            msg = self.__connection.recv_match(
-                type=["ATTITUDE", "LOCAL_POSITION_NED"], blocking=True, timeout=0.1
-            )
+            self.__dispatcher.receive(self.__connection, remaining)
 
-            if msg is None:
+        return True, self.__combine(self.__attitude_msg, self.__position_msg)
+
+    def stream(self) -> "Iterator[tuple[bool, TelemetryData | None]]":
+        """
+        Same as calling run() repeatedly, but without waiting for both messages again
+        for every reading.
+
+        Yields a reading each time new messages arrive, combined with the most recent
+        of the other message. Both must have been received within the timeout,
+        yields failure every timeout without a reading.
+        """
+        self.__attitude_msg = None
+        self.__position_msg = None
+        attitude_time = None
+        position_time = None
+
+        last_yield_time = time.monotonic()
+        while True:
+            remaining = last_yield_time + TIMEOUT - time.monotonic()
+            if remaining <= 0.0:
+                last_yield_time = time.monotonic()
+                yield False, None
                 continue
-            if msg.get_type() == "ATTITUDE":
-                attitude_msg = msg
-            elif msg.get_type() == "LOCAL_POSITION_NED":
-                position_msg = msg
-
-            if attitude_msg and position_msg:
-                # Calculate the latest timestamp
-                timestamp = max(attitude_msg.time_boot_ms, position_msg.time_boot_ms)
-
-                data = TelemetryData(
-                    roll=attitude_msg.roll,
-                    pitch=attitude_msg.pitch,
-                    yaw=attitude_msg.yaw,
-                    x=position_msg.y,  # East is X
-                    y=position_msg.x,  # North is Y
-                    z=-position_msg.z,  # -Down is Up
-                    time_since_boot=timestamp,
-                )
-                return True, data
-
-        return False, None
+
+            previous_attitude_msg = self.__attitude_msg
+            previous_position_msg = self.__position_msg
+            self.__dispatcher.receive(self.__connection, remaining)
+
+            now = time.monotonic()
+            if self.__attitude_msg is not previous_attitude_msg:
+                attitude_time = now
+            if self.__position_msg is not previous_position_msg:
+                position_time = now
+
+            if attitude_time is None or position_time is None:
+                continue
+
+            if now not in (attitude_time, position_time):
+                continue
+
+            if now - min(attitude_time, position_time) > TIMEOUT:
+                continue
+
+            last_yield_time = now
+            yield True, self.__combine(self.__attitude_msg, self.__position_msg)
 
 
 # =================================================================================================
@@ -0,0 +1,104 @@
+"""
+Columnar telemetry for evaluating many readings at once.
+"""
+
+import math
+
+import numpy as np
+
+from utilities.serialization import record_codec
+from . import telemetry
+
+
+class TelemetryBatch:  # pylint: disable=too-many-instance-attributes
+    """
+    Readings in time order as one NumPy float64 array per TelemetryData field.
+    Missing values (None in TelemetryData) are NaN.
+    """
+
+    __slots__ = telemetry.TelemetryData.__slots__
+
+    def __init__(
+        self,
+        time_since_boot: np.ndarray,  # ms
+        x: np.ndarray,  # m
+        y: np.ndarray,  # m
+        z: np.ndarray,  # m
+        x_velocity: np.ndarray,  # m/s
+        y_velocity: np.ndarray,  # m/s
+        z_velocity: np.ndarray,  # m/s
+        roll: np.ndarray,  # rad
+        pitch: np.ndarray,  # rad
+        yaw: np.ndarray,  # rad
+        roll_speed: np.ndarray,  # rad/s
+        pitch_speed: np.ndarray,  # rad/s
+        yaw_speed: np.ndarray,  # rad/s
+    ) -> None:
+        self.time_since_boot = time_since_boot
+        self.x = x
+        self.y = y
+        self.z = z
+        self.x_velocity = x_velocity
+        self.y_velocity = y_velocity
+        self.z_velocity = z_velocity
+        self.roll = roll
+        self.pitch = pitch
+        self.yaw = yaw
+        self.roll_speed = roll_speed
+        self.pitch_speed = pitch_speed
+        self.yaw_speed = yaw_speed
+
+        assert all(
+            len(getattr(self, name)) == len(time_since_boot) for name in self.__slots__
+        ), "Every field needs a value per reading"
+
+    @classmethod
+    def from_readings(cls, readings: "list[telemetry.TelemetryData]") -> "TelemetryBatch":
+        """
+        Creates a batch from readings.
+        """
+        return cls(
+            **{
+                name: np.array([getattr(reading, name) for reading in readings], np.float64)
+                for name in cls.__slots__
+            }
+        )
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> "TelemetryBatch":
+        """
+        Creates a batch from a structured array of telemetry records,
+        such as `TELEMETRY_DATA_CODEC.decode_array()` or `RecordHistory.window()` .
+        """
+        names = records.dtype.names
+        presence = None
+        if names[0] == record_codec.RecordCodec.PRESENCE_FIELD:
+            presence = records[record_codec.RecordCodec.PRESENCE_FIELD]
+
+        columns = {}
+        for name in cls.__slots__:
+            column = records[name].astype(np.float64)
+            if presence is not None:
+                bit = 1 << (names.index(name) - 1)
+                column[(presence & bit) == 0] = np.nan
+
+            columns[name] = column
+
+        return cls(**columns)
+
+    def __len__(self) -> int:
+        return len(self.time_since_boot)
+
+    def __getitem__(self, index: int) -> telemetry.TelemetryData:
+        """
+        Returns the reading at the index.
+        """
+        values = {}
+        for name in self.__slots__:
+            value = getattr(self, name)[index].item()
+            values[name] = None if math.isnan(value) else value
+
+        if values["time_since_boot"] is not None:
+            values["time_since_boot"] = int(values["time_since_boot"])
+
+        return telemetry.TelemetryData(**values)
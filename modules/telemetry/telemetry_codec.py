@@ -0,0 +1,62 @@
+"""
+Binary record layout of TelemetryData for the telemetry queues.
+"""
+
+from utilities.serialization import record_codec
+from . import telemetry
+from . import telemetry_batch
+
+
+TELEMETRY_DATA_CODEC = record_codec.RecordCodec(
+    telemetry.TelemetryData,
+    [
+        ("time_since_boot", "I"),  # ms, MAVLink time_boot_ms is uint32
+        ("x", "d"),
+        ("y", "d"),
+        ("z", "d"),
+        ("x_velocity", "d"),
+        ("y_velocity", "d"),
+        ("z_velocity", "d"),
+        ("roll", "d"),
+        ("pitch", "d"),
+        ("yaw", "d"),
+        ("roll_speed", "d"),
+        ("pitch_speed", "d"),
+        ("yaw_speed", "d"),
+    ],
+)
+
+
+def unpack(
+    item: "bytes | telemetry.TelemetryData",
+) -> "record_codec.RecordView | telemetry.TelemetryData":
+    """
+    Wraps a packed record for lazy decoding, unpacked TelemetryData is returned unchanged.
+    """
+    if isinstance(item, (bytes, bytearray)):
+        return TELEMETRY_DATA_CODEC.view(item)
+
+    return item
+
+
+def pack(item: "bytes | telemetry.TelemetryData") -> bytes:
+    """
+    Packs TelemetryData into a record, packed records are returned unchanged.
+    """
+    if isinstance(item, (bytes, bytearray)):
+        return item
+
+    return TELEMETRY_DATA_CODEC.encode(item)
+
+
+def unpack_batch(items: "list[bytes | telemetry.TelemetryData]") -> telemetry_batch.TelemetryBatch:
+    """
+    Gathers the readings into a batch. Packed records are decoded as one array,
+    unless some readings are already unpacked TelemetryData.
+    """
+    if all(isinstance(item, (bytes, bytearray)) for item in items):
+        return telemetry_batch.TelemetryBatch.from_records(
+            TELEMETRY_DATA_CODEC.decode_array(b"".join(items))
+        )
+
+    return telemetry_batch.TelemetryBatch.from_readings([unpack(item) for item in items])
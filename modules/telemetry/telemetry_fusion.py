@@ -0,0 +1,263 @@
+"""
+Telemetry with attitude and position aligned to the same timestamps.
+"""
+
+import collections
+import math
+import time
+from collections.abc import Iterator
+
+from pymavlink import mavutil
+
+from utilities.mavlink import message_dispatcher
+from . import telemetry
+from ..common.modules.logger import logger
+
+
+# Longest gap in a stream to interpolate over, longer gaps restart the fusion
+MAX_GAP = int(telemetry.TIMEOUT * 1000)  # ms
+
+# Samples are the 3 values followed by their rates of change, the first 3 attitude values are angles
+VALUE_COUNT = 3
+ATTITUDE_ANGLE_COUNT = 3
+
+
+class TelemetryFusion:  # pylint: disable=too-many-instance-attributes
+    """
+    Drop in for Telemetry whose readings are taken at a fixed output period of the drone's clock.
+
+    ATTITUDE and LOCAL_POSITION_NED are buffered separately, and each is interpolated onto
+    the output timestamps (or extrapolated with its rates when it lags behind the other stream),
+    so every reading has the attitude and position of the same moment, with all rates filled in.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        connection: mavutil.mavfile,
+        output_period: int,
+        max_extrapolation: int,
+        local_logger: logger.Logger,
+    ) -> "tuple[bool, TelemetryFusion | None]":
+        """
+        Creates the fusion.
+
+        connection: Connection to the drone.
+        output_period: Time in ms of the drone's clock between readings.
+        max_extrapolation: Longest time in ms to extrapolate a stream beyond its latest message.
+        local_logger: Existing logger from process.
+
+        Returns whether the fusion was able to be created and the fusion.
+        """
+        if connection is None:
+            local_logger.error("TelemetryFusion: No connection provided")
+            return False, None
+
+        if output_period <= 0 or max_extrapolation < 0:
+            local_logger.error(
+                "TelemetryFusion: Output period must be positive and extrapolation not negative"
+            )
+            return False, None
+
+        return True, TelemetryFusion(cls.__create_key, connection, output_period, max_extrapolation)
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        connection: mavutil.mavfile,
+        output_period: int,
+        max_extrapolation: int,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is TelemetryFusion.__create_key, "Use create() method"
+
+        self.__connection = connection
+        self.__output_period = output_period
+        self.__max_extrapolation = max_extrapolation
+
+        # (time_boot_ms, values and rates) in time order
+        self.__attitudes: "collections.deque[tuple[int, tuple[float, ...]]]" = collections.deque()
+        self.__positions: "collections.deque[tuple[int, tuple[float, ...]]]" = collections.deque()
+        # Timestamp of the next reading, None until both streams have a message
+        self.__next_time: "int | None" = None
+        self.__readings: "collections.deque[telemetry.TelemetryData]" = collections.deque()
+
+        self.__dispatcher = message_dispatcher.MessageDispatcher()
+        self.__dispatcher.subscribe_decoded(
+            mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, self.add_attitude
+        )
+        self.__dispatcher.subscribe_decoded(
+            mavutil.mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED, self.add_position
+        )
+
+    def add_attitude(self, msg: mavutil.mavlink.MAVLink_attitude_message) -> None:
+        """
+        Buffers an ATTITUDE message.
+        """
+        self.__add(
+            self.__attitudes,
+            msg.time_boot_ms,
+            (msg.roll, msg.pitch, msg.yaw, msg.rollspeed, msg.pitchspeed, msg.yawspeed),
+        )
+
+    def add_position(self, msg: mavutil.mavlink.MAVLink_local_position_ned_message) -> None:
+        """
+        Buffers a LOCAL_POSITION_NED message.
+        """
+        # North, East, Down to the East, North, Up of TelemetryData
+        self.__add(
+            self.__positions,
+            msg.time_boot_ms,
+            (msg.y, msg.x, -msg.z, msg.vy, msg.vx, -msg.vz),
+        )
+
+    def pop_readings(self) -> "list[telemetry.TelemetryData]":
+        """
+        Returns the readings completed by the buffered messages.
+        """
+        readings = list(self.__readings)
+        self.__readings.clear()
+        return readings
+
+    def run(self) -> "tuple[bool, telemetry.TelemetryData | None]":
+        """
+        Returns the next reading, waiting for up to the telemetry timeout.
+        """
+        deadline = time.monotonic() + telemetry.TIMEOUT
+        while len(self.__readings) == 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.0:
+                return False, None
+
+            self.__dispatcher.receive(self.__connection, remaining)
+
+        return True, self.__readings.popleft()
+
+    def stream(self) -> "Iterator[tuple[bool, telemetry.TelemetryData | None]]":
+        """
+        Yields the result of run() forever, readings are yielded as soon as they are complete.
+        """
+        while True:
+            yield self.run()
+
+    def __add(
+        self,
+        samples: "collections.deque[tuple[int, tuple[float, ...]]]",
+        time_boot_ms: int,
+        values: "tuple[float, ...]",
+    ) -> None:
+        """
+        Buffers a sample and fuses every reading it completes.
+        """
+        if len(samples) > 0:
+            gap = time_boot_ms - samples[-1][0]
+            if gap < 0 or gap > MAX_GAP:
+                # Drone restarted or a stream stalled, do not interpolate across it
+                self.__attitudes.clear()
+                self.__positions.clear()
+                self.__next_time = None
+            elif gap == 0:
+                samples.pop()
+
+        samples.append((time_boot_ms, values))
+        self.__fuse()
+
+    def __fuse(self) -> None:
+        """
+        Creates the readings up to where both streams are known.
+        """
+        attitudes = self.__attitudes
+        positions = self.__positions
+        if len(attitudes) == 0 or len(positions) == 0:
+            return
+
+        if self.__next_time is None:
+            # First timestamp of the output period when both streams have started
+            start = max(attitudes[0][0], positions[0][0])
+            self.__next_time = -(-start // self.__output_period) * self.__output_period
+
+        latest_attitude = attitudes[-1][0]
+        latest_position = positions[-1][0]
+        # The lagging stream is extrapolated to the leading one, but only so far
+        horizon = min(
+            max(latest_attitude, latest_position),
+            min(latest_attitude, latest_position) + self.__max_extrapolation,
+        )
+
+        while self.__next_time <= horizon:
+            roll, pitch, yaw, roll_speed, pitch_speed, yaw_speed = self.__sample(
+                attitudes, self.__next_time, ATTITUDE_ANGLE_COUNT
+            )
+            x, y, z, x_velocity, y_velocity, z_velocity = self.__sample(
+                positions, self.__next_time, 0
+            )
+            self.__readings.append(
+                telemetry.TelemetryData(
+                    time_since_boot=self.__next_time,
+                    x=x,
+                    y=y,
+                    z=z,
+                    x_velocity=x_velocity,
+                    y_velocity=y_velocity,
+                    z_velocity=z_velocity,
+                    roll=roll,
+                    pitch=pitch,
+                    yaw=yaw,
+                    roll_speed=roll_speed,
+                    pitch_speed=pitch_speed,
+                    yaw_speed=yaw_speed,
+                )
+            )
+            self.__next_time += self.__output_period
+
+        # Only the latest sample before the next reading is still needed to interpolate
+        for samples in (attitudes, positions):
+            while len(samples) >= 2 and samples[1][0] <= self.__next_time:
+                samples.popleft()
+
+    @staticmethod
+    def __sample(
+        samples: "collections.deque[tuple[int, tuple[float, ...]]]",
+        time_boot_ms: int,
+        angle_count: int,
+    ) -> "tuple[float, ...]":
+        """
+        Returns the values and rates at the time, interpolated between the samples around it
+        or extrapolated from the latest sample.
+
+        angle_count: Number of leading values that are angles, which are wrapped to [-pi, pi] .
+        """
+        # Few samples are buffered, and the time is usually near the end
+        index = len(samples) - 1
+        while index > 0 and samples[index][0] > time_boot_ms:
+            index -= 1
+
+        before_time, before = samples[index]
+        if index == len(samples) - 1 or before_time >= time_boot_ms:
+            # Extrapolate with the rates, which are held
+            elapsed = max(time_boot_ms - before_time, 0) / 1000
+            values = [
+                value + rate * elapsed
+                for value, rate in zip(before[:VALUE_COUNT], before[VALUE_COUNT:])
+            ]
+            for i in range(angle_count):
+                values[i] = math.remainder(values[i], 2 * math.pi)
+
+            return tuple(values) + before[VALUE_COUNT:]
+
+        after_time, after = samples[index + 1]
+        fraction = (time_boot_ms - before_time) / (after_time - before_time)
+        values = []
+        for i, (start, end) in enumerate(zip(before, after)):
+            if i < angle_count:
+                # Shortest way around, so yaw does not spin the long way across +-pi
+                change = math.remainder(end - start, 2 * math.pi)
+                values.append(math.remainder(start + fraction * change, 2 * math.pi))
+            else:
+                values.append(start + fraction * (end - start))
+
+        return tuple(values)
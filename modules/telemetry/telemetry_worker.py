@@ -10,19 +10,32 @@ from pymavlink import mavutil
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 from . import telemetry
+from . import telemetry_codec
+from . import telemetry_fusion
 from ..common.modules.logger import logger
 
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+# Longest time a lagging stream is extrapolated when fusing
+MAX_EXTRAPOLATION = 500  # ms
+
+
 def telemetry_worker(
     connection: mavutil.mavfile,
-    controller: worker_controller.WorkerController,
+    batch_size: int,
+    output_period: int,
     output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
 ) -> None:
     """
     Defines the telemetry worker
+
+    batch_size: Number of samples put into the output queue at once, 1 or less puts each sample
+    as soon as it is read.
+    output_period: Time in ms of the drone's clock between fused readings,
+    0 or less pairs the latest attitude and position as they arrive instead.
     """
 
     # =============================================================================================
@@ -47,22 +60,42 @@ def telemetry_worker(
     # =============================================================================================
     # Instantiate class object (telemetry.Telemetry)
 
-    result, telemetry_obj = telemetry.Telemetry.create(connection, local_logger)
+    if output_period > 0:
+        result, telemetry_obj = telemetry_fusion.TelemetryFusion.create(
+            connection, output_period, MAX_EXTRAPOLATION, local_logger
+        )
+    else:
+        result, telemetry_obj = telemetry.Telemetry.create(connection, local_logger)
     if not result:
         local_logger.error("Failed to create Telemetry object")
         controller.request_exit()
         return
 
-    while not controller.is_exit_requested():
-        # run() handles the 1s timeout logic internally
-        success, data = telemetry_obj.run()
+    batch = []
+    # Yields each reading as soon as it arrives, and a failure after the 1s timeout
+    for success, data in telemetry_obj.stream():
+        if controller.is_exit_requested():
+            break
 
         if success and data:
-            output_queue.queue.put(data)
+            # Packed record is smaller and cheaper to pickle than the object
+            packed = telemetry_codec.TELEMETRY_DATA_CODEC.encode(data)
+            if batch_size <= 1:
+                output_queue.queue.put(packed)
+            else:
+                batch.append(packed)
             local_logger.info(f"Telemetry updated: X={data.x:.2f}, Y={data.y:.2f}, Z={data.z:.2f}")
         else:
             local_logger.error("Failed to get telemetry data")
 
+        # Batch moves in one round trip, but do not hold samples back when reading stalls
+        if batch and (len(batch) >= batch_size or not success):
+            output_queue.put_many(batch)
+            batch = []
+
+    if batch:
+        output_queue.put_many(batch)
+
 
 # =================================================================================================
 #                            ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
@@ -9,6 +9,7 @@ from pymavlink import mavutil
 
 from modules.command import command
 from modules.common.modules.logger import logger
+from utilities.mavlink import message_dispatcher
 
 
 CONNECTION_STRING = "tcpin:localhost:12345"
@@ -44,9 +45,13 @@ def main() -> int:
 
     local_logger.info("Logger initialized")
 
+    dispatcher = message_dispatcher.MessageDispatcher()
+
     # Task is to read NUM_TRIALS COMMAND_LONG messages
     for _ in range(NUM_TRIALS):
-        msg = connection.recv_match(type="COMMAND_LONG", blocking=True, timeout=TIMEOUT)
+        msg = dispatcher.recv_message(
+            connection, mavutil.mavlink.MAVLINK_MSG_ID_COMMAND_LONG, TIMEOUT
+        )
         if not msg or msg.get_type() != "COMMAND_LONG":
             local_logger.error("Sent incorrect message type or timed out, still expecting mesages")
             return -2
@@ -74,8 +79,10 @@ def main() -> int:
                 local_logger.error(f"Turning speed is not the desired value: {msg.param2}")
                 return -8
         local_logger.info("Received a valid command")
+        # Acknowledged, so the command is not sent again
+        connection.mav.command_ack_send(msg.command, mavutil.mavlink.MAV_RESULT_ACCEPTED)
 
-    msg = connection.recv_match(type="COMMAND_LONG", blocking=True, timeout=TIMEOUT)
+    msg = dispatcher.recv_message(connection, mavutil.mavlink.MAVLINK_MSG_ID_COMMAND_LONG, TIMEOUT)
     if msg and msg.get_type() == "COMMAND_LONG":
         local_logger.error("Recieved extra command")
         return -9
@@ -9,6 +9,7 @@ import time
 from pymavlink import mavutil
 
 from modules.common.modules.logger import logger
+from utilities.mavlink import message_dispatcher
 
 
 CONNECTION_STRING = "tcpin:localhost:12345"
@@ -45,12 +46,16 @@ def main() -> int:
     # If there are issues, don't worry, bootcamp reviewers will understand
     connection.wait_heartbeat()
 
+    dispatcher = message_dispatcher.MessageDispatcher()
+
     # Task is to recive heartbeats at a rate of 1Hz
     # Recieve NUM_TRIALS heartbeats to consider a scucess
     for _ in range(NUM_TRIALS):
         start = time.time()
-        msg = connection.recv_match(
-            type="HEARTBEAT", blocking=True, timeout=HEARTBEAT_PERIOD + ERROR_TOLERANCE
+        msg = dispatcher.recv_message(
+            connection,
+            mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT,
+            HEARTBEAT_PERIOD + ERROR_TOLERANCE,
         )
         if not msg or msg.get_type() != "HEARTBEAT":
             local_logger.error(
@@ -70,8 +75,8 @@ def main() -> int:
             return -4
         local_logger.info("Drone: Recieved heartbeat!")
 
-    msg = connection.recv_match(
-        type="HEARTBEAT", blocking=True, timeout=HEARTBEAT_PERIOD + ERROR_TOLERANCE
+    msg = dispatcher.recv_message(
+        connection, mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT, HEARTBEAT_PERIOD + ERROR_TOLERANCE
     )
     if msg and msg.get_type() == "HEARTBEAT":
         local_logger.error("Recieved extra heartbeat")
@@ -0,0 +1,271 @@
+"""
+Mock drone for testing MissionTransfer.
+"""
+
+import collections
+import os
+import pathlib
+import time
+
+from pymavlink import mavutil
+
+from modules.common.modules.logger import logger
+from utilities.mavlink import message_dispatcher
+
+
+CONNECTION_STRING = "tcpin:localhost:12345"
+TIMEOUT = 5.0
+# Time without progress before the lowest missing item is requested again
+REQUEST_TIMEOUT = 0.3  # seconds
+FLOAT_TOLERANCE = 1e-3
+
+# Mission expected to be uploaded, and uploaded once only
+NUM_WAYPOINTS = 500
+ACCEPTANCE_RADIUS = 2.0  # m
+
+# Every LOSS_PERIOD th item is lost the first time, to test retransmission
+LOSS_PERIOD = 50
+
+
+def expected_waypoint(seq: int) -> "tuple[float, float, float]":
+    """
+    Position of the waypoint in the test mission.
+    """
+    return seq * 1.5, (seq * 7) % 40 - 20.0, 30.0 + seq % 5
+
+
+def is_lost(seq: int, losses: "set[int]") -> bool:
+    """
+    Returns whether the item is lost, each LOSS_PERIOD th item once.
+    """
+    if seq % LOSS_PERIOD != LOSS_PERIOD - 1 or seq in losses:
+        return False
+
+    losses.add(seq)
+    return True
+
+
+def receive(
+    connection: mavutil.mavfile,
+    dispatcher: message_dispatcher.MessageDispatcher,
+    received: "collections.deque[mavutil.mavlink.MAVLink_message]",
+    timeout: float,
+) -> "mavutil.mavlink.MAVLink_message | None":
+    """
+    Returns the next mission message, None if there is none in time.
+    """
+    deadline = time.monotonic() + timeout
+    while len(received) == 0:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0.0:
+            return None
+
+        dispatcher.receive(connection, remaining)
+
+    return received.popleft()
+
+
+def receive_upload(
+    connection: mavutil.mavfile,
+    dispatcher: message_dispatcher.MessageDispatcher,
+    received: "collections.deque[mavutil.mavlink.MAVLink_message]",
+    count: int,
+    local_logger: logger.Logger,
+) -> int:
+    """
+    Requests the items after MISSION_COUNT one at a time, like PX4 and ArduPilot.
+    The requested item is requested again without progress. A duplicate of an item already
+    received is ignored, an item that was not requested yet is rejected.
+
+    Returns 0 on success, a negative error code otherwise.
+    """
+    positions: "dict[int, tuple[float, float, float, float]]" = {}
+    losses: "set[int]" = set()
+    requests = 1
+    requested = 0
+    connection.mav.mission_request_int_send(255, 0, requested)
+    deadline = time.monotonic() + TIMEOUT
+    while requested < count:
+        msg = receive(connection, dispatcher, received, REQUEST_TIMEOUT)
+        if msg is None:
+            if time.monotonic() >= deadline:
+                local_logger.error(f"Timed out waiting for item {requested}")
+                return -2
+
+            connection.mav.mission_request_int_send(255, 0, requested)
+            requests += 1
+            continue
+
+        if msg.get_type() == "MISSION_COUNT":
+            # Sent again before the first request arrived
+            continue
+
+        if msg.get_type() != "MISSION_ITEM_INT":
+            local_logger.error(f"Expected MISSION_ITEM_INT, received {msg.get_type()}")
+            return -3
+
+        if msg.seq < requested:
+            # Sent again before the next request arrived
+            continue
+
+        if msg.seq != requested:
+            connection.mav.mission_ack_send(255, 0, mavutil.mavlink.MAV_MISSION_INVALID_SEQUENCE)
+            local_logger.error(f"Received item {msg.seq} before it was requested")
+            return -9
+
+        if is_lost(msg.seq, losses):
+            continue
+
+        if msg.frame != mavutil.mavlink.MAV_FRAME_LOCAL_NED:
+            local_logger.error(f"Item {msg.seq} is not in the local frame: {msg.frame}")
+            return -4
+
+        positions[msg.seq] = (msg.x / 1e4, msg.y / 1e4, msg.z, msg.param2)
+        requested += 1
+        if requested < count:
+            connection.mav.mission_request_int_send(255, 0, requested)
+            requests += 1
+            deadline = time.monotonic() + TIMEOUT
+
+    for seq in range(count):
+        x, y, z, acceptance_radius = positions[seq]
+        expected_x, expected_y, expected_z = expected_waypoint(seq)
+        if (
+            abs(x - expected_x) > FLOAT_TOLERANCE
+            or abs(y - expected_y) > FLOAT_TOLERANCE
+            or abs(z - expected_z) > FLOAT_TOLERANCE
+            or abs(acceptance_radius - ACCEPTANCE_RADIUS) > FLOAT_TOLERANCE
+        ):
+            local_logger.error(f"Item {seq} is not the desired waypoint: {positions[seq]}")
+            return -5
+
+    connection.mav.mission_ack_send(255, 0, mavutil.mavlink.MAV_MISSION_ACCEPTED)
+    local_logger.info(f"Received {count} items with {requests} requests, {len(losses)} lost")
+    return 0
+
+
+def send_download(
+    connection: mavutil.mavfile,
+    dispatcher: message_dispatcher.MessageDispatcher,
+    received: "collections.deque[mavutil.mavlink.MAVLink_message]",
+    count: int,
+    local_logger: logger.Logger,
+) -> int:
+    """
+    Answers each MISSION_REQUEST_INT until MISSION_ACK.
+
+    Returns 0 on success, a negative error code otherwise.
+    """
+    losses: "set[int]" = set()
+    connection.mav.mission_count_send(255, 0, count)
+    while True:
+        msg = receive(connection, dispatcher, received, TIMEOUT)
+        if msg is None:
+            local_logger.error("Timed out waiting for item requests")
+            return -6
+
+        msg_type = msg.get_type()
+        if msg_type == "MISSION_ACK":
+            break
+
+        if msg_type == "MISSION_REQUEST_LIST":
+            connection.mav.mission_count_send(255, 0, count)
+            continue
+
+        if msg_type != "MISSION_REQUEST_INT" or msg.seq >= count:
+            local_logger.error(f"Unexpected request during download: {msg}")
+            return -7
+
+        if is_lost(msg.seq, losses):
+            continue
+
+        x, y, z = expected_waypoint(msg.seq)
+        connection.mav.mission_item_int_send(
+            255,
+            0,
+            msg.seq,
+            mavutil.mavlink.MAV_FRAME_LOCAL_NED,
+            mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+            0,
+            1,
+            0,
+            ACCEPTANCE_RADIUS,
+            0,
+            0,
+            round(x * 1e4),
+            round(y * 1e4),
+            z,
+        )
+
+    local_logger.info(f"Sent {count} items, {len(losses)} lost")
+    return 0
+
+
+def main() -> int:
+    """
+    Begin mock drone simulation to test mission transfer.
+    """
+    # Mocked autopilot/drone
+    # source_system = 1 (airside on drone)
+    # source_component = 0 (autopilot)
+    connection = mavutil.mavlink_connection(CONNECTION_STRING, source_system=1, source_component=0)
+    connection.wait_heartbeat()
+
+    # Instantiate logger after main starts
+    drone_name = pathlib.Path(__file__).stem
+    process_id = os.getpid()
+    result, local_logger = logger.Logger.create(f"{drone_name}_{process_id}", True)
+    if not result:
+        print("ERROR: Worker failed to create drone logger")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert local_logger is not None
+
+    local_logger.info("Logger initialized")
+
+    dispatcher = message_dispatcher.MessageDispatcher()
+    received = collections.deque()
+    for message_id in (
+        mavutil.mavlink.MAVLINK_MSG_ID_MISSION_COUNT,
+        mavutil.mavlink.MAVLINK_MSG_ID_MISSION_REQUEST_LIST,
+        mavutil.mavlink.MAVLINK_MSG_ID_MISSION_REQUEST_INT,
+        mavutil.mavlink.MAVLINK_MSG_ID_MISSION_ITEM_INT,
+        mavutil.mavlink.MAVLINK_MSG_ID_MISSION_ACK,
+    ):
+        dispatcher.subscribe_decoded(message_id, received.append)
+
+    # Upload
+    msg = receive(connection, dispatcher, received, TIMEOUT)
+    if msg is None or msg.get_type() != "MISSION_COUNT" or msg.count != NUM_WAYPOINTS:
+        local_logger.error(f"Expected MISSION_COUNT of {NUM_WAYPOINTS}, received {msg}")
+        return -2
+
+    result = receive_upload(connection, dispatcher, received, msg.count, local_logger)
+    if result < 0:
+        return result
+
+    # The same mission is uploaded again, which must be skipped, then downloaded
+    msg = receive(connection, dispatcher, received, TIMEOUT)
+    while msg is not None and msg.get_type() == "MISSION_ITEM_INT":
+        # Items sent again after the last one was received
+        msg = receive(connection, dispatcher, received, TIMEOUT)
+
+    if msg is None or msg.get_type() != "MISSION_REQUEST_LIST":
+        local_logger.error(f"Expected MISSION_REQUEST_LIST, received {msg}")
+        return -8
+
+    result = send_download(connection, dispatcher, received, NUM_WAYPOINTS, local_logger)
+    if result < 0:
+        return result
+
+    local_logger.info("Passed!")
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"Drone: Failed with return code {result_main}")
+    else:
+        print("Drone: Success!")
@@ -243,7 +243,9 @@ def main() -> int:
     # Read the main queue (worker outputs)
     threading.Thread(target=read_queue, args=(output_queue, main_logger, controller)).start()
 
-    command_worker.command_worker(connection, TARGET, controller, input_queue, output_queue)
+    command_worker.command_worker(
+        connection, TARGET, 1, None, input_queue, None, output_queue, controller
+    )
     # =============================================================================================
     #                          ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
     # =============================================================================================
@@ -31,6 +31,9 @@ ERROR_TOLERANCE = 1e-2
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
 # Add your own constants here
+SUMMARY_PERIOD = HEARTBEAT_PERIOD * 5  # seconds
+# Mock drone sends as system 1
+DRONE_SYSTEM_ID = 1
 
 # =================================================================================================
 #                            ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
@@ -138,7 +141,13 @@ def main() -> int:
     threading.Thread(target=read_queue, args=(output_queue, main_logger, controller)).start()
 
     heartbeat_receiver_worker.heartbeat_receiver_worker(
-        connection, controller, output_queue, DISCONNECT_THRESHOLD
+        connection,
+        DISCONNECT_THRESHOLD,
+        DRONE_SYSTEM_ID,
+        SUMMARY_PERIOD,
+        None,
+        output_queue,
+        controller,
     )
     # =============================================================================================
     #                          ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
@@ -103,6 +103,8 @@ def main() -> int:
 
     heartbeat_sender_worker.heartbeat_sender_worker(
         connection=connection,
+        period=HEARTBEAT_PERIOD,
+        message_intervals={},
         controller=controller,
     )
     # =============================================================================================
@@ -0,0 +1,172 @@
+"""
+Test mission transfer with a mocked drone.
+"""
+
+import multiprocessing as mp
+import pathlib
+import subprocess
+import tempfile
+
+import numpy as np
+from pymavlink import mavutil
+
+from modules.command import mission
+from modules.command import mission_transfer
+from modules.common.modules.logger import logger
+from modules.common.modules.logger import logger_main_setup
+from modules.common.modules.read_yaml import read_yaml
+
+
+MOCK_DRONE_MODULE = "tests.integration.mock_drones.mission_drone"
+CONNECTION_STRING = "tcp:localhost:12345"
+
+# Please do not modify these, these are for the test cases (but do take note of them!)
+NUM_WAYPOINTS = 500
+ACCEPTANCE_RADIUS = 2.0  # m
+POSITION_TOLERANCE = 1e-3  # m
+
+# =================================================================================================
+#                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
+# =================================================================================================
+# Add your own constants here
+TRANSFER_WINDOW = 16
+TRANSFER_TIMEOUT = 0.5  # seconds
+TRANSFER_MAX_RETRIES = 5
+
+# =================================================================================================
+#                            ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
+# =================================================================================================
+
+
+# Same utility functions across all the integration tests
+# pylint: disable=duplicate-code
+def start_drone() -> None:
+    """
+    Start the mocked drone.
+    """
+    subprocess.run(["python", "-m", MOCK_DRONE_MODULE], shell=True, check=False)
+
+
+# =================================================================================================
+#                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
+# =================================================================================================
+def make_mission() -> np.ndarray:
+    """
+    Mission the drone expects.
+    """
+    seq = np.arange(NUM_WAYPOINTS)
+    waypoints = np.empty(NUM_WAYPOINTS, mission.WAYPOINT_DTYPE)
+    waypoints["x"] = seq * 1.5
+    waypoints["y"] = (seq * 7) % 40 - 20.0
+    waypoints["z"] = 30.0 + seq % 5
+    waypoints["acceptance_radius"] = ACCEPTANCE_RADIUS
+    return waypoints
+
+
+# =================================================================================================
+#                            ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
+# =================================================================================================
+
+
+def main() -> int:
+    """
+    Start the mission transfer simulation.
+    """
+    # Configuration settings
+    result, config = read_yaml.open_config(logger.CONFIG_FILE_PATH)
+    if not result:
+        print("ERROR: Failed to load configuration file")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert config is not None
+
+    # Setup main logger
+    result, main_logger, _ = logger_main_setup.setup_main_logger(config)
+    if not result:
+        print("ERROR: Failed to create main logger")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert main_logger is not None
+
+    # Mocked GCS, connect to mocked drone which is listening at CONNECTION_STRING
+    # source_system = 255 (groundside)
+    # source_component = 0 (ground control station)
+    connection = mavutil.mavlink_connection(CONNECTION_STRING)
+    connection.mav.heartbeat_send(
+        mavutil.mavlink.MAV_TYPE_GCS,
+        mavutil.mavlink.MAV_AUTOPILOT_INVALID,
+        0,
+        0,
+        0,
+    )
+    main_logger.info("Connected!")
+    # pylint: enable=duplicate-code
+
+    # =============================================================================================
+    #                          ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
+    # =============================================================================================
+    with tempfile.TemporaryDirectory() as cache_directory:
+        result, transfer = mission_transfer.MissionTransfer.create(
+            connection,
+            pathlib.Path(cache_directory),
+            TRANSFER_WINDOW,
+            TRANSFER_TIMEOUT,
+            TRANSFER_MAX_RETRIES,
+            main_logger,
+        )
+        if not result:
+            main_logger.error("Failed to create mission transfer")
+            return -1
+
+        # Get Pylance to stop complaining
+        assert transfer is not None
+
+        waypoints = make_mission()
+        if not transfer.upload(waypoints):
+            main_logger.error("Failed to upload mission")
+            return -2
+
+        # Unchanged, so the drone fails if it is uploaded again
+        if not transfer.upload(waypoints):
+            main_logger.error("Failed to skip uploading the unchanged mission")
+            return -3
+
+        result, downloaded = transfer.download()
+        if not result:
+            main_logger.error("Failed to download mission")
+            return -4
+
+        # Get Pylance to stop complaining
+        assert downloaded is not None
+
+        for name in mission.WAYPOINT_DTYPE.names:
+            if np.max(np.abs(downloaded[name] - waypoints[name])) > POSITION_TOLERANCE:
+                main_logger.error(f"Downloaded mission differs from the uploaded one in {name}")
+                return -5
+
+        result, cached = transfer.load_cached(transfer.get_vehicle_hash())
+        if not result or not np.array_equal(cached, downloaded):
+            main_logger.error("Downloaded mission is not cached as the vehicle's mission")
+            return -6
+
+    # =============================================================================================
+    #                          ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
+    # =============================================================================================
+
+    return 0
+
+
+if __name__ == "__main__":
+    # Start drone in another process
+    drone_process = mp.Process(target=start_drone)
+    drone_process.start()
+
+    result_main = main()
+    if result_main < 0:
+        print(f"Failed with return code {result_main}")
+    else:
+        print("Success!")
+
+    drone_process.join()
@@ -12,6 +12,7 @@ from pymavlink import mavutil
 from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
+from modules.telemetry import telemetry_codec
 from modules.telemetry import telemetry_worker
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
@@ -29,6 +30,8 @@ NUM_FAILS = 3
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
 # Add your own constants here
+# Pair messages as they arrive rather than fusing them, so each message gives one reading
+TELEMETRY_OUTPUT_PERIOD = 0  # ms
 
 # =================================================================================================
 #                            ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
@@ -66,7 +69,7 @@ def read_queue(
     """
     while not controller.is_exit_requested():
         try:
-            data = output_queue.queue.get(timeout=1)
+            data = telemetry_codec.unpack(output_queue.queue.get(timeout=1))
             main_logger.info(f"Received data from queue: {data}")
         except queue.Empty:
             continue
@@ -135,7 +138,9 @@ def main() -> int:
         target=read_queue, args=(telemetry_to_command, main_logger, controller)
     ).start()
 
-    telemetry_worker.telemetry_worker(connection, controller, telemetry_to_command)
+    telemetry_worker.telemetry_worker(
+        connection, 1, TELEMETRY_OUTPUT_PERIOD, telemetry_to_command, controller
+    )
 
     # =============================================================================================
     #                          ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
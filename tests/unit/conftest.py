@@ -0,0 +1,25 @@
+"""
+Fixtures shared by the unit tests.
+"""
+
+import pytest
+
+
+class FakeClock:
+    """
+    Time that only moves when the test advances it.
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock() -> FakeClock:  # type: ignore
+    """
+    Clock starting at 0 .
+    """
+    yield FakeClock()  # type: ignore
@@ -0,0 +1,107 @@
+"""
+Test batched put and get.
+"""
+
+import queue
+
+import pytest
+
+from utilities.workers import batch_queue
+from utilities.workers import queue_proxy_wrapper
+
+
+class TestBatchQueue:
+    """
+    Batches respect maxsize.
+    """
+
+    def test_put_many_get_many(self) -> None:
+        """
+        A batch goes in and comes out in order, get_many stops at max_items.
+        """
+        # Setup
+        instance = batch_queue.BatchQueue(5)
+
+        # Run
+        instance.put_many([1, 2, 3, 4])
+        first = instance.get_many(3)
+        second = instance.get_many(3)
+
+        # Test
+        assert first == [1, 2, 3]
+        assert second == [4]
+
+    def test_put_many_is_atomic(self) -> None:
+        """
+        A batch that does not fit is not partially put.
+        """
+        # Setup
+        instance = batch_queue.BatchQueue(3)
+        instance.put_many([1, 2])
+
+        # Run
+        with pytest.raises(queue.Full):
+            instance.put_many([3, 4], timeout=0.01)
+
+        # Test
+        assert instance.qsize() == 2
+
+    def test_batch_larger_than_maxsize(self) -> None:
+        """
+        A batch that can never fit is rejected.
+        """
+        instance = batch_queue.BatchQueue(2)
+
+        with pytest.raises(ValueError):
+            instance.put_many([1, 2, 3])
+
+    def test_get_many_empty(self) -> None:
+        """
+        Getting from an empty queue times out.
+        """
+        instance = batch_queue.BatchQueue(2)
+
+        with pytest.raises(queue.Empty):
+            instance.get_many(2, timeout=0.01)
+
+
+class TestQueueProxyWrapperBatches:
+    """
+    Wrapper splits batches by maxsize for every backend.
+    """
+
+    def test_manager_backend(self) -> None:
+        """
+        Batch larger than maxsize is split into batches that fit.
+        """
+        with batch_queue.BatchQueueManager() as manager:
+            # Setup
+            wrapper = queue_proxy_wrapper.QueueProxyWrapper(manager, 2)
+            items = []
+
+            # Run
+            wrapper.put_many([1, 2])
+            items += wrapper.get_many(5, timeout=1)
+            wrapper.put_many([3])
+            items += wrapper.get_many(5, timeout=1)
+
+        # Test
+        assert items == [1, 2, 3]
+
+    def test_shared_memory_backend(self) -> None:
+        """
+        Same semantics as the manager backend.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 3, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        )
+
+        # Run
+        wrapper.put_many([1, 2, 3])
+        actual = wrapper.get_many(2, timeout=1)
+
+        # Test
+        assert actual == [1, 2]
+        assert wrapper.get_many(2, timeout=1) == [3]
+        wrapper.close()
@@ -0,0 +1,259 @@
+"""
+Test decisions and commands sent from telemetry.
+"""
+
+import math
+import time
+
+import pytest
+from pymavlink import mavutil
+
+from modules.command import command
+from modules.common.modules.logger import logger
+from modules.mavlink_router import mavlink_connection_handle
+from modules.telemetry import telemetry
+from modules.telemetry import telemetry_codec
+from utilities.workers import queue_proxy_wrapper
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+TARGET = command.Position(10.0, 0.0, 30.0)
+# Short enough that a retry is due on the next run
+ACK_TIMEOUT = 0.01  # seconds
+
+
+@pytest.fixture()
+def send_queue() -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Queue of the packets the command sends, freed afterwards.
+    """
+    instance = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 64, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+    )
+    yield instance  # type: ignore
+    instance.close()
+
+
+@pytest.fixture()
+def receive_queue() -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Queue of the acknowledgements the router passes to the command, freed afterwards.
+    """
+    instance = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+    )
+    yield instance  # type: ignore
+    instance.close()
+
+
+def create_command(
+    send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    receive_queue: queue_proxy_wrapper.QueueProxyWrapper,
+) -> command.Command:
+    """
+    Returns a command flying to TARGET through a connection handle.
+    """
+    result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+        send_queue, receive_queue, ["COMMAND_ACK"]
+    )
+    assert result
+    assert handle is not None
+    result, local_logger = logger.Logger.create("test_command", False)
+    assert result
+    assert local_logger is not None
+    result, instance = command.Command.create(handle, TARGET, local_logger)
+    assert result
+    assert instance is not None
+    return instance
+
+
+@pytest.fixture()
+def command_object(
+    send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    receive_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    monkeypatch: pytest.MonkeyPatch,
+) -> command.Command:  # type: ignore
+    """
+    Command flying to TARGET.
+    """
+    monkeypatch.setattr(command, "COMMAND_ACK_TIMEOUT", ACK_TIMEOUT)
+    yield create_command(send_queue, receive_queue)  # type: ignore
+
+
+def reading(yaw: float, z: float = TARGET.z) -> telemetry.TelemetryData:
+    """
+    Returns a reading 10 m from the target, at the target altitude by default.
+    """
+    return telemetry.TelemetryData(
+        time_since_boot=0,
+        x=0.0,
+        y=0.0,
+        z=z,
+        x_velocity=0.0,
+        y_velocity=0.0,
+        z_velocity=0.0,
+        yaw=yaw,
+    )
+
+
+def take_commands(
+    send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+) -> "list[mavutil.mavlink.MAVLink_command_long_message]":
+    """
+    Returns the commands sent so far.
+    """
+    parser = mavutil.mavlink.MAVLink(None)
+    messages = []
+    while not send_queue.queue.empty():
+        messages.append(parser.decode(bytearray(send_queue.queue.get_nowait())))
+
+    return messages
+
+
+def readings_near_tolerances() -> "list[telemetry.TelemetryData]":
+    """
+    Returns readings on either side of the altitude and yaw tolerances, some without velocities.
+    """
+    readings = []
+    for i, offset in enumerate([-1e-9, 0.0, 1e-9, -1e-6, 1e-6]):
+        x = -5.0 * i
+        y = 3.0 - 2.0 * i
+        # Bearing to the target, off by the yaw tolerance plus the offset
+        bearing = math.atan2(TARGET.y - y, TARGET.x - x)
+        for sign in (1.0, -1.0):
+            velocity = None if i % 2 == 0 else 1.0 + i
+            readings.append(
+                telemetry.TelemetryData(
+                    time_since_boot=len(readings),
+                    x=x,
+                    y=y,
+                    z=TARGET.z,
+                    x_velocity=velocity,
+                    y_velocity=0.1 * i,
+                    z_velocity=velocity,
+                    yaw=bearing - sign * math.radians(command.YAW_TOLERANCE + offset),
+                )
+            )
+
+        readings.append(
+            telemetry.TelemetryData(
+                time_since_boot=len(readings),
+                x=x,
+                y=y,
+                z=TARGET.z - command.ALTITUDE_TOLERANCE - offset,
+                x_velocity=0.5,
+                y_velocity=None,
+                z_velocity=-0.5,
+                yaw=bearing,
+            )
+        )
+
+    return readings
+
+
+def encode_ack(command_id: int) -> bytes:
+    """
+    Returns an accepting COMMAND_ACK packet as the drone would send it.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+    message = encoder.command_ack_encode(command_id, mavutil.mavlink.MAV_RESULT_ACCEPTED)
+    return bytes(message.pack(encoder))
+
+
+class TestCommand:
+    """
+    Turns toward the target and measures acknowledgements.
+    """
+
+    def test_batch_same_as_each_reading(
+        self,
+        send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        receive_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    ) -> None:
+        """
+        A batch decides the same as running each reading, right at the tolerances
+        and with missing velocities, whether its readings were packed or not.
+        """
+        # Setup
+        readings = readings_near_tolerances()
+        packed = [telemetry_codec.pack(reading) for reading in readings]
+        # Every other reading is already unpacked
+        mixed = [item if i % 2 == 0 else readings[i] for i, item in enumerate(packed)]
+        each_object = create_command(send_queue, receive_queue)
+        packed_object = create_command(send_queue, receive_queue)
+        mixed_object = create_command(send_queue, receive_queue)
+
+        # Run
+        each_decisions = [each_object.run(reading) for reading in readings]
+        packed_decisions = packed_object.run_batch(telemetry_codec.unpack_batch(packed))
+        mixed_decisions = mixed_object.run_batch(telemetry_codec.unpack_batch(mixed))
+
+        # Test
+        assert any(decision is None for decision in each_decisions)
+        assert any(decision is not None for decision in each_decisions)
+        assert packed_decisions == each_decisions
+        assert mixed_decisions == each_decisions
+        for batch_object in (packed_object, mixed_object):
+            assert batch_object.runcount == each_object.runcount
+            assert batch_object.total_velocity.x == each_object.total_velocity.x
+            assert batch_object.total_velocity.y == each_object.total_velocity.y
+            assert batch_object.total_velocity.z == each_object.total_velocity.z
+
+    def test_ack_latency_to_receive_time(
+        self,
+        command_object: command.Command,
+        receive_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    ) -> None:
+        """
+        Latency is to when the router received the acknowledgement, not to the next run.
+        """
+        # Setup
+        altitude = mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT
+        command_object.run(reading(0.0, TARGET.z - 10.0))
+        receive_queue.queue.put((time.monotonic(), encode_ack(altitude)))
+        delay = 0.2  # seconds
+        time.sleep(delay)
+
+        # Run
+        command_object.run(reading(0.0))
+
+        # Test
+        stats = command_object.get_command_stats()[altitude]
+        assert stats.ack_count == 1
+        assert stats.mean_latency < delay / 2
+
+    def test_yaw_retry_uses_latest_heading(
+        self,
+        command_object: command.Command,
+        send_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    ) -> None:
+        """
+        A turn made with its acknowledgement lost is not made again by the retry.
+        """
+        # Setup
+        # Facing 90 degrees left of the target
+        decision = command_object.run(reading(math.radians(90.0)))
+
+        # Run
+        # Turned, but the acknowledgement never arrives
+        command_object.run(reading(math.radians(2.0)))
+        first_turn = take_commands(send_queue)[0]
+        # Retried on the first run after the timeout
+        time.sleep(ACK_TIMEOUT * 2)
+        command_object.run(reading(math.radians(2.0)))
+        retries = take_commands(send_queue)
+
+        # Test
+        assert decision.startswith("CHANGE YAW")
+        assert first_turn.confirmation == 0
+        assert first_turn.param1 == pytest.approx(90.0)
+        assert first_turn.param3 == -1
+        assert len(retries) == 1
+        retry = retries[0]
+        assert retry.confirmation == 1
+        assert retry.param1 == pytest.approx(2.0)
+        assert retry.param3 == -1
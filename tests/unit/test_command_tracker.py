@@ -0,0 +1,149 @@
+"""
+Test tracking commands until they are acknowledged.
+"""
+
+import pytest
+from pymavlink import mavutil
+
+from utilities.mavlink import command_tracker
+from .conftest import FakeClock
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+TIMEOUT = 1.0
+
+
+@pytest.fixture()
+def tracker(clock: FakeClock) -> command_tracker.CommandTracker:  # type: ignore
+    """
+    Tracker giving up after 3 transmissions.
+    """
+    yield command_tracker.CommandTracker(TIMEOUT, 3, 2.0, clock)  # type: ignore
+
+
+def make_ack(command: int, result: int) -> mavutil.mavlink.MAVLink_command_ack_message:
+    """
+    Returns an acknowledgement of the command.
+    """
+    return mavutil.mavlink.MAVLink_command_ack_message(command, result)
+
+
+class TestCommandTracker:
+    """
+    Duplicates, acknowledgements, and retries.
+    """
+
+    def test_suppresses_duplicates_until_ack(
+        self, clock: FakeClock, tracker: command_tracker.CommandTracker
+    ) -> None:
+        """
+        A matching command is not sent while one is in flight, and is sent after the ack.
+        """
+        # Setup
+        sent = []
+        yaw = mavutil.mavlink.MAV_CMD_CONDITION_YAW
+
+        # Run
+        first = tracker.send(yaw, (10, 20), sent.append)
+        duplicate = tracker.send(yaw, (10, 20), sent.append)
+        other_target = tracker.send(yaw, (30, 40), sent.append)
+        clock.now = 0.25
+        is_matched = tracker.handle_ack(make_ack(yaw, mavutil.mavlink.MAV_RESULT_ACCEPTED))
+        after_ack = tracker.send(yaw, (30, 40), sent.append)
+
+        # Test
+        assert (first, duplicate, other_target) == (True, False, True)
+        assert is_matched
+        # Ack completed the oldest, so the other target is still in flight
+        assert not after_ack
+        assert tracker.in_flight_count() == 1
+        stats = tracker.get_stats()[yaw]
+        assert stats.ack_count == 1
+        assert stats.mean_latency == 0.25
+        assert stats.suppressed_count == 2
+        assert sent == [0, 0]
+
+    def test_retries_with_backoff_then_gives_up(
+        self, clock: FakeClock, tracker: command_tracker.CommandTracker
+    ) -> None:
+        """
+        Retries count up the confirmation and wait twice as long each time.
+        """
+        # Setup
+        sent = []
+        altitude = mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT
+        tracker.send(altitude, (30,), sent.append)
+
+        # Run
+        retries = []
+        for now in (0.5, 1.0, 2.5, 3.0, 6.0, 7.0):
+            clock.now = now
+            retries.append(tracker.check_timeouts())
+
+        # Test
+        assert retries == [0, 1, 0, 1, 0, 0]
+        assert sent == [0, 1, 2]
+        stats = tracker.get_stats()[altitude]
+        assert stats.retry_count == 2
+        assert stats.failed_count == 1
+        assert tracker.in_flight_count() == 0
+
+    def test_in_progress_keeps_command_in_flight(
+        self, clock: FakeClock, tracker: command_tracker.CommandTracker
+    ) -> None:
+        """
+        In progress acknowledgements restart the wait without completing the command.
+        """
+        # Setup
+        sent = []
+        altitude = mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT
+        tracker.send(altitude, (30,), sent.append)
+
+        # Run
+        clock.now = 0.9
+        tracker.handle_ack(make_ack(altitude, mavutil.mavlink.MAV_RESULT_IN_PROGRESS))
+        clock.now = 1.5
+        retried = tracker.check_timeouts()
+        is_unknown_matched = tracker.handle_ack(
+            make_ack(mavutil.mavlink.MAV_CMD_CONDITION_YAW, mavutil.mavlink.MAV_RESULT_ACCEPTED)
+        )
+
+        # Test
+        assert retried == 0
+        assert not is_unknown_matched
+        assert tracker.in_flight_count() == 1
+        assert sent == [0]
+
+    def test_refused_counts_as_failed(
+        self, clock: FakeClock, tracker: command_tracker.CommandTracker
+    ) -> None:
+        """
+        Denied, failed, and unsupported commands complete without a latency.
+        """
+        # Setup
+        altitude = mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT
+        results = [
+            mavutil.mavlink.MAV_RESULT_DENIED,
+            mavutil.mavlink.MAV_RESULT_FAILED,
+            mavutil.mavlink.MAV_RESULT_UNSUPPORTED,
+        ]
+
+        # Run
+        is_matched = []
+        for i, result in enumerate(results):
+            tracker.send(altitude, (i,), lambda confirmation: None)
+            clock.now += 0.5
+            is_matched.append(tracker.handle_ack(make_ack(altitude, result)))
+
+        # Test
+        assert all(is_matched)
+        assert tracker.in_flight_count() == 0
+        stats = tracker.get_stats()[altitude]
+        assert stats.failed_count == len(results)
+        assert stats.ack_count == 0
+        assert stats.mean_latency == 0.0
+        assert stats.max_latency == 0.0
@@ -0,0 +1,156 @@
+"""
+Test deciding the connection from heartbeats.
+"""
+
+import time
+
+import pytest
+from pymavlink import mavutil
+
+from modules.heartbeat import heartbeat_receiver
+from modules.mavlink_router import mavlink_connection_handle
+from utilities.workers import queue_proxy_wrapper
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+# Short periods, so disconnections happen quickly
+HEARTBEAT_PERIOD = 0.05  # seconds
+THRESHOLD = 2
+VEHICLE_SYSTEM_ID = 1
+GROUND_SYSTEM_ID = 255
+
+
+@pytest.fixture()
+def receive_queue() -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Queue of the heartbeats the router passes to the receiver, freed afterwards.
+    """
+    instance = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+    )
+    yield instance  # type: ignore
+    instance.close()
+
+
+@pytest.fixture()
+def receiver(
+    receive_queue: queue_proxy_wrapper.QueueProxyWrapper, monkeypatch: pytest.MonkeyPatch
+) -> heartbeat_receiver.HeartbeatReceiver:  # type: ignore
+    """
+    Receiver of the vehicle heartbeats, through a connection handle.
+    """
+    monkeypatch.setattr(heartbeat_receiver, "HEARTBEAT_PERIOD", HEARTBEAT_PERIOD)
+    send_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+    )
+    result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+        send_queue, receive_queue, ["HEARTBEAT"]
+    )
+    assert result
+    assert handle is not None
+    result, instance = heartbeat_receiver.HeartbeatReceiver.create(
+        handle, THRESHOLD, VEHICLE_SYSTEM_ID
+    )
+    assert result
+    assert instance is not None
+    yield instance  # type: ignore
+    send_queue.close()
+
+
+def encode_heartbeat(system: int) -> bytes:
+    """
+    Returns a heartbeat packet of the system.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, system, 1)
+    message = encoder.heartbeat_encode(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+    )
+    return bytes(message.pack(encoder))
+
+
+def run_until(receiver: heartbeat_receiver.HeartbeatReceiver, deadline: float) -> bool:
+    """
+    Runs the receiver until the deadline, returns whether it was connected after the last run.
+    """
+    is_connected = False
+    while time.monotonic() < deadline:
+        is_connected = receiver.run()
+
+    return is_connected
+
+
+class TestHeartbeatReceiver:
+    """
+    Only the vehicle decides the connection.
+    """
+
+    def test_other_systems_do_not_connect(
+        self,
+        receiver: heartbeat_receiver.HeartbeatReceiver,
+        receive_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    ) -> None:
+        """
+        Heartbeats of another system are reported, but the vehicle is disconnected without its own.
+        """
+        # Setup
+        # Past the time the vehicle has for its first heartbeat
+        deadline = time.monotonic() + 1.5 * THRESHOLD * HEARTBEAT_PERIOD
+
+        # Run
+        receive_queue.queue.put((0.0, encode_heartbeat(GROUND_SYSTEM_ID)))
+        is_connected_without_vehicle = receiver.run()
+        connected_without_vehicle = receiver.get_connected()
+        is_connected_after_deadline = run_until(receiver, deadline)
+        receive_queue.queue.put((0.0, encode_heartbeat(VEHICLE_SYSTEM_ID)))
+        is_connected_with_vehicle = receiver.run()
+
+        # Test
+        # Not yet disconnected before the first deadline
+        assert is_connected_without_vehicle
+        assert connected_without_vehicle == [(GROUND_SYSTEM_ID, 1)]
+        assert not is_connected_after_deadline
+        assert is_connected_with_vehicle
+        assert (VEHICLE_SYSTEM_ID, 1) in receiver.get_connected()
+
+    def test_vehicle_disconnects_while_others_remain(
+        self,
+        receiver: heartbeat_receiver.HeartbeatReceiver,
+        receive_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    ) -> None:
+        """
+        The vehicle is disconnected after the threshold, even while another system is alive.
+        """
+        # Setup
+        receive_queue.queue.put((0.0, encode_heartbeat(VEHICLE_SYSTEM_ID)))
+        is_connected = receiver.run()
+        deadline = time.monotonic() + 1.5 * THRESHOLD * HEARTBEAT_PERIOD
+
+        # Run
+        is_still_connected = True
+        while time.monotonic() < deadline:
+            receive_queue.queue.put((0.0, encode_heartbeat(GROUND_SYSTEM_ID)))
+            is_still_connected = receiver.run()
+
+        # Test
+        assert is_connected
+        assert not is_still_connected
+        assert receiver.get_connected() == [(GROUND_SYSTEM_ID, 1)]
+
+    def test_summaries_readable_in_list(self) -> None:
+        """
+        Summaries show their statistics when the list of them is formatted.
+        """
+        # Setup
+        summary = heartbeat_receiver.LinkSummary(VEHICLE_SYSTEM_ID, 1, 9, 0.9, 1.0, 1.2, 0.05, 1)
+
+        # Run
+        formatted = f"{[summary]}"
+
+        # Test
+        assert formatted == f"[{summary}]"
+        assert "min 0.900 s mean 1.000 s max 1.200 s, jitter 50.0 ms" in formatted
+        assert "1 missed (10.0% loss)" in formatted
@@ -0,0 +1,133 @@
+"""
+Test the latest value mailbox.
+"""
+
+import multiprocessing as mp
+import queue
+
+import pytest
+
+from utilities.workers import latest_value_mailbox
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture()
+def mailbox() -> latest_value_mailbox.LatestValueMailbox:  # type: ignore
+    """
+    Creates a mailbox with 2 keys and frees it afterwards.
+    """
+    instance = latest_value_mailbox.LatestValueMailbox(2, 256)
+    yield instance  # type: ignore
+    instance.close()
+    instance.unlink()
+
+
+def put_alternating(mailbox: latest_value_mailbox.LatestValueMailbox, count: int) -> None:
+    """
+    Writer process for the peek test, items of different lengths so a torn read breaks unpickling.
+    """
+    for i in range(count):
+        mailbox.put(i if i % 2 == 0 else ("long", i, bytes(200)))
+
+
+class TestLatestValueMailbox:
+    """
+    Only the newest item of each key is kept.
+    """
+
+    def test_conflates(self, mailbox: latest_value_mailbox.LatestValueMailbox) -> None:
+        """
+        Get returns the newest item and counts the overwritten ones.
+        """
+        # Setup
+        for i in range(5):
+            mailbox.put(i)
+
+        # Run
+        sequence, item, overwritten = mailbox.get_latest()
+
+        # Test
+        assert sequence == 5
+        assert item == 4
+        assert overwritten == 4
+        assert mailbox.overwritten_count() == 4
+        assert mailbox.empty()
+
+    def test_consumed_once(self, mailbox: latest_value_mailbox.LatestValueMailbox) -> None:
+        """
+        An item is not returned by get twice.
+        """
+        # Setup
+        mailbox.put("a")
+        _ = mailbox.get()
+
+        # Run and test
+        with pytest.raises(queue.Empty):
+            mailbox.get(timeout=0.01)
+
+        mailbox.put("b")
+        sequence, item, overwritten = mailbox.get_latest(block=False)
+        assert (sequence, item, overwritten) == (2, "b", 0)
+
+    def test_peek(self, mailbox: latest_value_mailbox.LatestValueMailbox) -> None:
+        """
+        Peek reads without consuming.
+        """
+        # Setup
+        assert mailbox.peek() == (0, None)
+        mailbox.put({"yaw": 1.0})
+
+        # Run
+        actual = mailbox.peek()
+
+        # Test
+        assert actual == (1, {"yaw": 1.0})
+        assert mailbox.qsize() == 1
+        assert mailbox.get_nowait() == {"yaw": 1.0}
+
+    def test_keys_independent(self, mailbox: latest_value_mailbox.LatestValueMailbox) -> None:
+        """
+        Each key keeps its own item and sequence.
+        """
+        # Setup
+        mailbox.put("first", key=0)
+        mailbox.put("second", key=1)
+        mailbox.put("third", key=1)
+
+        # Run
+        first = mailbox.get_latest(key=0)
+        second = mailbox.get_latest(key=1)
+
+        # Test
+        assert first == (1, "first", 0)
+        assert second == (2, "third", 1)
+
+    def test_peek_while_writing(self, mailbox: latest_value_mailbox.LatestValueMailbox) -> None:
+        """
+        Peeking while another process writes only returns whole items, in order.
+        """
+        # Setup
+        count = 20000
+        writer = mp.Process(target=put_alternating, args=(mailbox, count))
+
+        # Run
+        sequences = []
+        writer.start()
+        while writer.is_alive() or not sequences or sequences[-1] < count:
+            sequence, item = mailbox.peek()
+            if sequence == 0:
+                continue
+
+            # Test
+            expected = sequence - 1 if sequence % 2 == 1 else ("long", sequence - 1, bytes(200))
+            assert item == expected
+            sequences.append(sequence)
+
+        writer.join()
+
+        assert writer.exitcode == 0
+        assert sequences == sorted(sequences)
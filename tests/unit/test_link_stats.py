@@ -0,0 +1,145 @@
+"""
+Test link statistics from MAVLink packet headers.
+"""
+
+import multiprocessing as mp
+
+from pymavlink import mavutil
+
+from utilities.mavlink import link_stats
+from utilities.mavlink import message_dispatcher
+
+
+# Arrival times in nanoseconds, after the first arrival of every message ID
+START_TIME = 10**12  # ns
+
+
+def encode_heartbeat(encoder: mavutil.mavlink.MAVLink, sequence: int) -> bytes:
+    """
+    Returns a heartbeat packet with the sequence number.
+    """
+    encoder.seq = sequence
+    message = encoder.heartbeat_encode(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+    )
+    return bytes(message.pack(encoder))
+
+
+def encode_attitude(encoder: mavutil.mavlink.MAVLink, sequence: int) -> bytes:
+    """
+    Returns an attitude packet with the sequence number.
+    """
+    encoder.seq = sequence
+    message = encoder.attitude_encode(sequence, 0.1, 0.2, 0.3, 0.0, 0.0, 0.0)
+    return bytes(message.pack(encoder))
+
+
+def record_heartbeats(stats: link_stats.LinkStats, count: int) -> None:
+    """
+    Recording process for the multiprocess test, sequence numbers wrap past 255 .
+    """
+    dispatcher = message_dispatcher.MessageDispatcher()
+    dispatcher.observe(stats.record)
+    encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+    for sequence in range(count):
+        dispatcher.feed(encode_heartbeat(encoder, sequence % 256))
+
+    stats.publish()
+
+
+class TestLinkStats:
+    """
+    Sequence numbers, message counts, and intervals.
+    """
+
+    def test_drops_and_reordering(self) -> None:
+        """
+        Gaps are dropped packets until they arrive late, across the sequence number wrapping.
+        """
+        # Setup
+        stats = link_stats.LinkStats()
+        dispatcher = message_dispatcher.MessageDispatcher()
+        dispatcher.observe(stats.record)
+        drone = mavutil.mavlink.MAVLink(None, 1, 1)
+        camera = mavutil.mavlink.MAVLink(None, 1, 100)
+        # 252 to 260 wrapped, 255 late and 258 lost
+        drone_sequences = [252, 253, 254, 0, 255, 1, 3, 4]
+
+        # Run
+        # Several packets in one read, then one with the start of the next
+        dispatcher.feed(b"".join(encode_heartbeat(drone, sequence) for sequence in drone_sequences))
+        split_attitude = encode_attitude(camera, 9)
+        dispatcher.feed(encode_attitude(camera, 7) + split_attitude[:5])
+        dispatcher.feed(split_attitude[5:])
+        # Unchanged until published
+        unpublished = stats.snapshot()
+        stats.publish()
+        snapshot = stats.snapshot()
+
+        # Test
+        assert len(unpublished.sources) == 0
+        drone_stats, camera_stats = snapshot.sources
+        assert (drone_stats.system, drone_stats.component) == (1, 1)
+        assert drone_stats.received_count == len(drone_sequences)
+        assert drone_stats.dropped_count == 1
+        assert drone_stats.reordered_count == 1
+        assert (camera_stats.system, camera_stats.component) == (1, 100)
+        assert camera_stats.received_count == 2
+        assert camera_stats.dropped_count == 1
+        assert camera_stats.loss_rate == 1 / 3
+
+    def test_message_counts_and_intervals(self) -> None:
+        """
+        Packets and bytes are counted by message ID, intervals in power of 2 microsecond buckets.
+        IDs past the table are counted as untracked.
+        """
+        # Setup
+        stats = link_stats.LinkStats(message_slot_count=1)
+        encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+        heartbeat = bytearray(encode_heartbeat(encoder, 0))
+        attitude = bytearray(encode_attitude(encoder, 1))
+
+        # Run
+        # 3 us then 1000 us between heartbeats, one kept to the next publish
+        stats.record(heartbeat, [0], START_TIME)
+        stats.record(heartbeat + attitude, [0, len(heartbeat)], START_TIME + 3000)
+        stats.publish(START_TIME + 3000)
+        stats.record(heartbeat, [0], START_TIME + 1003000)
+        stats.publish(START_TIME + 1003000)
+        snapshot = stats.snapshot()
+
+        # Test
+        (message,) = snapshot.messages
+        assert message.message_id == mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT
+        assert message.name == "HEARTBEAT"
+        assert message.count == 3
+        assert message.byte_count == 3 * len(heartbeat)
+        assert snapshot.byte_count == 3 * len(heartbeat)
+        assert snapshot.untracked_count == 1
+        buckets = message.interval_histogram.buckets
+        assert message.interval_histogram.count == 2
+        assert buckets[2] == 1  # [2, 4) us
+        assert buckets[10] == 1  # [512, 1024) us
+
+    def test_other_process(self) -> None:
+        """
+        Statistics recorded by another process are visible after it publishes.
+        """
+        # Setup
+        count = 300
+        stats = link_stats.LinkStats()
+
+        # Run
+        recorder = mp.Process(target=record_heartbeats, args=(stats, count))
+        recorder.start()
+        recorder.join()
+        snapshot = stats.snapshot()
+
+        # Test
+        assert recorder.exitcode == 0
+        (source,) = snapshot.sources
+        assert source.received_count == count
+        assert source.dropped_count == 0
+        assert source.reordered_count == 0
+        assert snapshot.packet_count == count
+        assert snapshot.elapsed > 0.0
@@ -0,0 +1,97 @@
+"""
+Test tracking heartbeat liveness by deadline.
+"""
+
+import pytest
+
+from utilities.mavlink import liveness_tracker
+from .conftest import FakeClock
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+TIMEOUT = 5.0  # seconds
+
+
+@pytest.fixture()
+def tracker(clock: FakeClock) -> liveness_tracker.LivenessTracker:  # type: ignore
+    """
+    Systems expire 5 s after their last heartbeat.
+    """
+    yield liveness_tracker.LivenessTracker(TIMEOUT, clock)  # type: ignore
+
+
+class TestLivenessTracker:
+    """
+    Heartbeats keep systems alive until their deadline.
+    """
+
+    def test_expires_by_deadline(
+        self, clock: FakeClock, tracker: liveness_tracker.LivenessTracker
+    ) -> None:
+        """
+        Only systems without a heartbeat for the timeout expire, oldest first.
+        """
+        # Setup
+        is_new = [tracker.record(1, 0), tracker.record(2, 0), tracker.record(3, 1)]
+        clock.now = 3.0
+        is_new.append(tracker.record(1, 0))
+
+        # Run
+        clock.now = 4.9
+        expired_early = tracker.expire()
+        clock.now = 5.0
+        expired = tracker.expire()
+
+        # Test
+        assert is_new == [True, True, True, False]
+        assert not expired_early
+        assert expired == [(2, 0), (3, 1)]
+        assert tracker.get_alive() == [(1, 0)]
+        assert tracker.next_deadline() == 3.0 + TIMEOUT
+
+    def test_reconnect_after_expiry(
+        self, clock: FakeClock, tracker: liveness_tracker.LivenessTracker
+    ) -> None:
+        """
+        A system is dead at its deadline even before expiring, and new again after it.
+        """
+        # Setup
+        tracker.record(1, 0)
+        clock.now = 6.0
+
+        # Run
+        is_alive_before_expire = tracker.is_alive(1, 0)
+        expired = tracker.expire()
+        is_new = tracker.record(1, 0)
+
+        # Test
+        assert not is_alive_before_expire
+        assert expired == [(1, 0)]
+        assert is_new
+        assert tracker.is_alive(1, 0)
+        assert tracker.last_seen(1, 0) == 6.0
+        assert tracker.last_seen(2, 0) is None
+
+    def test_many_systems(
+        self, clock: FakeClock, tracker: liveness_tracker.LivenessTracker
+    ) -> None:
+        """
+        Hundreds of systems with interleaved heartbeats expire in deadline order.
+        """
+        # Setup
+        for system in range(500):
+            clock.now = system * 0.01
+            tracker.record(system % 250, system // 250)
+
+        # Run
+        clock.now = 2.495 + TIMEOUT
+        expired = tracker.expire()
+
+        # Test
+        assert expired == [(system, 0) for system in range(250)]
+        assert len(tracker) == 250
+        assert tracker.next_deadline() == pytest.approx(2.5 + TIMEOUT)
@@ -0,0 +1,149 @@
+"""
+Test sending and receiving through a connection handle.
+"""
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import mavlink_connection_handle
+from utilities.workers import queue_proxy_wrapper
+
+
+def create_queue() -> queue_proxy_wrapper.QueueProxyWrapper:
+    """
+    Creates a small shared memory queue.
+    """
+    return queue_proxy_wrapper.QueueProxyWrapper(
+        None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+    )
+
+
+def encode_heartbeat() -> bytes:
+    """
+    Returns a heartbeat packet as the drone would send it.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+    message = encoder.heartbeat_encode(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+    )
+    return bytes(message.pack(encoder))
+
+
+class TestMavlinkConnectionHandle:
+    """
+    Handle stands in for the connection in workers.
+    """
+
+    def test_send_goes_to_send_queue(self) -> None:
+        """
+        Sent messages are packets in the send queue.
+        """
+        # Setup
+        send_queue = create_queue()
+        result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+            send_queue, None, []
+        )
+        assert result
+        assert handle is not None
+
+        # Run
+        handle.mav.heartbeat_send(
+            mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+        )
+        packet = send_queue.queue.get(timeout=1)
+
+        # Test
+        message = mavutil.mavlink.MAVLink(None).parse_char(packet)
+        assert message.get_type() == "HEARTBEAT"
+        assert message.get_srcSystem() == 255
+        send_queue.close()
+
+    def test_receive_filters_by_type(self) -> None:
+        """
+        Messages of other types are skipped, and an empty queue times out.
+        """
+        # Setup
+        send_queue = create_queue()
+        receive_queue = create_queue()
+        result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+            send_queue, receive_queue, ["HEARTBEAT"]
+        )
+        assert result
+        assert handle is not None
+        receive_queue.queue.put((0.0, encode_heartbeat()))
+
+        # Run
+        skipped = handle.recv_match(type="ATTITUDE", blocking=False)
+        receive_queue.queue.put((0.0, encode_heartbeat()))
+        received = handle.recv_match(type=["HEARTBEAT"], blocking=True, timeout=1)
+        timed_out = handle.recv_match(blocking=True, timeout=0.01)
+
+        # Test
+        assert skipped is None
+        assert received.get_type() == "HEARTBEAT"
+        assert timed_out is None
+        send_queue.close()
+        receive_queue.close()
+
+    def test_receive_with_time(self) -> None:
+        """
+        Packets are returned with the time the router received them, in order.
+        """
+        # Setup
+        send_queue = create_queue()
+        receive_queue = create_queue()
+        result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+            send_queue, receive_queue, ["HEARTBEAT"]
+        )
+        assert result
+        assert handle is not None
+        heartbeat = encode_heartbeat()
+        receive_queue.queue.put((1.0, heartbeat))
+        receive_queue.queue.put((2.0, heartbeat))
+
+        # Run
+        is_selected = handle.select(1.0)
+        received = handle.recv_timed()
+        receive_queue.queue.put((3.0, heartbeat))
+        data = handle.recv()
+
+        # Test
+        assert is_selected
+        assert received == [(1.0, heartbeat), (2.0, heartbeat)]
+        assert data == heartbeat
+        send_queue.close()
+        receive_queue.close()
+
+    def test_unknown_type(self) -> None:
+        """
+        Subscribing to a message that does not exist fails.
+        """
+        send_queue = create_queue()
+
+        result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+            send_queue, create_queue(), ["NOT_A_MESSAGE"]
+        )
+
+        assert not result
+        assert handle is None
+        send_queue.close()
+
+    def test_state_after_use(self) -> None:
+        """
+        Handle sent to a worker process after it has been used does not carry MAVLink objects.
+        """
+        # Setup
+        send_queue = create_queue()
+        result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+            send_queue, None, []
+        )
+        assert result
+        assert handle is not None
+        handle.mav.srcSystem = 255
+
+        # Run
+        state = handle.__getstate__()
+
+        # Test
+        assert state["_MavlinkConnectionHandle__mav"] is None
+        assert handle.mav.srcSystem == 255
+        send_queue.close()
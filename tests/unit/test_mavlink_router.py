@@ -0,0 +1,96 @@
+"""
+Test routing received packets to the workers.
+"""
+
+from pymavlink import mavutil
+
+from modules.common.modules.logger import logger
+from modules.mavlink_router import mavlink_connection_handle
+from modules.mavlink_router import mavlink_router
+from utilities.workers import overflow_queue
+from utilities.workers import queue_proxy_wrapper
+
+
+class FakeConnection:
+    """
+    Connection returning the data it was given in one read.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self.__data = data
+
+    def select(self, timeout: float) -> bool:  # pylint: disable=unused-argument
+        """
+        Whether there is data to read.
+        """
+        return len(self.__data) > 0
+
+    def recv(self, size: int) -> bytes:
+        """
+        Returns at most size bytes of the data.
+        """
+        data = self.__data[:size]
+        self.__data = self.__data[size:]
+        return data
+
+
+def encode_heartbeats(count: int) -> bytes:
+    """
+    Returns heartbeat packets as the drone would send them.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+    message = encoder.heartbeat_encode(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+    )
+    return b"".join(bytes(message.pack(encoder)) for _ in range(count))
+
+
+def create_handle(
+    policy: overflow_queue.OverflowPolicy,
+) -> mavlink_connection_handle.MavlinkConnectionHandle:
+    """
+    Returns a handle receiving heartbeats into a queue of 2 with the overflow policy.
+    """
+    receive_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 2, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY, overflow_policy=policy
+    )
+    result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+        None, receive_queue, ["HEARTBEAT"]
+    )
+    assert result
+    assert handle is not None
+    return handle
+
+
+class TestMavlinkRouter:
+    """
+    Full receive queues drop packets without stalling the router.
+    """
+
+    def test_dropped_by_full_queues(self) -> None:
+        """
+        Packets dropped by an overflow policy and puts refused by a blocking queue are counted.
+        """
+        # Setup
+        handles = [
+            create_handle(overflow_queue.OverflowPolicy.DROP_OLDEST),
+            create_handle(overflow_queue.OverflowPolicy.BLOCK),
+        ]
+        result, local_logger = logger.Logger.create("test_mavlink_router", False)
+        assert result
+        assert local_logger is not None
+        result, router = mavlink_router.MavlinkRouter.create(
+            FakeConnection(encode_heartbeats(5)), handles, None, local_logger
+        )
+        assert result
+        assert router is not None
+
+        # Run
+        is_received = router.run(0.0)
+
+        # Test
+        assert is_received
+        # 3 of 5 heartbeats did not fit in each queue
+        assert router.get_dropped_count() == 6
+        for handle in handles:
+            handle.get_receive_queue().close()
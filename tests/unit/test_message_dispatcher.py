@@ -0,0 +1,124 @@
+"""
+Test dispatching MAVLink packets by message ID.
+"""
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import mavlink_connection_handle
+from utilities.mavlink import message_dispatcher
+from utilities.workers import queue_proxy_wrapper
+
+
+def encode_heartbeat(encoder: mavutil.mavlink.MAVLink) -> bytes:
+    """
+    Returns a heartbeat packet.
+    """
+    message = encoder.heartbeat_encode(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+    )
+    return bytes(message.pack(encoder))
+
+
+def encode_attitude(encoder: mavutil.mavlink.MAVLink, time_boot_ms: int) -> bytes:
+    """
+    Returns an attitude packet.
+    """
+    message = encoder.attitude_encode(time_boot_ms, 0.1, 0.2, 0.3, 0.0, 0.0, 0.0)
+    return bytes(message.pack(encoder))
+
+
+class TestMessageDispatcher:
+    """
+    Handlers are called by message ID.
+    """
+
+    def test_dispatch_by_id(self) -> None:
+        """
+        Only the handlers of the packet's ID are called, other IDs are skipped.
+        """
+        # Setup
+        encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+        dispatcher = message_dispatcher.MessageDispatcher()
+        heartbeats = []
+        dispatcher.subscribe(mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT, heartbeats.append)
+        heartbeat = encode_heartbeat(encoder)
+
+        # Run
+        dispatched_count = dispatcher.feed(heartbeat + encode_attitude(encoder, 1) + heartbeat)
+
+        # Test
+        assert dispatched_count == 2
+        assert heartbeats == [heartbeat, heartbeat]
+        assert dispatcher.skipped_count == 1
+
+    def test_split_packet_and_resynchronize(self) -> None:
+        """
+        Packets split across reads are dispatched once complete, garbage is skipped.
+        """
+        # Setup
+        dispatcher = message_dispatcher.MessageDispatcher()
+        attitudes = []
+        dispatcher.subscribe_decoded(mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, attitudes.append)
+        packet = encode_attitude(mavutil.mavlink.MAVLink(None, 1, 1), 42)
+
+        # Run
+        first_count = dispatcher.feed(b"\x00\x01" + packet[:5])
+        second_count = dispatcher.feed(packet[5:])
+
+        # Test
+        assert first_count == 0
+        assert second_count == 1
+        assert len(attitudes) == 1
+        assert attitudes[0].time_boot_ms == 42
+
+    def test_decoded_handler_rejects_bad_checksum(self) -> None:
+        """
+        Corrupted packets are counted instead of decoded.
+        """
+        # Setup
+        dispatcher = message_dispatcher.MessageDispatcher()
+        attitudes = []
+        dispatcher.subscribe_decoded(mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, attitudes.append)
+        packet = bytearray(encode_attitude(mavutil.mavlink.MAVLink(None, 1, 1), 1))
+        packet[-1] ^= 0xFF
+
+        # Run
+        dispatcher.feed(bytes(packet))
+
+        # Test
+        assert len(attitudes) == 0
+        assert dispatcher.invalid_count == 1
+
+    def test_recv_message_keeps_messages_received_together(self) -> None:
+        """
+        Messages of the waited for ID received in the same read are kept for the next call.
+        """
+        # Setup
+        receive_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        )
+        result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(
+            receive_queue, receive_queue, ["HEARTBEAT", "ATTITUDE"]
+        )
+        assert result
+        assert handle is not None
+
+        encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+        receive_queue.queue.put((0.0, encode_heartbeat(encoder)))
+        receive_queue.queue.put((0.0, encode_attitude(encoder, 7)))
+        receive_queue.queue.put((0.0, encode_heartbeat(encoder)))
+        dispatcher = message_dispatcher.MessageDispatcher()
+        heartbeat_id = mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT
+
+        # Run
+        first = dispatcher.recv_message(handle, heartbeat_id, 1)
+        second = dispatcher.recv_message(handle, heartbeat_id, 0.01)
+        timed_out = dispatcher.recv_message(handle, heartbeat_id, 0.01)
+
+        # Test
+        assert first is not None
+        assert second is not None
+        assert second.get_type() == "HEARTBEAT"
+        assert timed_out is None
+        assert dispatcher.skipped_count == 1
+        receive_queue.close()
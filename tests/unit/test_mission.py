@@ -0,0 +1,200 @@
+"""
+Test the waypoint mission.
+"""
+
+import numpy as np
+import pytest
+
+from modules.command import command
+from modules.command import mission
+from modules.common.modules.logger import logger
+from modules.telemetry import telemetry
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+ACCEPTANCE_RADIUS = 1.0  # m
+LOOKAHEAD = 3.0  # m
+
+
+@pytest.fixture()
+def local_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger for creating missions.
+    """
+    result, instance = logger.Logger.create("test_mission", False)
+    assert result
+    assert instance is not None
+    yield instance  # type: ignore
+
+
+def make_mission(
+    positions: "list[tuple[float, float, float]]", lookahead: float, local_logger: logger.Logger
+) -> mission.Mission:
+    """
+    Returns a mission through the positions with the same acceptance radius.
+    """
+    waypoints = mission.make_waypoints(
+        [command.Position(x, y, z) for x, y, z in positions], ACCEPTANCE_RADIUS
+    )
+    result, instance = mission.Mission.create(waypoints, lookahead, local_logger)
+    assert result
+    assert instance is not None
+    return instance
+
+
+def at(x: "float | None", y: "float | None", z: "float | None") -> telemetry.TelemetryData:
+    """
+    Returns a reading at the position.
+    """
+    return telemetry.TelemetryData(x=x, y=y, z=z)
+
+
+def as_tuple(position: command.Position) -> "tuple[float, float, float]":
+    """
+    Returns the coordinates of the position.
+    """
+    return position.x, position.y, position.z
+
+
+class TestMission:
+    """
+    Waypoints are accepted in order, and the target looks ahead to the next one.
+    """
+
+    def test_accepts_within_radius(self, local_logger: logger.Logger) -> None:
+        """
+        The next waypoint becomes current only within the acceptance radius of the current one.
+        """
+        # Setup
+        line = make_mission(
+            [(0.0, 0.0, 0.0), (10.0, 0.0, 0.0), (20.0, 0.0, 0.0)], 0.0, local_logger
+        )
+
+        # Run
+        outside = line.update(at(1.5, 0.0, 0.0))
+        outside_index = line.get_index()
+        inside = line.update(at(0.5, 0.0, 0.0))
+
+        # Test
+        assert as_tuple(outside) == (0.0, 0.0, 0.0)
+        assert outside_index == 0
+        assert as_tuple(inside) == (10.0, 0.0, 0.0)
+        assert line.get_index() == 1
+
+    def test_accepts_several_at_once(self, local_logger: logger.Logger) -> None:
+        """
+        Waypoints within their radius of one reading are all accepted by it.
+        """
+        # Setup
+        cluster = make_mission(
+            [(0.0, 0.0, 0.0), (0.5, 0.0, 0.0), (1.0, 0.0, 0.0), (30.0, 0.0, 0.0)], 0.0, local_logger
+        )
+
+        # Run
+        target = cluster.update(at(0.5, 0.0, 0.0))
+
+        # Test
+        assert cluster.get_index() == 3
+        assert as_tuple(target) == (30.0, 0.0, 0.0)
+
+    def test_passing_through_radius(self, local_logger: logger.Logger) -> None:
+        """
+        A waypoint entered and left again between two targets set is still accepted,
+        as long as every reading is passed to update.
+        """
+        # Setup
+        line = make_mission([(0.0, 0.0, 0.0), (10.0, 0.0, 0.0)], 0.0, local_logger)
+        readings = [at(-2.0, 0.0, 0.0), at(0.0, 0.5, 0.0), at(2.0, 0.0, 0.0)]
+
+        # Run
+        target = None
+        for reading in readings:
+            target = line.update(reading)
+
+        # Test
+        assert target is not None
+        assert line.get_index() == 1
+        assert as_tuple(target) == (10.0, 0.0, 0.0)
+
+    def test_lookahead(self, local_logger: logger.Logger) -> None:
+        """
+        Within the look ahead distance, the next waypoint is targeted before the current one
+        is accepted.
+        """
+        # Setup
+        line = make_mission(
+            [(0.0, 0.0, 0.0), (10.0, 0.0, 0.0), (20.0, 0.0, 0.0)], LOOKAHEAD, local_logger
+        )
+
+        # Run
+        far = line.update(at(-5.0, 0.0, 0.0))
+        near = line.update(at(-2.0, 0.0, 0.0))
+        near_index = line.get_index()
+
+        # Test
+        assert as_tuple(far) == (0.0, 0.0, 0.0)
+        assert as_tuple(near) == (10.0, 0.0, 0.0)
+        assert near_index == 0
+
+    def test_missing_position(self, local_logger: logger.Logger) -> None:
+        """
+        A reading without a position targets the current waypoint without accepting it.
+        """
+        # Setup
+        line = make_mission([(0.0, 0.0, 0.0), (10.0, 0.0, 0.0)], LOOKAHEAD, local_logger)
+
+        # Run
+        target = line.update(at(None, 0.0, 0.0))
+
+        # Test
+        assert as_tuple(target) == (0.0, 0.0, 0.0)
+        assert line.get_index() == 0
+
+    def test_final_waypoint(self, local_logger: logger.Logger) -> None:
+        """
+        After the last waypoint, the mission is complete and the target stays on it.
+        """
+        # Setup
+        line = make_mission([(0.0, 0.0, 0.0), (10.0, 0.0, 0.0)], LOOKAHEAD, local_logger)
+
+        # Run
+        line.update(at(0.0, 0.0, 0.0))
+        last = line.update(at(10.0, 0.0, 0.0))
+        after = line.update(at(50.0, 0.0, 0.0))
+        missing = line.update(at(None, None, None))
+
+        # Test
+        assert line.is_complete()
+        assert line.get_index() == len(line)
+        assert as_tuple(last) == (10.0, 0.0, 0.0)
+        assert as_tuple(after) == (10.0, 0.0, 0.0)
+        assert as_tuple(missing) == (10.0, 0.0, 0.0)
+
+    def test_rejects_invalid_missions(self, local_logger: logger.Logger) -> None:
+        """
+        A replacement mission is rejected without waypoints, with the wrong fields,
+        or with a non-positive acceptance radius or negative look ahead.
+        """
+        # Setup
+        valid = mission.make_waypoints([command.Position(0.0, 0.0, 0.0)], ACCEPTANCE_RADIUS)
+        zero_radius = valid.copy()
+        zero_radius["acceptance_radius"] = 0.0
+        wrong_fields = np.zeros(1, np.dtype([("x", np.float64), ("y", np.float64)]))
+
+        # Run
+        results = [
+            mission.Mission.create(np.empty(0, mission.WAYPOINT_DTYPE), 0.0, local_logger),
+            mission.Mission.create(wrong_fields, 0.0, local_logger),
+            mission.Mission.create([(0.0, 0.0, 0.0, 1.0)], 0.0, local_logger),
+            mission.Mission.create(zero_radius, 0.0, local_logger),
+            mission.Mission.create(valid, -1.0, local_logger),
+        ]
+
+        # Test
+        for result, instance in results:
+            assert not result
+            assert instance is None
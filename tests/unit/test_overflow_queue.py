@@ -0,0 +1,108 @@
+"""
+Test overflow policies.
+"""
+
+import time
+
+from utilities.workers import overflow_queue
+from utilities.workers import queue_proxy_wrapper
+
+
+def create_wrapper(
+    policy: overflow_queue.OverflowPolicy, maxsize: int = 2
+) -> queue_proxy_wrapper.QueueProxyWrapper:
+    """
+    Creates a small shared memory queue with the policy.
+    """
+    return queue_proxy_wrapper.QueueProxyWrapper(
+        None,
+        maxsize,
+        queue_proxy_wrapper.QueueBackend.SHARED_MEMORY,
+        overflow_policy=policy,
+    )
+
+
+def drain(wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> "list[object]":
+    """
+    Returns every item in the queue.
+    """
+    items = []
+    while not wrapper.queue.empty():
+        items.append(wrapper.queue.get(timeout=1))
+
+    return items
+
+
+class TestOverflowPolicies:
+    """
+    Full queues never block the producer under a lossy policy.
+    """
+
+    def test_drop_newest(self) -> None:
+        """
+        Items put into a full queue are discarded.
+        """
+        # Setup
+        wrapper = create_wrapper(overflow_queue.OverflowPolicy.DROP_NEWEST)
+
+        # Run
+        start = time.monotonic()
+        for i in range(5):
+            wrapper.queue.put(i)
+
+        elapsed = time.monotonic() - start
+
+        # Test
+        assert elapsed < 0.1
+        assert drain(wrapper) == [0, 1]
+        assert wrapper.dropped_count() == 3
+        wrapper.close()
+
+    def test_drop_oldest(self) -> None:
+        """
+        Items at the front make space for new ones.
+        """
+        # Setup
+        wrapper = create_wrapper(overflow_queue.OverflowPolicy.DROP_OLDEST)
+
+        # Run
+        for i in range(5):
+            wrapper.queue.put(i)
+
+        # Test
+        assert drain(wrapper) == [3, 4]
+        assert wrapper.dropped_count() == 3
+        wrapper.close()
+
+    def test_spill_to_disk_keeps_order(self) -> None:
+        """
+        Nothing is lost and order is kept across the overflow file.
+        """
+        # Setup
+        wrapper = create_wrapper(overflow_queue.OverflowPolicy.SPILL_TO_DISK)
+
+        # Run
+        for i in range(5):
+            wrapper.queue.put(i)
+
+        first = [wrapper.queue.get(timeout=1) for _ in range(3)]
+        # Overflow file is not empty yet, so this goes behind it
+        wrapper.queue.put(5)
+        rest = drain(wrapper)
+
+        # Test
+        assert first + rest == [0, 1, 2, 3, 4, 5]
+        assert wrapper.dropped_count() == 0
+        wrapper.close()
+
+    def test_blocking_default(self) -> None:
+        """
+        Default policy counts nothing as dropped.
+        """
+        wrapper = create_wrapper(overflow_queue.OverflowPolicy.BLOCK)
+
+        wrapper.queue.put(0)
+
+        assert wrapper.dropped_count() == 0
+        assert drain(wrapper) == [0]
+        wrapper.close()
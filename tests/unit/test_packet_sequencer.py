@@ -0,0 +1,66 @@
+"""
+Test renumbering outbound MAVLink packets.
+"""
+
+from pymavlink import mavutil
+
+from utilities.mavlink import packet_sequencer
+
+
+def encode_heartbeat(encoder: mavutil.mavlink.MAVLink) -> bytes:
+    """
+    Returns a heartbeat packet from the encoder, advancing its sequence number.
+    """
+    message = encoder.heartbeat_encode(
+        mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+    )
+    packet = bytes(message.pack(encoder))
+    encoder.seq = (encoder.seq + 1) % 256
+    return packet
+
+
+class TestPacketSequencer:
+    """
+    Packets of one sender are numbered consecutively, whichever encoder made them.
+    """
+
+    def test_interleaved_encoders(self) -> None:
+        """
+        Two workers sending as the same system and component share one sequence.
+        """
+        # Setup
+        sequencer = packet_sequencer.PacketSequencer()
+        first_worker = mavutil.mavlink.MAVLink(None, 255, 0)
+        second_worker = mavutil.mavlink.MAVLink(None, 255, 0)
+        # Other sender keeps its own sequence
+        other_sender = mavutil.mavlink.MAVLink(None, 255, 1)
+        parser = mavutil.mavlink.MAVLink(None)
+
+        # Run
+        packets = []
+        for _ in range(300):
+            packets.append(encode_heartbeat(first_worker))
+            packets.append(encode_heartbeat(second_worker))
+            packets.append(encode_heartbeat(other_sender))
+
+        messages = [parser.decode(bytearray(sequencer.stamp(packet))) for packet in packets]
+
+        # Test
+        sequences = [message.get_seq() for message in messages if message.get_srcComponent() == 0]
+        other_sequences = [
+            message.get_seq() for message in messages if message.get_srcComponent() == 1
+        ]
+        assert sequences == [i % 256 for i in range(600)]
+        assert other_sequences == [i % 256 for i in range(300)]
+
+    def test_not_a_packet(self) -> None:
+        """
+        Data that is not a whole packet is passed through unchanged.
+        """
+        # Setup
+        sequencer = packet_sequencer.PacketSequencer()
+        packet = encode_heartbeat(mavutil.mavlink.MAVLink(None, 255, 0))
+
+        # Run and test
+        assert sequencer.stamp(b"not mavlink") == b"not mavlink"
+        assert sequencer.stamp(packet[:8]) == packet[:8]
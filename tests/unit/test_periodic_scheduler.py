@@ -0,0 +1,122 @@
+"""
+Test running periodic jobs on the timer wheel.
+"""
+
+import pytest
+
+from utilities.workers import periodic_scheduler
+from .conftest import FakeClock
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+# Whole seconds, so deadlines are exact
+RESOLUTION = 1.0  # seconds
+SLOT_COUNT = 8
+
+
+@pytest.fixture()
+def scheduler(clock: FakeClock) -> periodic_scheduler.PeriodicScheduler:  # type: ignore
+    """
+    Wheel turning once every 8 s, so longer periods wrap around it.
+    """
+    yield periodic_scheduler.PeriodicScheduler(RESOLUTION, SLOT_COUNT, clock)  # type: ignore
+
+
+class TestPeriodicScheduler:
+    """
+    Deadlines, drift, and overruns.
+    """
+
+    def test_runs_on_deadline_grid_without_drift(
+        self, clock: FakeClock, scheduler: periodic_scheduler.PeriodicScheduler
+    ) -> None:
+        """
+        Late wake ups do not move later deadlines, and deadlines beyond a turn wait for it.
+        """
+        # Setup
+        runs = []
+        scheduler.add("fast", 4.0, lambda: runs.append(("fast", clock.now)))
+        scheduler.add("slow", 20.0, lambda: runs.append(("slow", clock.now)), 20.0)
+
+        # Run
+        waits = []
+        for now in (0.0, 0.5, 4.5, 8.0, 11.5, 16.0, 20.0):
+            clock.now = now
+            scheduler.run_pending()
+            waits.append(scheduler.time_until_next())
+
+        # Test
+        assert runs == [
+            ("fast", 0.0),
+            ("fast", 4.5),
+            ("fast", 8.0),
+            ("fast", 16.0),
+            ("slow", 20.0),
+            ("fast", 20.0),
+        ]
+        # Deadlines stay at multiples of the period
+        assert waits == [4.0, 3.5, 3.5, 4.0, 0.5, 4.0, 4.0]
+        stats = scheduler.get_stats()["fast"]
+        assert stats.run_count == 5
+        assert stats.max_jitter == 4.0
+        assert stats.mean_jitter == 4.5 / 5
+        # 11.5 was early, so the deadline at 12 was skipped by waking at 16
+        assert stats.skipped_count == 1
+        assert stats.overrun_count == 0
+
+    def test_overrun_skips_missed_periods(
+        self, clock: FakeClock, scheduler: periodic_scheduler.PeriodicScheduler
+    ) -> None:
+        """
+        A run longer than its period counts an overrun and runs once for the periods it missed.
+        """
+
+        # Setup
+        def slow_job() -> None:
+            clock.now += 10.0
+
+        scheduler.add("slow_job", 4.0, slow_job)
+
+        # Run
+        ran = scheduler.run_pending()
+        clock.now = 13.0
+        ran_again = scheduler.run_pending()
+
+        # Test
+        assert (ran, ran_again) == (1, 1)
+        stats = scheduler.get_stats()["slow_job"]
+        assert stats.overrun_count == 2
+        # Ran 0 to 10 skipping 4 and 8, then 13 to 23 skipping 16 and 20
+        assert stats.skipped_count == 4
+        assert scheduler.time_until_next() == 1.0
+
+    def test_remove_stops_job(
+        self, clock: FakeClock, scheduler: periodic_scheduler.PeriodicScheduler
+    ) -> None:
+        """
+        Removed jobs are not run, even if removed while due.
+        """
+        # Setup
+        runs = []
+
+        def remove_second() -> None:
+            if "second" in scheduler.get_stats():
+                scheduler.remove("second")
+
+        scheduler.add("first", 4.0, remove_second)
+        scheduler.add("second", 4.0, lambda: runs.append(clock.now), 0.5)
+
+        # Run
+        clock.now = 6.0
+        ran = scheduler.run_pending()
+        clock.now = 30.0
+        scheduler.run_pending()
+
+        # Test
+        assert ran == 1
+        assert not runs
+        assert list(scheduler.get_stats()) == ["first"]
@@ -0,0 +1,170 @@
+"""
+Test waiting on many queues at once.
+"""
+
+import multiprocessing as mp
+import time
+
+import pytest
+
+from utilities.workers import notifying_queue
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_selector
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+# Long enough that only a missed wake up reaches it
+TIMEOUT = 5.0  # seconds
+
+
+def put_after_delay(
+    queue_wrapper: queue_proxy_wrapper.QueueProxyWrapper, item: object, delay: float
+) -> None:
+    """
+    Producer process, puts the item once the selector is waiting.
+    """
+    time.sleep(delay)
+    queue_wrapper.queue.put(item)
+
+
+@pytest.fixture()
+def doorbell() -> notifying_queue.Doorbell:  # type: ignore
+    """
+    Doorbell shared by the queues of a test.
+    """
+    yield notifying_queue.Doorbell()  # type: ignore
+
+
+@pytest.fixture()
+def queues(
+    doorbell: notifying_queue.Doorbell,
+) -> "list[queue_proxy_wrapper.QueueProxyWrapper]":  # type: ignore
+    """
+    Creates 2 queues and a queue with a tap, and frees them afterwards.
+    """
+    instances = [
+        queue_proxy_wrapper.QueueProxyWrapper(
+            None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY, doorbell=doorbell
+        ),
+        queue_proxy_wrapper.QueueProxyWrapper(
+            None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY, doorbell=doorbell
+        ),
+        queue_proxy_wrapper.QueueProxyWrapper(
+            None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY, doorbell=doorbell, tap=True
+        ),
+    ]
+    yield instances  # type: ignore
+    for instance in instances:
+        instance.close()
+
+
+class TestQueueSelector:
+    """
+    Wakes on whichever queue has items, and calls its handler.
+    """
+
+    def test_wakes_on_other_process(
+        self,
+        doorbell: notifying_queue.Doorbell,
+        queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+    ) -> None:
+        """
+        A put from another process into the second queue wakes the selector before the timeout.
+        """
+        # Setup
+        first_items = []
+        second_items = []
+        selector = queue_selector.QueueSelector(doorbell)
+        selector.register(queues[0], first_items.append)
+        selector.register(queues[1], second_items.append)
+        producer = mp.Process(target=put_after_delay, args=(queues[1], "ready", 0.2))
+        producer.start()
+
+        # Run
+        start_time = time.monotonic()
+        handled_count = selector.select(TIMEOUT)
+        elapsed = time.monotonic() - start_time
+        producer.join()
+
+        # Test
+        assert handled_count == 1
+        assert elapsed < TIMEOUT
+        assert not first_items
+        assert second_items == ["ready"]
+
+    def test_batches_in_turn(
+        self,
+        doorbell: notifying_queue.Doorbell,
+        queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+    ) -> None:
+        """
+        A full queue is taken from a batch at a time, without starving the other queue.
+        """
+        # Setup
+        handled = []
+        selector = queue_selector.QueueSelector(doorbell)
+        selector.register(queues[0], lambda item: handled.append(("first", item)), max_items=2)
+        selector.register(queues[1], lambda item: handled.append(("second", item)))
+        for i in range(5):
+            queues[0].queue.put(i)
+        queues[1].queue.put(0)
+
+        # Run
+        handled_count = selector.select(0.0)
+
+        # Test
+        assert handled_count == 3
+        assert handled == [("first", 0), ("first", 1), ("second", 0)]
+        assert queues[0].queue.qsize() == 3
+
+    def test_tap_does_not_consume(
+        self,
+        doorbell: notifying_queue.Doorbell,
+        queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+    ) -> None:
+        """
+        The tap handles the last item put once, and the items stay in the queue.
+        """
+        # Setup
+        tapped = []
+        selector = queue_selector.QueueSelector(doorbell)
+        selector.register_tap(queues[2], tapped.append)
+        queues[2].queue.put("old")
+        queues[2].queue.put("new")
+
+        # Run
+        first_count = selector.select(TIMEOUT)
+        second_count = selector.select(0.05)
+
+        # Test
+        assert first_count == 1
+        assert second_count == 0
+        assert tapped == ["new"]
+        assert queues[2].queue.get_nowait() == "old"
+        assert queues[2].queue.get_nowait() == "new"
+
+    def test_timeout(
+        self,
+        doorbell: notifying_queue.Doorbell,
+        queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+    ) -> None:
+        """
+        Nothing handled when no queue has items before the timeout.
+        """
+        # Setup
+        selector = queue_selector.QueueSelector(doorbell)
+        for queue_wrapper in queues:
+            selector.register(queue_wrapper, pytest.fail)
+
+        # Run
+        start_time = time.monotonic()
+        handled_count = selector.select(0.1)
+        elapsed = time.monotonic() - start_time
+
+        # Test
+        assert handled_count == 0
+        assert elapsed >= 0.1
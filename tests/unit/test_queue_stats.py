@@ -0,0 +1,119 @@
+"""
+Test queue instrumentation.
+"""
+
+import multiprocessing as mp
+import queue
+import time
+
+import pytest
+
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_stats
+
+
+def put_slowly(output_queue: queue_proxy_wrapper.QueueProxyWrapper, count: int) -> None:
+    """
+    Producer for the multiprocess test.
+    """
+    for i in range(count):
+        time.sleep(0.01)
+        output_queue.queue.put(i)
+
+
+class TestHistogramSnapshot:
+    """
+    Percentiles from power of 2 buckets.
+    """
+
+    def test_percentile(self) -> None:
+        """
+        Percentile is the upper bound of the bucket it falls in.
+        """
+        # Setup
+        buckets = [0] * queue_stats.QueueStats.HISTOGRAM_BUCKET_COUNT
+        buckets[3] = 90  # [4, 8) us
+        buckets[10] = 10  # [512, 1024) us
+
+        # Run
+        histogram = queue_stats.HistogramSnapshot(buckets)
+
+        # Test
+        assert histogram.count == 100
+        assert histogram.percentile(0.5) == pytest.approx(8e-6)
+        assert histogram.percentile(0.99) == pytest.approx(1024e-6)
+
+
+class TestInstrumentedQueue:
+    """
+    Statistics recorded through the wrapper.
+    """
+
+    def test_not_instrumented(self) -> None:
+        """
+        No statistics unless requested.
+        """
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 2, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        )
+
+        assert wrapper.stats() is None
+        wrapper.close()
+
+    def test_counts_and_blocking(self) -> None:
+        """
+        Depth, producer block and consumer wait are recorded.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 2, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY, True
+        )
+
+        # Run
+        wrapper.queue.put("a")
+        wrapper.queue.put("b")
+        with pytest.raises(queue.Full):
+            wrapper.queue.put("c", timeout=0.01)
+
+        items = [wrapper.queue.get(), wrapper.queue.get()]
+        with pytest.raises(queue.Empty):
+            wrapper.queue.get(timeout=0.01)
+
+        stats = wrapper.stats()
+
+        # Test
+        assert items == ["a", "b"]
+        assert stats is not None
+        assert stats.put_count == 2
+        assert stats.get_count == 2
+        assert stats.depth == 0
+        assert stats.max_depth == 2
+        assert stats.producer_block_count == 1
+        assert stats.consumer_wait_count == 1
+        assert stats.consumer_wait_time >= 0.01
+        assert stats.dwell_histogram.count == 2
+        wrapper.close()
+
+    def test_other_process(self) -> None:
+        """
+        Statistics recorded by another process are visible while it runs.
+        """
+        # Setup
+        count = 5
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 10, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY, True
+        )
+
+        # Run
+        producer = mp.Process(target=put_slowly, args=(wrapper, count))
+        producer.start()
+        items = [wrapper.queue.get(timeout=5) for _ in range(count)]
+        producer.join()
+        stats = wrapper.stats()
+
+        # Test
+        assert items == list(range(count))
+        assert stats is not None
+        assert stats.put_count == count
+        assert stats.dwell_histogram.count == count
+        wrapper.close()
@@ -0,0 +1,102 @@
+"""
+Test the fixed layout record codec.
+"""
+
+import pytest
+
+from utilities.serialization import record_codec
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+class Sample:
+    """
+    Record type for the tests.
+    """
+
+    def __init__(
+        self, time_ms: int | None = None, x: float | None = None, y: float | None = None
+    ) -> None:
+        self.time_ms = time_ms
+        self.x = x
+        self.y = y
+
+
+@pytest.fixture()
+def codec() -> record_codec.RecordCodec:  # type: ignore
+    """
+    Codec for Sample.
+    """
+    instance = record_codec.RecordCodec(Sample, [("time_ms", "I"), ("x", "d"), ("y", "d")])
+    yield instance  # type: ignore
+
+
+class TestRecordCodec:
+    """
+    Encoding and decoding records.
+    """
+
+    def test_round_trip(self, codec: record_codec.RecordCodec) -> None:
+        """
+        Every field survives encoding and decoding.
+        """
+        # Setup
+        expected = Sample(1234, 1.5, -2.25)
+
+        # Run
+        packed = codec.encode(expected)
+        actual = codec.decode(packed)
+
+        # Test
+        assert len(packed) == codec.size
+        assert isinstance(actual, Sample)
+        assert (actual.time_ms, actual.x, actual.y) == (1234, 1.5, -2.25)
+
+    def test_none_fields(self, codec: record_codec.RecordCodec) -> None:
+        """
+        None fields are restored as None, not 0 .
+        """
+        # Run
+        actual = codec.decode(codec.encode(Sample(x=0.0)))
+
+        # Test
+        assert actual.time_ms is None
+        assert actual.x == 0.0
+        assert actual.y is None
+
+    def test_view(self, codec: record_codec.RecordCodec) -> None:
+        """
+        Lazy view reads the same values as a full decode.
+        """
+        # Setup
+        packed = codec.encode(Sample(7, None, 3.0))
+
+        # Run
+        view = codec.view(packed)
+
+        # Test
+        assert view.time_ms == 7
+        assert view.x is None
+        assert view.y == 3.0
+        assert codec.decode_field(packed, "y") == 3.0
+        with pytest.raises(AttributeError):
+            _ = view.z
+
+    def test_numpy_layout(self, codec: record_codec.RecordCodec) -> None:
+        """
+        Concatenated records read as a NumPy structured array.
+        """
+        # Setup
+        packed = codec.encode(Sample(1, 1.0, 2.0)) + codec.encode(Sample(2, 3.0, None))
+
+        # Run
+        records = codec.decode_array(packed)
+
+        # Test
+        assert records.dtype.itemsize == codec.size
+        assert list(records["time_ms"]) == [1, 2]
+        assert list(records["x"]) == [1.0, 3.0]
+        assert list(records[record_codec.RecordCodec.PRESENCE_FIELD]) == [0b111, 0b011]
@@ -0,0 +1,137 @@
+"""
+Test the shared memory record history.
+"""
+
+import pytest
+
+from utilities.serialization import record_codec
+from utilities.serialization import record_history
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+CAPACITY = 4
+
+
+class Sample:
+    """
+    Record type for the tests.
+    """
+
+    def __init__(self, time_ms: int | None = None, x: float | None = None) -> None:
+        self.time_ms = time_ms
+        self.x = x
+
+
+@pytest.fixture()
+def codec() -> record_codec.RecordCodec:  # type: ignore
+    """
+    Codec for Sample.
+    """
+    instance = record_codec.RecordCodec(Sample, [("time_ms", "I"), ("x", "d")])
+    yield instance  # type: ignore
+
+
+@pytest.fixture()
+def history(codec: record_codec.RecordCodec) -> record_history.RecordHistory:  # type: ignore
+    """
+    Small history ordered by time.
+    """
+    instance = record_history.RecordHistory(codec.dtype, CAPACITY, "time_ms")
+    yield instance  # type: ignore
+    instance.close()
+    instance.unlink()
+
+
+class TestRecordHistory:
+    """
+    Appending records and querying them by key.
+    """
+
+    def test_keeps_latest_records(
+        self, codec: record_codec.RecordCodec, history: record_history.RecordHistory
+    ) -> None:
+        """
+        Oldest records are overwritten once full, in order across the wrap around.
+        """
+        # Run
+        appended = history.extend([codec.encode(Sample(time, time / 10)) for time in range(6)])
+
+        # Test
+        assert appended == 6
+        assert len(history) == CAPACITY
+        assert history.latest_key() == 5
+        assert list(history.window(0, 10)["time_ms"]) == [2, 3, 4, 5]
+
+    def test_lookup_by_key(
+        self, codec: record_codec.RecordCodec, history: record_history.RecordHistory
+    ) -> None:
+        """
+        Lookup returns the latest record at or before the key.
+        """
+        # Setup
+        history.extend([codec.encode(Sample(time, float(time))) for time in (10, 20, 30, 40, 50)])
+
+        # Run
+        between = history.lookup(35)
+        exact = history.lookup(50)
+        too_early = history.lookup(15)
+
+        # Test
+        assert between is not None
+        assert between["time_ms"] == 30
+        assert exact is not None
+        assert exact["x"] == 50.0
+        # 10 was overwritten
+        assert too_early is None
+
+    def test_rejects_older_records(
+        self, codec: record_codec.RecordCodec, history: record_history.RecordHistory
+    ) -> None:
+        """
+        Records older than the latest one are skipped.
+        """
+        # Setup
+        history.append(codec.encode(Sample(100, 1.0)))
+
+        # Run
+        is_old_appended = history.append(codec.encode(Sample(50, 2.0)))
+        appended = history.extend(
+            [codec.encode(Sample(time, 3.0)) for time in (100, 120, 110, 130)]
+        )
+
+        # Test
+        assert not is_old_appended
+        assert appended == 3
+        assert list(history.window(0, 200)["time_ms"]) == [100, 100, 120, 130]
+
+    def test_aggregates_skip_missing_values(
+        self, codec: record_codec.RecordCodec, history: record_history.RecordHistory
+    ) -> None:
+        """
+        Aggregates are over the present values in the window.
+        """
+        # Setup
+        history.extend(
+            [
+                codec.encode(Sample(1, 2.0)),
+                codec.encode(Sample(2, None)),
+                codec.encode(Sample(3, 4.0)),
+                codec.encode(Sample(4, -8.0)),
+            ]
+        )
+
+        # Run
+        mean = history.mean("x", 1, 3)
+        maximum = history.max("x", 0, 10)
+        minimum = history.min("x", 0, 10)
+        empty = history.mean("x", 2, 2)
+
+        # Test
+        assert mean == 3.0
+        assert maximum == 4.0
+        assert minimum == -8.0
+        assert empty is None
@@ -0,0 +1,156 @@
+"""
+Test the shared memory queue.
+"""
+
+import multiprocessing as mp
+import queue
+import threading
+
+import pytest
+
+from utilities.workers import shared_memory_queue
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+QUEUE_MAXSIZE = 3
+
+
+@pytest.fixture()
+def shared_queue() -> shared_memory_queue.SharedMemoryQueue:  # type: ignore
+    """
+    Creates a small shared memory queue and frees it afterwards.
+    """
+    instance = shared_memory_queue.SharedMemoryQueue(QUEUE_MAXSIZE, 256)
+    yield instance  # type: ignore
+    instance.close()
+    instance.unlink()
+
+
+def put_range(output_queue: shared_memory_queue.SharedMemoryQueue, count: int) -> None:
+    """
+    Producer for the multiprocess test.
+    """
+    for i in range(count):
+        output_queue.put(i)
+
+
+class TestSharedMemoryQueue:
+    """
+    Put and get semantics match queue.Queue .
+    """
+
+    def test_fifo_order(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Items come out in the order they went in.
+        """
+        # Setup
+        expected = [1, "two", (3.0, None)]
+
+        # Run
+        for item in expected:
+            shared_queue.put(item)
+
+        actual = [shared_queue.get() for _ in expected]
+
+        # Test
+        assert actual == expected
+        assert shared_queue.empty()
+
+    def test_full_raises(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Putting into a full queue times out.
+        """
+        # Setup
+        for i in range(QUEUE_MAXSIZE):
+            shared_queue.put(i)
+
+        # Run and test
+        assert shared_queue.full()
+        with pytest.raises(queue.Full):
+            shared_queue.put(QUEUE_MAXSIZE, timeout=0.01)
+
+    def test_empty_raises(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Getting from an empty queue times out.
+        """
+        with pytest.raises(queue.Empty):
+            shared_queue.get(timeout=0.01)
+
+        with pytest.raises(queue.Empty):
+            shared_queue.get_nowait()
+
+    def test_wrap_around(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Indices keep working after the ring wraps multiple times.
+        """
+        # Setup
+        expected = list(range(QUEUE_MAXSIZE * 4))
+
+        # Run
+        actual = []
+        for item in expected:
+            shared_queue.put(item)
+            actual.append(shared_queue.get())
+
+        # Test
+        assert actual == expected
+
+    def test_item_too_large(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Items larger than a slot are rejected without taking a slot.
+        """
+        with pytest.raises(ValueError):
+            shared_queue.put(bytes(1024))
+
+        assert shared_queue.qsize() == 0
+
+    def test_other_process(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Items put by another process are received in order.
+        """
+        # Setup
+        count = 20
+
+        # Run
+        producer = mp.Process(target=put_range, args=(shared_queue, count))
+        producer.start()
+        actual = [shared_queue.get(timeout=5) for _ in range(count)]
+        producer.join()
+
+        # Test
+        assert actual == list(range(count))
+
+    def test_put_many_with_concurrent_put(
+        self, shared_queue: shared_memory_queue.SharedMemoryQueue
+    ) -> None:
+        """
+        A full capacity batch and a single put waiting on a full queue both complete
+        as the consumer frees slots.
+        """
+        # Setup
+        for i in range(QUEUE_MAXSIZE):
+            shared_queue.put(i)
+
+        batch = [f"batch {i}" for i in range(QUEUE_MAXSIZE)]
+        batch_putter = threading.Thread(target=shared_queue.put_many, args=(batch,), daemon=True)
+        single_putter = threading.Thread(target=shared_queue.put, args=("single",), daemon=True)
+
+        # Run
+        batch_putter.start()
+        single_putter.start()
+        actual = [shared_queue.get(timeout=5) for _ in range(2 * QUEUE_MAXSIZE + 1)]
+        batch_putter.join(timeout=5)
+        single_putter.join(timeout=5)
+
+        # Test
+        assert not batch_putter.is_alive()
+        assert not single_putter.is_alive()
+        assert actual[:QUEUE_MAXSIZE] == list(range(QUEUE_MAXSIZE))
+        assert sorted(actual[QUEUE_MAXSIZE:], key=str) == sorted(batch + ["single"])
+        # The batch stays contiguous
+        start = actual.index(batch[0])
+        assert actual[start : start + QUEUE_MAXSIZE] == batch
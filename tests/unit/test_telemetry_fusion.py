@@ -0,0 +1,188 @@
+"""
+Test aligning attitude and position to the same timestamps.
+"""
+
+import math
+
+import pytest
+from pymavlink import mavutil
+
+from modules.common.modules.logger import logger
+from modules.mavlink_router import mavlink_connection_handle
+from modules.telemetry import telemetry_fusion
+from utilities.workers import queue_proxy_wrapper
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+OUTPUT_PERIOD = 50  # ms
+MAX_EXTRAPOLATION = 100  # ms
+
+
+@pytest.fixture()
+def fusion() -> telemetry_fusion.TelemetryFusion:  # type: ignore
+    """
+    Fusion fed directly with messages, its connection is never read.
+    """
+    send_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 8, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+    )
+    result, handle = mavlink_connection_handle.MavlinkConnectionHandle.create(send_queue, None, [])
+    assert result
+    assert handle is not None
+    result, local_logger = logger.Logger.create("test_telemetry_fusion", False)
+    assert result
+    assert local_logger is not None
+    result, instance = telemetry_fusion.TelemetryFusion.create(
+        handle, OUTPUT_PERIOD, MAX_EXTRAPOLATION, local_logger
+    )
+    assert result
+    assert instance is not None
+    yield instance  # type: ignore
+    send_queue.close()
+
+
+def attitude(
+    time_boot_ms: int, yaw: float, yaw_speed: float = 0.0
+) -> mavutil.mavlink.MAVLink_attitude_message:
+    """
+    Returns a level attitude with the heading.
+    """
+    return mavutil.mavlink.MAVLink_attitude_message(
+        time_boot_ms, 0.0, 0.0, yaw, 0.0, 0.0, yaw_speed
+    )
+
+
+def position(
+    time_boot_ms: int, north: float, north_velocity: float = 0.0
+) -> mavutil.mavlink.MAVLink_local_position_ned_message:
+    """
+    Returns a position north of the origin, 10 m up.
+    """
+    return mavutil.mavlink.MAVLink_local_position_ned_message(
+        time_boot_ms, north, 0.0, -10.0, north_velocity, 0.0, 0.0
+    )
+
+
+class TestTelemetryFusion:
+    """
+    Interpolation, extrapolation, and restarts.
+    """
+
+    def test_interpolates_between_streams(self, fusion: telemetry_fusion.TelemetryFusion) -> None:
+        """
+        Readings on the output period take both streams at the same moment, in East North Up.
+        """
+        # Setup
+        fusion.add_attitude(attitude(0, 0.0, 2.0))
+        fusion.add_position(position(0, 0.0, 10.0))
+
+        # Run
+        fusion.add_attitude(attitude(100, 0.2, 2.0))
+        fusion.add_position(position(100, 1.0, 10.0))
+        readings = fusion.pop_readings()
+
+        # Test
+        assert [reading.time_since_boot for reading in readings] == [0, 50, 100]
+        middle = readings[1]
+        assert middle.yaw == pytest.approx(0.1)
+        assert middle.yaw_speed == pytest.approx(2.0)
+        assert middle.x == pytest.approx(0.0)
+        assert middle.y == pytest.approx(0.5)
+        assert middle.z == pytest.approx(10.0)
+        assert middle.y_velocity == pytest.approx(10.0)
+        assert fusion.pop_readings() == []
+
+    def test_interpolates_yaw_across_wrap(self, fusion: telemetry_fusion.TelemetryFusion) -> None:
+        """
+        Yaw turning through +-pi is interpolated the short way around.
+        """
+        # Setup
+        fusion.add_attitude(attitude(0, math.pi - 0.1))
+        fusion.add_attitude(attitude(100, -math.pi + 0.1))
+
+        # Run
+        fusion.add_position(position(0, 0.0))
+        fusion.add_position(position(100, 0.0))
+        readings = fusion.pop_readings()
+
+        # Test
+        assert [reading.time_since_boot for reading in readings] == [0, 50, 100]
+        assert abs(readings[1].yaw) == pytest.approx(math.pi)
+
+    def test_extrapolates_lagging_stream_up_to_limit(
+        self, fusion: telemetry_fusion.TelemetryFusion
+    ) -> None:
+        """
+        A lagging stream is extrapolated with its rates only up to the limit past its latest sample.
+        """
+        # Setup
+        fusion.add_position(position(0, 0.0, 10.0))
+        fusion.add_attitude(attitude(0, 0.0))
+
+        # Run
+        for time_boot_ms in range(OUTPUT_PERIOD, 400, OUTPUT_PERIOD):
+            fusion.add_attitude(attitude(time_boot_ms, 0.0))
+
+        extrapolated = fusion.pop_readings()
+        fusion.add_position(position(300, 3.0, 10.0))
+        caught_up = fusion.pop_readings()
+
+        # Test
+        assert [reading.time_since_boot for reading in extrapolated] == [0, 50, 100]
+        assert extrapolated[-1].y == pytest.approx(1.0)
+        assert [reading.time_since_boot for reading in caught_up] == [150, 200, 250, 300, 350]
+        assert caught_up[1].y == pytest.approx(2.0)
+        # Past the position again, extrapolated
+        assert caught_up[-1].y == pytest.approx(3.5)
+
+    def test_restarts_after_gap(self, fusion: telemetry_fusion.TelemetryFusion) -> None:
+        """
+        Streams are not interpolated across a gap longer than the limit.
+        """
+        # Setup
+        fusion.add_attitude(attitude(0, 0.0))
+        fusion.add_position(position(0, 0.0))
+        after_gap = telemetry_fusion.MAX_GAP + 1010
+
+        # Run
+        fusion.add_attitude(attitude(after_gap, 1.0))
+        fusion.add_position(position(after_gap, 5.0))
+        fusion.add_attitude(attitude(after_gap + 40, 1.0))
+        fusion.add_position(position(after_gap + 40, 5.0))
+        readings = fusion.pop_readings()
+
+        # Test
+        # Nothing in the gap, then the first timestamp on the output period after it
+        assert [reading.time_since_boot for reading in readings] == [0, after_gap + 40]
+        assert readings[1].yaw == pytest.approx(1.0)
+        assert readings[1].y == pytest.approx(5.0)
+
+    def test_restarts_on_older_timestamp(self, fusion: telemetry_fusion.TelemetryFusion) -> None:
+        """
+        A message older than its stream's latest, such as after the drone restarts,
+        starts over from it instead of being interpolated, and a repeated timestamp replaces.
+        """
+        # Setup
+        fusion.add_attitude(attitude(1000, 0.0))
+        fusion.add_attitude(attitude(1050, 0.5))
+        fusion.add_attitude(attitude(1050, 0.1))
+        fusion.add_position(position(1000, 0.0))
+        before = fusion.pop_readings()
+
+        # Run
+        fusion.add_attitude(attitude(20, 1.0))
+        fusion.add_position(position(20, 2.0))
+        fusion.add_attitude(attitude(50, 1.0))
+        fusion.add_position(position(50, 2.0))
+        after = fusion.pop_readings()
+
+        # Test
+        assert [reading.time_since_boot for reading in before] == [1000, 1050]
+        assert before[1].yaw == pytest.approx(0.1)
+        assert [reading.time_since_boot for reading in after] == [50]
+        assert after[0].yaw == pytest.approx(1.0)
+        assert after[0].y == pytest.approx(2.0)
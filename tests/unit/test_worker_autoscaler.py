@@ -0,0 +1,247 @@
+"""
+Test scaling workers from input queue statistics.
+"""
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import overflow_queue
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_stats
+from utilities.workers import worker_autoscaler
+from .conftest import FakeClock
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+MIN_COUNT = 1
+MAX_COUNT = 3
+MAXSIZE = 10
+COOLDOWN = 1.0  # seconds
+
+
+class FakeQueue:
+    """
+    Stands in for an instrumented input queue whose statistics the test sets.
+    """
+
+    def __init__(self) -> None:
+        self.backend = queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        self.overflow_policy = overflow_queue.OverflowPolicy.BLOCK
+        self.maxsize = MAXSIZE
+        self.elapsed = 0.0  # s
+        self.depth_time = 0.0  # item s
+        self.wait_time = 0.0  # s
+
+    def add_window(self, duration: float, mean_depth: float, wait_time: float) -> None:
+        """
+        Adds a period with the mean depth and total consumer wait.
+        """
+        self.elapsed += duration
+        self.depth_time += mean_depth * duration
+        self.wait_time += wait_time
+
+    def stats(self) -> queue_stats.QueueStatsSnapshot:
+        """
+        Returns the statistics so far.
+        """
+        empty = queue_stats.HistogramSnapshot([])
+        mean_depth = self.depth_time / self.elapsed if self.elapsed > 0.0 else 0.0
+        return queue_stats.QueueStatsSnapshot(
+            0, 0, 0, 0, mean_depth, 0, 0.0, 0, self.wait_time, empty, empty, empty, self.elapsed
+        )
+
+
+class FakeManager:
+    """
+    Stands in for a worker manager, only counts its workers.
+    """
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+
+    def remove_exited_workers(self) -> int:
+        """
+        Removed workers are already uncounted.
+        """
+        return 0
+
+    def get_alive_worker_count(self) -> int:
+        """
+        Returns the number of workers.
+        """
+        return self.count
+
+    def get_target_name(self) -> str:
+        """
+        Returns the name of the worker type.
+        """
+        return "stage"
+
+    def add_worker(self) -> bool:
+        """
+        Adds a worker.
+        """
+        self.count += 1
+        return True
+
+    def remove_worker(self, timeout: float | None = None) -> bool:
+        """
+        Removes a worker.
+        """
+        _ = timeout
+        self.count -= 1
+        return True
+
+
+@pytest.fixture()
+def input_queue() -> FakeQueue:  # type: ignore
+    """
+    Queue without any statistics yet.
+    """
+    yield FakeQueue()  # type: ignore
+
+
+@pytest.fixture()
+def local_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger for creating autoscalers.
+    """
+    result, instance = logger.Logger.create("test_worker_autoscaler", False)
+    assert result
+    assert instance is not None
+    yield instance  # type: ignore
+
+
+def create_autoscaler(
+    manager: FakeManager, input_queue: FakeQueue, clock: FakeClock, local_logger: logger.Logger
+) -> worker_autoscaler.WorkerAutoscaler:
+    """
+    Returns an autoscaler adding workers from half the queue size, removing them at half idle.
+    """
+    result, instance = worker_autoscaler.WorkerAutoscaler.create(
+        manager, input_queue, MIN_COUNT, MAX_COUNT, local_logger, 0.0, 0.5, COOLDOWN, clock
+    )
+    assert result
+    assert instance is not None
+    return instance
+
+
+class TestWorkerAutoscaler:
+    """
+    Scaling up, down, cooldown, and bounds.
+    """
+
+    def test_scales_up_when_backed_up_and_busy(
+        self, input_queue: FakeQueue, clock: FakeClock, local_logger: logger.Logger
+    ) -> None:
+        """
+        A deep queue with busy workers adds workers, one per cooldown, up to the maximum.
+        """
+        # Setup
+        manager = FakeManager(1)
+        autoscaler = create_autoscaler(manager, input_queue, clock, local_logger)
+
+        # Run
+        changes = []
+        for _ in range(4):
+            clock.now += COOLDOWN
+            input_queue.add_window(COOLDOWN, MAXSIZE, 0.0)
+            changes.append(autoscaler.run())
+
+        # Test
+        assert changes == [1, 1, 0, 0]
+        assert manager.count == MAX_COUNT
+
+    def test_scales_down_when_idle(
+        self, input_queue: FakeQueue, clock: FakeClock, local_logger: logger.Logger
+    ) -> None:
+        """
+        Workers mostly waiting on an empty queue are removed down to the minimum.
+        """
+        # Setup
+        manager = FakeManager(MAX_COUNT)
+        autoscaler = create_autoscaler(manager, input_queue, clock, local_logger)
+
+        # Run
+        changes = []
+        for _ in range(3):
+            clock.now += COOLDOWN
+            # Every worker waited 90% of the window
+            input_queue.add_window(COOLDOWN, 0.0, 0.9 * COOLDOWN * manager.count)
+            changes.append(autoscaler.run())
+
+        # Test
+        assert changes == [-1, -1, 0]
+        assert manager.count == MIN_COUNT
+
+    def test_waits_for_cooldown(
+        self, input_queue: FakeQueue, clock: FakeClock, local_logger: logger.Logger
+    ) -> None:
+        """
+        No change within the cooldown of the previous one, or of the start.
+        """
+        # Setup
+        manager = FakeManager(1)
+        autoscaler = create_autoscaler(manager, input_queue, clock, local_logger)
+
+        # Run
+        clock.now += COOLDOWN / 2
+        input_queue.add_window(COOLDOWN / 2, MAXSIZE, 0.0)
+        early = autoscaler.run()
+        clock.now += COOLDOWN / 2
+        input_queue.add_window(COOLDOWN / 2, MAXSIZE, 0.0)
+        due = autoscaler.run()
+        clock.now += COOLDOWN / 2
+        input_queue.add_window(COOLDOWN / 2, MAXSIZE, 0.0)
+        cooling = autoscaler.run()
+
+        # Test
+        assert early == 0
+        assert due == 1
+        assert cooling == 0
+        assert manager.count == 2
+
+    def test_steady_between_thresholds(
+        self, input_queue: FakeQueue, clock: FakeClock, local_logger: logger.Logger
+    ) -> None:
+        """
+        A shallow queue with busy workers, or a deep one with idle workers, changes nothing.
+        """
+        # Setup
+        manager = FakeManager(2)
+        autoscaler = create_autoscaler(manager, input_queue, clock, local_logger)
+
+        # Run
+        clock.now += COOLDOWN
+        input_queue.add_window(COOLDOWN, 1.0, 0.0)
+        shallow = autoscaler.run()
+        clock.now += COOLDOWN
+        input_queue.add_window(COOLDOWN, MAXSIZE, 2 * 0.9 * COOLDOWN)
+        deep_idle = autoscaler.run()
+
+        # Test
+        assert shallow == 0
+        assert deep_idle == 0
+        assert manager.count == 2
+
+    def test_rejects_queue_dropping_items(
+        self, input_queue: FakeQueue, local_logger: logger.Logger
+    ) -> None:
+        """
+        A queue that drops or overwrites items cannot take the removal sentinel safely.
+        """
+        # Setup
+        input_queue.overflow_policy = overflow_queue.OverflowPolicy.DROP_OLDEST
+
+        # Run
+        result, instance = worker_autoscaler.WorkerAutoscaler.create(
+            FakeManager(1), input_queue, MIN_COUNT, MAX_COUNT, local_logger
+        )
+
+        # Test
+        assert not result
+        assert instance is None
@@ -0,0 +1,223 @@
+"""
+Test exit requests, acknowledgements, and sentinels.
+"""
+
+import multiprocessing as mp
+import time
+
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_controller
+
+
+# Rounds of pause and resume requested at once
+RACE_ROUND_COUNT = 500
+
+
+def consume_until_sentinel(
+    input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Consumer blocked on an empty queue, exits on sentinel.
+    """
+    while not controller.is_exit_requested():
+        if input_queue.queue.get() is None:
+            break
+
+    controller.acknowledge_exit()
+
+
+def produce_until_exit(
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Producer blocked on a full queue.
+    """
+    while not controller.is_exit_requested():
+        output_queue.queue.put(0)
+
+    controller.acknowledge_exit()
+
+
+def request_repeatedly(
+    controller: worker_controller.WorkerController,
+    is_pause: bool,
+    barrier: "mp.synchronize.Barrier",  # type: ignore
+) -> None:
+    """
+    Requester for the race test, requests pause or resume at the start of each round.
+    """
+    for _ in range(RACE_ROUND_COUNT):
+        barrier.wait()
+        if is_pause:
+            controller.request_pause()
+        else:
+            controller.request_resume()
+
+        barrier.wait()
+
+
+class TestWorkerController:
+    """
+    Exit is signalled and acknowledged without fixed delays.
+    """
+
+    def test_exit_request_is_immediate(self) -> None:
+        """
+        Request, wait, and clear do not sleep.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+
+        # Run
+        start = time.monotonic()
+        is_requested_before = controller.wait_for_exit_request(0.0)
+        controller.request_exit()
+        is_requested_after = controller.wait_for_exit_request(1.0)
+        controller.clear_exit()
+        elapsed = time.monotonic() - start
+
+        # Test
+        assert not is_requested_before
+        assert is_requested_after
+        assert not controller.is_exit_requested()
+        assert elapsed < 0.05
+
+    def test_pause_blocks_until_resume(self) -> None:
+        """
+        Worker blocked in check_pause continues once resumed.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        controller.request_pause()
+        worker = mp.Process(target=controller.check_pause)
+        worker.start()
+
+        # Run
+        worker.join(0.05)
+        is_blocked = worker.is_alive()
+        controller.request_resume()
+        worker.join(1.0)
+
+        # Test
+        assert is_blocked
+        assert not worker.is_alive()
+
+    def test_racing_pause_and_resume(self) -> None:
+        """
+        Pause and resume requested at once from two processes leave the pause flag and the
+        resume event agreeing, so check_pause never spins.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        # Both requesters and this process, which checks between rounds
+        barrier = mp.Barrier(3)
+        requesters = [
+            mp.Process(target=request_repeatedly, args=(controller, True, barrier)),
+            mp.Process(target=request_repeatedly, args=(controller, False, barrier)),
+        ]
+
+        # Run
+        for requester in requesters:
+            requester.start()
+
+        disagreement_count = 0
+        for _ in range(RACE_ROUND_COUNT):
+            barrier.wait()
+            barrier.wait()
+            # No public accessor for the event, only check_pause waits on it
+            # pylint: disable-next=protected-access
+            is_resumed = controller._WorkerController__resume.is_set()  # type: ignore
+            if controller.is_pause_requested() == is_resumed:
+                disagreement_count += 1
+
+        for requester in requesters:
+            requester.join()
+
+        # Test
+        assert disagreement_count == 0
+
+    def test_acknowledgement_only_after_request(self) -> None:
+        """
+        Workers returning before exit is requested do not count.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+
+        # Run
+        controller.acknowledge_exit()
+        is_acknowledged_before = controller.wait_for_exit_acknowledgement(0.0)
+        controller.request_exit()
+        controller.acknowledge_exit()
+        is_acknowledged_after = controller.wait_for_exit_acknowledgement(0.0)
+
+        # Test
+        assert not is_acknowledged_before
+        assert is_acknowledged_after
+
+    def test_blocked_workers_acknowledge(self) -> None:
+        """
+        Draining and filling with sentinels unblocks producers and consumers.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        full_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 2, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        )
+        empty_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 2, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        )
+        workers = [
+            mp.Process(target=produce_until_exit, args=(full_queue, controller)),
+            mp.Process(target=consume_until_sentinel, args=(empty_queue, controller)),
+        ]
+        for worker in workers:
+            worker.start()
+
+        while not full_queue.queue.full():
+            time.sleep(0.001)
+
+        # Run
+        start = time.monotonic()
+        controller.request_exit()
+        full_queue.drain_queue()
+        empty_queue.fill_queue_with_sentinel()
+        acknowledged = [controller.wait_for_exit_acknowledgement(1.0) for _ in workers]
+        elapsed = time.monotonic() - start
+        for worker in workers:
+            worker.join(1.0)
+
+        # Test
+        assert all(acknowledged)
+        assert elapsed < 0.5
+        assert not any(worker.is_alive() for worker in workers)
+        full_queue.close()
+        empty_queue.close()
+
+    def test_drain_removes_everything(self) -> None:
+        """
+        Draining does not stop at maxsize, and sentinels do not block on a full queue.
+        """
+        # Setup
+        infinite_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 0, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        )
+        for i in range(10):
+            infinite_queue.queue.put(i)
+
+        full_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, 2, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+        )
+        full_queue.fill_queue_with_sentinel()
+
+        # Run
+        drained_count = infinite_queue.drain_queue()
+        put_count = full_queue.fill_queue_with_sentinel()
+
+        # Test
+        assert drained_count == 10
+        assert infinite_queue.queue.empty()
+        assert put_count == 0
+        infinite_queue.close()
+        full_queue.close()
@@ -0,0 +1,281 @@
+"""
+Test restarting crashed workers.
+"""
+
+import multiprocessing.connection
+import time
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import worker_controller
+from utilities.workers import worker_supervisor
+from .conftest import FakeClock
+
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+INITIAL_BACKOFF = 1.0  # seconds
+CRASH_LOOP_LIMIT = 2
+# Real time waiting for the supervisor thread
+WAIT_TIMEOUT = 5.0  # seconds
+
+
+class FakeWorker:
+    """
+    Stands in for a worker process, exits when the test says so.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.pid = 1
+        self.exitcode = None
+        # Closing the writer makes the sentinel ready, like a process ending
+        self.sentinel, self.__writer = multiprocessing.connection.Pipe(False)
+
+    def exit(self, exitcode: int) -> None:
+        """
+        Ends the worker with the exit code.
+        """
+        self.exitcode = exitcode
+        self.__writer.close()
+
+    def join(self, timeout: float | None = None) -> None:
+        """
+        Already ended when the supervisor joins.
+        """
+        _ = timeout
+
+    def is_alive(self) -> bool:
+        """
+        Returns whether the worker has not exited.
+        """
+        return self.exitcode is None
+
+
+class FakeManager:
+    """
+    Stands in for a worker manager, restarts workers by replacing them with new fakes.
+    """
+
+    def __init__(self, name: str, count: int) -> None:
+        self.__name = name
+        self.workers = [FakeWorker(f"{name}-{i}") for i in range(count)]
+        self.restarted: "list[FakeWorker]" = []
+        # Restarts fail while set, like a worker that cannot be created
+        self.is_restart_failing = False
+
+    def get_workers(self) -> "list[FakeWorker]":
+        """
+        Returns the current workers.
+        """
+        return list(self.workers)
+
+    def get_target_name(self) -> str:
+        """
+        Returns the name of the worker type.
+        """
+        return self.__name
+
+    def restart_worker(self, worker: FakeWorker) -> bool:
+        """
+        Replaces the worker, unless restarts are failing.
+        """
+        if self.is_restart_failing:
+            return False
+
+        index = self.workers.index(worker)
+        self.workers[index] = FakeWorker(f"{worker.name}+")
+        self.restarted.append(worker)
+        return True
+
+
+@pytest.fixture()
+def manager() -> FakeManager:  # type: ignore
+    """
+    Two workers of one type.
+    """
+    yield FakeManager("stage", 2)  # type: ignore
+
+
+@pytest.fixture()
+def supervisor(
+    manager: FakeManager, clock: FakeClock
+) -> worker_supervisor.WorkerSupervisor:  # type: ignore
+    """
+    Supervisor of the manager, started and stopped afterwards.
+    """
+    result, local_logger = logger.Logger.create("test_worker_supervisor", False)
+    assert result
+    assert local_logger is not None
+    result, instance = worker_supervisor.WorkerSupervisor.create(
+        [manager],
+        worker_controller.WorkerController(),
+        local_logger,
+        INITIAL_BACKOFF,
+        10 * INITIAL_BACKOFF,
+        CRASH_LOOP_LIMIT,
+        60.0,
+        clock,
+    )
+    assert result
+    assert instance is not None
+    instance.start()
+    yield instance  # type: ignore
+    instance.stop()
+
+
+def wait_for_stats(
+    supervisor: worker_supervisor.WorkerSupervisor,
+    is_reached: "(worker_supervisor.WorkerTypeStats) -> bool",  # type: ignore
+) -> worker_supervisor.WorkerTypeStats:
+    """
+    Returns the statistics of the worker type once they satisfy the condition.
+    """
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while True:
+        stats = supervisor.get_stats()["stage"]
+        if is_reached(stats) or time.monotonic() > deadline:
+            return stats
+
+        time.sleep(0.001)
+
+
+def advance(
+    supervisor: worker_supervisor.WorkerSupervisor, clock: FakeClock, duration: float
+) -> None:
+    """
+    Moves the clock on and wakes the supervisor up to look at it.
+    """
+    clock.now += duration
+    supervisor.refresh()
+
+
+class TestWorkerSupervisor:
+    """
+    Restarts, backoff, and crash loops.
+    """
+
+    def test_restarts_crash_after_backoff(
+        self,
+        supervisor: worker_supervisor.WorkerSupervisor,
+        manager: FakeManager,
+        clock: FakeClock,
+    ) -> None:
+        """
+        A crashed worker is restarted once the backoff has passed, and its downtime counted.
+        """
+        # Setup
+        crashed = manager.workers[0]
+
+        # Run
+        crashed.exit(1)
+        crashed_stats = wait_for_stats(supervisor, lambda stats: stats.crash_count == 1)
+        advance(supervisor, clock, INITIAL_BACKOFF)
+        restarted_stats = wait_for_stats(supervisor, lambda stats: stats.restart_count == 1)
+
+        # Test
+        assert crashed_stats.crash_count == 1
+        assert crashed_stats.restart_count == 0
+        assert manager.restarted == [crashed]
+        assert crashed not in manager.workers
+        assert restarted_stats.downtime == pytest.approx(INITIAL_BACKOFF)
+        assert not restarted_stats.is_crash_looping
+
+    def test_clean_exit_not_restarted(
+        self,
+        supervisor: worker_supervisor.WorkerSupervisor,
+        manager: FakeManager,
+        clock: FakeClock,
+    ) -> None:
+        """
+        A worker exiting with exit code 0 is neither counted nor restarted.
+        """
+        # Setup
+        exited, crashed = manager.workers
+
+        # Run
+        exited.exit(0)
+        crashed.exit(1)
+        wait_for_stats(supervisor, lambda stats: stats.crash_count == 1)
+        advance(supervisor, clock, INITIAL_BACKOFF)
+        stats = wait_for_stats(supervisor, lambda stats: stats.restart_count == 1)
+
+        # Test
+        assert stats.crash_count == 1
+        assert manager.restarted == [crashed]
+        assert exited in manager.workers
+
+    def test_backoff_doubles_until_crash_loop(
+        self,
+        supervisor: worker_supervisor.WorkerSupervisor,
+        manager: FakeManager,
+        clock: FakeClock,
+    ) -> None:
+        """
+        Each crash within the window doubles the wait, and crashes beyond the limit give up.
+        """
+        # Setup
+        manager.workers[0].exit(1)
+        wait_for_stats(supervisor, lambda stats: stats.crash_count == 1)
+        advance(supervisor, clock, INITIAL_BACKOFF)
+        wait_for_stats(supervisor, lambda stats: stats.restart_count == 1)
+
+        # Run
+        manager.workers[0].exit(1)
+        wait_for_stats(supervisor, lambda stats: stats.crash_count == 2)
+        # Not yet, the second wait is twice as long
+        advance(supervisor, clock, INITIAL_BACKOFF)
+        time.sleep(0.05)
+        early_stats = supervisor.get_stats()["stage"]
+        advance(supervisor, clock, INITIAL_BACKOFF)
+        second_stats = wait_for_stats(supervisor, lambda stats: stats.restart_count == 2)
+        manager.workers[0].exit(1)
+        looping_stats = wait_for_stats(supervisor, lambda stats: stats.is_crash_looping)
+
+        # Test
+        assert early_stats.restart_count == 1
+        assert second_stats.restart_count == 2
+        assert second_stats.downtime == pytest.approx(3 * INITIAL_BACKOFF)
+        assert looping_stats.crash_count == 3
+        assert looping_stats.is_crash_looping
+        assert len(manager.restarted) == 2
+
+    def test_failed_restart_not_counted_as_crash(
+        self,
+        supervisor: worker_supervisor.WorkerSupervisor,
+        manager: FakeManager,
+        clock: FakeClock,
+    ) -> None:
+        """
+        A restart that fails is retried after a longer backoff, and the worker crashed only once.
+        """
+        # Setup
+        crashed = manager.workers[0]
+        manager.is_restart_failing = True
+
+        # Run
+        crashed.exit(1)
+        wait_for_stats(supervisor, lambda stats: stats.crash_count == 1)
+        advance(supervisor, clock, INITIAL_BACKOFF)
+        failed_stats = wait_for_stats(supervisor, lambda stats: stats.restart_failure_count == 1)
+        # The dead worker is still managed, give the supervisor time to see it again
+        time.sleep(0.05)
+        waiting_stats = supervisor.get_stats()["stage"]
+        manager.is_restart_failing = False
+        advance(supervisor, clock, 2 * INITIAL_BACKOFF)
+        restarted_stats = wait_for_stats(supervisor, lambda stats: stats.restart_count == 1)
+
+        # Test
+        assert failed_stats.restart_failure_count == 1
+        assert failed_stats.restart_count == 0
+        assert waiting_stats.crash_count == 1
+        assert waiting_stats.restart_failure_count == 1
+        assert restarted_stats.crash_count == 1
+        assert restarted_stats.restart_failure_count == 1
+        assert manager.restarted == [crashed]
+        assert restarted_stats.downtime == pytest.approx(3 * INITIAL_BACKOFF)
+        assert not restarted_stats.is_crash_looping
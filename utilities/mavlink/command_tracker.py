@@ -0,0 +1,209 @@
+"""
+Tracks sent MAVLink commands until they are acknowledged.
+"""
+
+import time
+
+from pymavlink import mavutil
+
+
+class CommandStats:
+    """
+    Round trip and retry statistics of one command ID.
+    """
+
+    def __init__(self) -> None:
+        # Accepted commands only, refused ones count as failed
+        self.ack_count = 0
+        self.total_latency = 0.0  # seconds
+        self.min_latency = float("inf")  # seconds
+        self.max_latency = 0.0  # seconds
+        self.suppressed_count = 0
+        self.retry_count = 0
+        self.failed_count = 0
+
+    @property
+    def mean_latency(self) -> float:
+        """
+        Mean time in seconds from the latest transmission to its acknowledgement.
+        """
+        return self.total_latency / self.ack_count if self.ack_count > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.ack_count} acknowledged, "
+            f"latency mean {self.mean_latency * 1000:.1f} ms "
+            f"min {(self.min_latency if self.ack_count > 0 else 0.0) * 1000:.1f} ms "
+            f"max {self.max_latency * 1000:.1f} ms, "
+            f"{self.suppressed_count} duplicates suppressed, "
+            f"{self.retry_count} retries, {self.failed_count} failed"
+        )
+
+
+class InFlightCommand:
+    """
+    Command waiting for its acknowledgement.
+    """
+
+    __slots__ = ("command", "key", "send", "attempts", "sent_time", "deadline")
+
+    def __init__(
+        self,
+        command: int,
+        key: "tuple",
+        send: "(int) -> None",  # type: ignore
+        sent_time: float,
+        deadline: float,
+    ) -> None:
+        self.command = command
+        self.key = key
+        self.send = send
+        self.attempts = 1
+        self.sent_time = sent_time
+        self.deadline = deadline
+
+
+class CommandTracker:
+    """
+    In flight command table keyed by the command ID and its target parameters.
+
+    A command matching one that is still in flight is not sent again. COMMAND_ACK only carries
+    the command ID, so it completes the oldest in flight command with that ID. Commands without
+    an acknowledgement are sent again with the confirmation field counting the retransmissions,
+    waiting longer after each, until they are given up.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 1.0,
+        max_attempts: int = 3,
+        backoff: float = 2.0,
+        clock: "() -> float" = time.monotonic,  # type: ignore
+    ) -> None:
+        """
+        timeout: Time in seconds to wait for the first acknowledgement.
+        max_attempts: Transmissions before the command is given up.
+        backoff: Factor the wait grows by after each transmission.
+        clock: Current time in seconds.
+        """
+        assert timeout > 0.0, "Timeout must be positive"
+        assert max_attempts > 0, "Command must be sent at least once"
+        assert backoff >= 1.0, "Backoff must not shorten the wait"
+
+        self.__timeout = timeout
+        self.__max_attempts = max_attempts
+        self.__backoff = backoff
+        self.__clock = clock
+
+        # Insertion order is send order, so the oldest command of an ID is found first
+        self.__in_flight: "dict[tuple, InFlightCommand]" = {}
+        self.__stats: "dict[int, CommandStats]" = {}
+
+    def __get_stats(self, command: int) -> CommandStats:
+        """
+        Returns the statistics of the command ID, created on first use.
+        """
+        stats = self.__stats.get(command)
+        if stats is None:
+            stats = CommandStats()
+            self.__stats[command] = stats
+
+        return stats
+
+    def send(self, command: int, params: "tuple", send: "(int) -> None") -> bool:  # type: ignore
+        """
+        Sends the command unless a matching one is in flight.
+
+        command: MAVLink command ID, such as MAV_CMD_CONDITION_YAW .
+        params: Target parameters identifying duplicates of the command.
+        send: Sends the command with the given confirmation (0, then 1 for the first retry...).
+
+        Returns whether the command was sent.
+        """
+        key = (command, *params)
+        if key in self.__in_flight:
+            self.__get_stats(command).suppressed_count += 1
+            return False
+
+        now = self.__clock()
+        self.__in_flight[key] = InFlightCommand(command, key, send, now, now + self.__timeout)
+        send(0)
+        return True
+
+    def handle_ack(
+        self, ack: mavutil.mavlink.MAVLink_command_ack_message, receive_time: float | None = None
+    ) -> bool:
+        """
+        Completes the oldest in flight command with the acknowledged command ID.
+        A command in progress stays in flight but is not sent again until the timeout.
+        A command the vehicle did not accept counts as failed, without a latency.
+
+        receive_time: Time the ack was received on the clock, None if it was just received.
+
+        Returns whether an in flight command matched.
+        """
+        entry = next(
+            (entry for entry in self.__in_flight.values() if entry.command == ack.command),
+            None,
+        )
+        if entry is None:
+            return False
+
+        now = self.__clock()
+        if ack.result == mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+            entry.deadline = now + self.__timeout
+            return True
+
+        del self.__in_flight[entry.key]
+        stats = self.__get_stats(entry.command)
+        # Denied, failed, unsupported... are answered but not carried out
+        if ack.result != mavutil.mavlink.MAV_RESULT_ACCEPTED:
+            stats.failed_count += 1
+            return True
+
+        # Never negative, in case the ack was received as the command was sent again
+        latency = max((now if receive_time is None else receive_time) - entry.sent_time, 0.0)
+        stats.ack_count += 1
+        stats.total_latency += latency
+        stats.min_latency = min(stats.min_latency, latency)
+        stats.max_latency = max(stats.max_latency, latency)
+        return True
+
+    def check_timeouts(self) -> int:
+        """
+        Sends unacknowledged commands again, or gives them up after the last attempt.
+
+        Returns the number of commands sent again.
+        """
+        now = self.__clock()
+        retried = 0
+        for entry in list(self.__in_flight.values()):
+            if now < entry.deadline:
+                continue
+
+            stats = self.__get_stats(entry.command)
+            if entry.attempts >= self.__max_attempts:
+                del self.__in_flight[entry.key]
+                stats.failed_count += 1
+                continue
+
+            entry.send(entry.attempts)
+            stats.retry_count += 1
+            entry.sent_time = now
+            entry.deadline = now + self.__timeout * self.__backoff**entry.attempts
+            entry.attempts += 1
+            retried += 1
+
+        return retried
+
+    def in_flight_count(self) -> int:
+        """
+        Returns the number of commands waiting for an acknowledgement.
+        """
+        return len(self.__in_flight)
+
+    def get_stats(self) -> "dict[int, CommandStats]":
+        """
+        Returns the statistics of each command ID sent.
+        """
+        return self.__stats
@@ -0,0 +1,502 @@
+"""
+MAVLink link quality statistics shared between processes.
+"""
+
+import ctypes
+import multiprocessing as mp
+import time
+
+import numpy as np
+from pymavlink import mavutil
+
+from utilities.workers import queue_stats
+from . import message_dispatcher
+
+
+# Sequence numbers are 8 bits, steps back of up to half the range are packets arriving late
+SEQUENCE_MODULUS = 256
+SEQUENCE_HALF_RANGE = SEQUENCE_MODULUS // 2
+
+# Header bytes read, zeros past the end of the data
+HEADER_READ_SIZE = message_dispatcher.MAVLINK_V2_HEADER_SIZE
+
+
+class SourceLinkStats:
+    """
+    Sequence number statistics of one (system ID, component ID).
+    """
+
+    def __init__(
+        self,
+        system: int,
+        component: int,
+        received_count: int,
+        dropped_count: int,
+        reordered_count: int,
+    ) -> None:
+        self.system = system
+        self.component = component
+        self.received_count = received_count
+        self.dropped_count = dropped_count
+        # Arrived behind the highest sequence number, late or duplicated
+        self.reordered_count = reordered_count
+
+    @property
+    def loss_rate(self) -> float:
+        """
+        Fraction of packets sent by the source that did not arrive.
+        """
+        sent_count = self.received_count + self.dropped_count
+        return self.dropped_count / sent_count if sent_count > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"system {self.system} component {self.component}: "
+            f"{self.received_count} received, {self.dropped_count} dropped "
+            f"({self.loss_rate:.2%} loss), {self.reordered_count} out of order"
+        )
+
+
+class MessageLinkStats:
+    """
+    Arrival statistics of one message ID.
+    """
+
+    def __init__(
+        self,
+        message_id: int,
+        count: int,
+        byte_count: int,
+        interval_histogram: queue_stats.HistogramSnapshot,
+        elapsed: float,  # s
+    ) -> None:
+        self.message_id = message_id
+        self.count = count
+        self.byte_count = byte_count
+        # Time between arrivals of the message ID
+        self.interval_histogram = interval_histogram
+        self.elapsed = elapsed
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the message ID in the dialect, or the ID itself if it is not in it.
+        """
+        message_type = mavutil.mavlink.mavlink_map.get(self.message_id)
+        return message_type.msgname if message_type is not None else str(self.message_id)
+
+    @property
+    def rate(self) -> float:
+        """
+        Mean messages per second since the statistics started.
+        """
+        return self.count / self.elapsed if self.elapsed > 0.0 else 0.0
+
+    @property
+    def byte_rate(self) -> float:
+        """
+        Mean bytes per second since the statistics started.
+        """
+        return self.byte_count / self.elapsed if self.elapsed > 0.0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.count} ({self.rate:.1f}/s), {self.byte_rate:.0f} B/s, "
+            f"interval {self.interval_histogram}"
+        )
+
+
+class LinkStatsSnapshot:
+    """
+    Copy of the link statistics at the time they were last published.
+    """
+
+    def __init__(
+        self,
+        sources: "list[SourceLinkStats]",
+        messages: "list[MessageLinkStats]",
+        untracked_count: int,
+        elapsed: float,  # s
+    ) -> None:
+        self.sources = sources
+        self.messages = messages
+        # Packets whose source or message ID did not fit in the tables, once for each table
+        self.untracked_count = untracked_count
+        # Time since the statistics started, for rates between two snapshots
+        self.elapsed = elapsed
+
+    @property
+    def packet_count(self) -> int:
+        """
+        Packets received of every tracked message ID.
+        """
+        return sum(message.count for message in self.messages)
+
+    @property
+    def byte_count(self) -> int:
+        """
+        Bytes received in packets of every tracked message ID.
+        """
+        return sum(message.byte_count for message in self.messages)
+
+    @property
+    def byte_rate(self) -> float:
+        """
+        Mean bytes per second since the statistics started.
+        """
+        return self.byte_count / self.elapsed if self.elapsed > 0.0 else 0.0
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.packet_count} packets, {self.byte_count} bytes ({self.byte_rate:.0f} B/s) "
+            f"in {self.elapsed:.1f} s, {self.untracked_count} untracked"
+        ]
+        lines.extend(str(source) for source in self.sources)
+        lines.extend(str(message) for message in self.messages)
+        return "\n".join(lines)
+
+
+class LinkStats:  # pylint: disable=too-many-instance-attributes
+    """
+    Drops and reordering from the sequence number of each source, and rates, throughput,
+    and inter-arrival histograms of each message ID.
+
+    The receiving process only keeps the data and packet positions of each read, so the
+    receive path does no per packet arithmetic in Python. Each publish period the kept
+    headers are processed together with numpy, and the totals are copied to shared memory.
+    Any process can take a snapshot of the last copy, using its version counter like a seqlock.
+
+    Sequence numbers are extended past 8 bits like RTP (RFC 3550): dropped packets are the
+    ones expected up to the highest sequence number that did not arrive.
+    """
+
+    HISTOGRAM_BUCKET_COUNT = queue_stats.QueueStats.HISTOGRAM_BUCKET_COUNT
+
+    # Header indices
+    __VERSION = 0  # Odd while publishing
+    __START = 1  # ns
+    __PUBLISHED = 2  # ns
+    __UNTRACKED_COUNT = 3
+    __HEADER_SIZE = 4
+
+    # Source entry offsets, sequence numbers are extended
+    __SOURCE_KEY = 0  # System ID << 8 | component ID, -1 if unused
+    __RECEIVED_COUNT = 1
+    __REORDERED_COUNT = 2
+    __FIRST_SEQUENCE = 3
+    __HIGHEST_SEQUENCE = 4
+    __LAST_SEQUENCE = 5
+    __SOURCE_SIZE = 6
+
+    # Message entry offsets
+    __MESSAGE_ID = 0  # -1 if unused
+    __MESSAGE_COUNT = 1
+    __BYTE_COUNT = 2
+    __LAST_ARRIVAL = 3  # ns
+    __INTERVAL_HISTOGRAM = 4
+    __MESSAGE_SIZE = __INTERVAL_HISTOGRAM + HISTOGRAM_BUCKET_COUNT
+
+    def __init__(
+        self,
+        source_slot_count: int = 16,
+        message_slot_count: int = 64,
+        publish_period: float = 0.1,
+    ) -> None:
+        """
+        source_slot_count: Most (system ID, component ID) tracked.
+        message_slot_count: Most message IDs tracked.
+        publish_period: Time in seconds between copies to shared memory.
+        """
+        assert source_slot_count > 0, "Requires at least one source slot"
+        assert message_slot_count > 0, "Requires at least one message slot"
+        assert publish_period >= 0.0, "Publish period must not be negative"
+
+        self.__source_slot_count = source_slot_count
+        self.__message_slot_count = message_slot_count
+        self.__messages_offset = self.__HEADER_SIZE + source_slot_count * self.__SOURCE_SIZE
+        size = self.__messages_offset + message_slot_count * self.__MESSAGE_SIZE
+
+        self.__values = np.zeros(size, np.int64)
+        self.__sources()[:, self.__SOURCE_KEY] = -1
+        self.__messages()[:, self.__MESSAGE_ID] = -1
+
+        # Key to slot of its entry, in the recording process only
+        self.__source_slots: "dict[int, int]" = {}
+        self.__message_slots: "dict[int, int]" = {}
+
+        # Reads since the last publish: their data, packet positions in their read,
+        # and offset of each read in the data, its packet count, and its arrival time in ns
+        self.__data = bytearray()
+        self.__positions: "list[int]" = []
+        self.__read_offsets: "list[int]" = []
+        self.__read_counts: "list[int]" = []
+        self.__read_times: "list[int]" = []
+
+        self.__publish_period_ns = int(publish_period * 1e9)
+        now = time.monotonic_ns()
+        self.__values[self.__START] = now
+        self.__next_publish = now
+
+        self.__shared = mp.RawArray("q", size)
+        self.publish(now)
+
+    def __sources(self) -> np.ndarray:
+        """
+        Returns the source entries, one row per slot.
+        """
+        end = self.__messages_offset
+        return self.__values[self.__HEADER_SIZE : end].reshape(self.__source_slot_count, -1)
+
+    def __messages(self) -> np.ndarray:
+        """
+        Returns the message entries, one row per slot.
+        """
+        return self.__values[self.__messages_offset :].reshape(self.__message_slot_count, -1)
+
+    @staticmethod
+    def __slot(slots: "dict[int, int]", key: int, slot_count: int) -> int:
+        """
+        Returns the slot of the key, a new one if it has none, -1 if the table is full.
+        """
+        slot = slots.get(key)
+        if slot is None:
+            if len(slots) == slot_count:
+                return -1
+
+            slot = len(slots)
+            slots[key] = slot
+
+        return slot
+
+    def record(self, data: bytearray, positions: "list[int]", now_ns: int) -> None:
+        """
+        Keeps the packets of a read, and publishes if the publish period has passed.
+        Has the signature of a `MessageDispatcher.observe()` observer.
+
+        data: Received data, copied.
+        positions: Index of the start of each packet in the data.
+        now_ns: Arrival time on the monotonic clock in nanoseconds.
+        """
+        kept_data = self.__data
+        self.__read_offsets.append(len(kept_data))
+        self.__read_counts.append(len(positions))
+        self.__read_times.append(now_ns)
+        kept_data += data
+        self.__positions.extend(positions)
+
+        if now_ns >= self.__next_publish:
+            self.publish(now_ns)
+
+    def __process(self) -> None:
+        """
+        Adds the packets kept since the last call to the totals.
+        """
+        if len(self.__positions) == 0:
+            return
+
+        read_counts = np.array(self.__read_counts, np.int64)
+        positions = np.array(self.__positions, np.int64) + np.repeat(
+            np.array(self.__read_offsets, np.int64), read_counts
+        )
+        times = np.repeat(np.array(self.__read_times, np.int64), read_counts)
+        self.__data += bytes(HEADER_READ_SIZE)
+        headers = np.frombuffer(self.__data, np.uint8)
+        headers = headers[positions[:, np.newaxis] + np.arange(HEADER_READ_SIZE)].astype(np.int64)
+
+        self.__data = bytearray()
+        self.__positions = []
+        self.__read_offsets = []
+        self.__read_counts = []
+        self.__read_times = []
+
+        is_v2 = headers[:, 0] == message_dispatcher.MAVLINK_V2_MARKER
+        sequences = np.where(is_v2, headers[:, 4], headers[:, 2])
+        keys = np.where(
+            is_v2, headers[:, 5] << 8 | headers[:, 6], headers[:, 3] << 8 | headers[:, 4]
+        )
+        message_ids = np.where(
+            is_v2, headers[:, 7] | headers[:, 8] << 8 | headers[:, 9] << 16, headers[:, 5]
+        )
+        signature_sizes = np.where(
+            headers[:, 2] & message_dispatcher.MAVLINK_IFLAG_SIGNED,
+            message_dispatcher.MAVLINK_SIGNATURE_SIZE,
+            0,
+        )
+        sizes = headers[:, 1] + np.where(
+            is_v2,
+            message_dispatcher.MAVLINK_V2_HEADER_SIZE + signature_sizes,
+            message_dispatcher.MAVLINK_V1_HEADER_SIZE,
+        )
+        sizes += message_dispatcher.MAVLINK_CHECKSUM_SIZE
+
+        self.__process_sources(keys, sequences)
+        self.__process_messages(message_ids, sizes, times)
+
+    def __process_sources(self, keys: np.ndarray, sequences: np.ndarray) -> None:
+        """
+        Extends the sequence numbers of each source and counts those arriving late.
+        """
+        entries = self.__sources()
+        for key in np.unique(keys).tolist():
+            slot = self.__slot(self.__source_slots, key, self.__source_slot_count)
+            source_sequences = sequences[keys == key]
+            if slot < 0:
+                self.__values[self.__UNTRACKED_COUNT] += len(source_sequences)
+                continue
+
+            entry = entries[slot]
+            if entry[self.__SOURCE_KEY] < 0:
+                entry[self.__SOURCE_KEY] = key
+                entry[self.__FIRST_SEQUENCE] = source_sequences[0]
+                entry[self.__HIGHEST_SEQUENCE] = source_sequences[0] - 1
+                entry[self.__LAST_SEQUENCE] = source_sequences[0]
+
+            # Steps from the previous packet, wrapped to [-128, 128)
+            steps = np.diff(
+                source_sequences, prepend=entry[self.__LAST_SEQUENCE] % SEQUENCE_MODULUS
+            )
+            steps = (steps + SEQUENCE_HALF_RANGE) % SEQUENCE_MODULUS - SEQUENCE_HALF_RANGE
+            extended = entry[self.__LAST_SEQUENCE] + np.cumsum(steps)
+            highest_before = np.maximum.accumulate(
+                np.concatenate(([entry[self.__HIGHEST_SEQUENCE]], extended[:-1]))
+            )
+
+            entry[self.__RECEIVED_COUNT] += len(extended)
+            entry[self.__REORDERED_COUNT] += np.count_nonzero(extended <= highest_before)
+            entry[self.__HIGHEST_SEQUENCE] = max(entry[self.__HIGHEST_SEQUENCE], extended.max())
+            entry[self.__LAST_SEQUENCE] = extended[-1]
+
+    def __process_messages(
+        self, message_ids: np.ndarray, sizes: np.ndarray, times: np.ndarray
+    ) -> None:
+        """
+        Counts the packets and bytes of each message ID, and the time since the previous one.
+        """
+        unique_ids, packet_ids = np.unique(message_ids, return_inverse=True)
+        unique_slots = np.array(
+            [
+                self.__slot(self.__message_slots, message_id, self.__message_slot_count)
+                for message_id in unique_ids.tolist()
+            ]
+        )
+        slots = unique_slots[packet_ids]
+        is_tracked = slots >= 0
+        self.__values[self.__UNTRACKED_COUNT] += np.count_nonzero(~is_tracked)
+
+        entries = self.__messages()
+        is_unique_tracked = unique_slots >= 0
+        entries[unique_slots[is_unique_tracked], self.__MESSAGE_ID] = unique_ids[is_unique_tracked]
+
+        slots = slots[is_tracked]
+        times = times[is_tracked]
+        np.add.at(entries[:, self.__MESSAGE_COUNT], slots, 1)
+        np.add.at(entries[:, self.__BYTE_COUNT], slots, sizes[is_tracked])
+
+        # Previous arrival of the same message ID, from the last publish for the first of each
+        order = np.argsort(slots, kind="stable")
+        slots = slots[order]
+        times = times[order]
+        previous_times = np.empty_like(times)
+        previous_times[1:] = times[:-1]
+        is_first = np.ones(len(slots), bool)
+        is_first[1:] = slots[1:] != slots[:-1]
+        previous_times[is_first] = entries[slots[is_first], self.__LAST_ARRIVAL]
+        # Not for the first arrival of the message ID
+        has_previous = previous_times > 0
+
+        # Bucket i counts intervals in [2^(i-1), 2^i) us, the exponent of frexp() is i
+        intervals = (times[has_previous] - previous_times[has_previous]) // 1000
+        _, buckets = np.frexp(intervals.astype(np.float64))
+        buckets = np.minimum(buckets, self.HISTOGRAM_BUCKET_COUNT - 1)
+        np.add.at(entries, (slots[has_previous], self.__INTERVAL_HISTOGRAM + buckets), 1)
+
+        np.maximum.at(entries[:, self.__LAST_ARRIVAL], slots, times)
+
+    def publish(self, now_ns: "int | None" = None) -> None:
+        """
+        Processes the packets kept and copies the statistics to shared memory.
+        Only called by the recording process.
+        """
+        self.__process()
+
+        values = self.__values
+        values[self.__PUBLISHED] = time.monotonic_ns() if now_ns is None else now_ns
+        self.__next_publish = int(values[self.__PUBLISHED]) + self.__publish_period_ns
+
+        shared = self.__shared
+        shared[self.__VERSION] += 1
+        ctypes.memmove(
+            ctypes.addressof(shared) + values.itemsize,
+            values.ctypes.data + values.itemsize,
+            (len(values) - 1) * values.itemsize,
+        )
+        shared[self.__VERSION] += 1
+
+    def publish_if_due(self, now_ns: int) -> None:
+        """
+        Publishes if the publish period has passed since the last time.
+        """
+        if now_ns >= self.__next_publish:
+            self.publish(now_ns)
+
+    def snapshot(self) -> LinkStatsSnapshot:
+        """
+        Returns a consistent copy of the last published statistics, never blocks the recording.
+        """
+        shared = self.__shared
+        while True:
+            version = shared[self.__VERSION]
+            if version % 2 == 1:
+                continue
+
+            values = shared[:]
+            if values[self.__VERSION] == version and shared[self.__VERSION] == version:
+                break
+
+        elapsed = max(values[self.__PUBLISHED] - values[self.__START], 1) / 1e9
+
+        sources = []
+        for slot in range(self.__source_slot_count):
+            offset = self.__HEADER_SIZE + slot * self.__SOURCE_SIZE
+            key = values[offset + self.__SOURCE_KEY]
+            if key < 0:
+                break
+
+            received_count = values[offset + self.__RECEIVED_COUNT]
+            expected_count = (
+                values[offset + self.__HIGHEST_SEQUENCE]
+                - values[offset + self.__FIRST_SEQUENCE]
+                + 1
+            )
+            sources.append(
+                SourceLinkStats(
+                    key >> 8,
+                    key & 0xFF,
+                    received_count,
+                    # Duplicates can make more arrive than were expected
+                    max(expected_count - received_count, 0),
+                    values[offset + self.__REORDERED_COUNT],
+                )
+            )
+
+        messages = []
+        for slot in range(self.__message_slot_count):
+            offset = self.__messages_offset + slot * self.__MESSAGE_SIZE
+            message_id = values[offset + self.__MESSAGE_ID]
+            if message_id < 0:
+                break
+
+            histogram_start = offset + self.__INTERVAL_HISTOGRAM
+            messages.append(
+                MessageLinkStats(
+                    message_id,
+                    values[offset + self.__MESSAGE_COUNT],
+                    values[offset + self.__BYTE_COUNT],
+                    queue_stats.HistogramSnapshot(
+                        values[histogram_start : histogram_start + self.HISTOGRAM_BUCKET_COUNT]
+                    ),
+                    elapsed,
+                )
+            )
+
+        return LinkStatsSnapshot(sources, messages, values[self.__UNTRACKED_COUNT], elapsed)
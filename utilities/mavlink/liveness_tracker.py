@@ -0,0 +1,100 @@
+"""
+Tracks which MAVLink systems are alive from their heartbeat arrival times.
+"""
+
+import collections
+import time
+
+
+class LivenessTracker:
+    """
+    Last heartbeat arrival time of each (system ID, component ID), on the monotonic clock.
+
+    Every key has the same timeout, so keys in arrival order are also in deadline order.
+    A heartbeat moves its key to the end in O(1), and expiring only looks at the keys
+    past their deadline at the front.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        clock: "() -> float" = time.monotonic,  # type: ignore
+    ) -> None:
+        """
+        timeout: Time in seconds after the last heartbeat that a key is no longer alive.
+        clock: Current time in seconds.
+        """
+        assert timeout > 0.0, "Timeout must be positive"
+
+        self.__timeout = timeout
+        self.__clock = clock
+        # Oldest arrival first
+        self.__last_seen: "collections.OrderedDict[tuple[int, int], float]" = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        """
+        Returns the number of keys not yet expired.
+        """
+        return len(self.__last_seen)
+
+    def record(self, system: int, component: int) -> bool:
+        """
+        Records a heartbeat arriving now.
+
+        Returns whether the key is new or was expired.
+        """
+        key = (system, component)
+        is_new = key not in self.__last_seen
+        if not is_new:
+            self.__last_seen.move_to_end(key)
+
+        self.__last_seen[key] = self.__clock()
+        return is_new
+
+    def expire(self) -> "list[tuple[int, int]]":
+        """
+        Forgets the keys past their deadline.
+
+        Returns the expired keys, oldest first.
+        """
+        oldest_alive = self.__clock() - self.__timeout
+        expired = []
+        while len(self.__last_seen) > 0:
+            key, last_seen = next(iter(self.__last_seen.items()))
+            if last_seen > oldest_alive:
+                break
+
+            del self.__last_seen[key]
+            expired.append(key)
+
+        return expired
+
+    def is_alive(self, system: int, component: int) -> bool:
+        """
+        Returns whether the key had a heartbeat within the timeout.
+        """
+        last_seen = self.__last_seen.get((system, component))
+        return last_seen is not None and self.__clock() - last_seen < self.__timeout
+
+    def last_seen(self, system: int, component: int) -> "float | None":
+        """
+        Returns the clock time of the last heartbeat of the key, None if expired or never seen.
+        """
+        return self.__last_seen.get((system, component))
+
+    def next_deadline(self) -> "float | None":
+        """
+        Returns the clock time the next key expires, None if there are none.
+        """
+        if len(self.__last_seen) == 0:
+            return None
+
+        return next(iter(self.__last_seen.values())) + self.__timeout
+
+    def get_alive(self) -> "list[tuple[int, int]]":
+        """
+        Returns the keys not yet expired, oldest heartbeat first.
+        """
+        return list(self.__last_seen)
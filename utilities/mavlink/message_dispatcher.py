@@ -0,0 +1,213 @@
+"""
+Dispatches MAVLink packets by message ID.
+"""
+
+import collections
+import time
+
+from pymavlink import mavutil
+
+
+# Start of packet markers
+MAVLINK_V1_MARKER = 0xFE
+MAVLINK_V2_MARKER = 0xFD
+
+# Bytes before the payload and after it
+MAVLINK_V1_HEADER_SIZE = 6
+MAVLINK_V2_HEADER_SIZE = 10
+MAVLINK_CHECKSUM_SIZE = 2
+MAVLINK_SIGNATURE_SIZE = 13
+MAVLINK_IFLAG_SIGNED = 0x01
+
+# Largest read from the connection
+RECEIVE_SIZE = 4096  # bytes
+
+
+class MessageDispatcher:
+    """
+    Frames raw MAVLink v1 and v2 packets from the header alone, then calls the handlers
+    registered for the message ID with a single table lookup.
+
+    Only packets of subscribed IDs are copied, and only those with a decoded handler are decoded,
+    so everything else is skipped at the cost of reading its header.
+    The checksum is only verified when decoding, so raw handlers must verify it themselves
+    if they need to, like `MAVLink.parse_char()` does.
+    """
+
+    def __init__(self) -> None:
+        # Message ID to handlers
+        self.__handlers: "dict[int, list[(...) -> object]]" = {}  # type: ignore
+        # Message ID to received but not yet taken messages, see recv_message()
+        self.__pending: "dict[int, collections.deque]" = {}
+
+        # Called with the packets of every feed, see observe()
+        self.__observer: "(bytearray, list[int], int) -> object | None" = None  # type: ignore
+
+        self.__buffer = bytearray()
+        self.__parser = mavutil.mavlink.MAVLink(None)
+        self.skipped_count = 0
+        self.invalid_count = 0
+
+    def subscribe(self, message_id: int, handler: "(bytes) -> object") -> None:  # type: ignore
+        """
+        Calls the handler with each raw packet of the message ID.
+        """
+        self.__handlers.setdefault(message_id, []).append(handler)
+
+    def subscribe_decoded(
+        self,
+        message_id: int,
+        handler: "(mavutil.mavlink.MAVLink_message) -> object",  # type: ignore
+    ) -> None:
+        """
+        Calls the handler with each decoded message of the message ID.
+        Packets failing the checksum are counted as invalid and not passed on.
+        """
+
+        def decode_and_handle(packet: bytes) -> None:
+            try:
+                message = self.__parser.decode(bytearray(packet))
+            except mavutil.mavlink.MAVError:
+                self.invalid_count += 1
+                return
+
+            handler(message)
+
+        self.subscribe(message_id, decode_and_handle)
+
+    def observe(self, observer: "(bytearray, list[int], int) -> object | None") -> None:  # type: ignore
+        """
+        Calls the observer once per feed with every packet framed, subscribed or not,
+        after their handlers. Only the positions of the packets are collected while framing.
+
+        observer: Called with the buffered data, index of the start of each packet in it,
+        and the time the data was fed in nanoseconds. None to stop observing.
+        The data is the buffer itself, not a copy, and may end with part of a packet.
+        It changes after the call, so the observer must copy whatever it keeps.
+        """
+        self.__observer = observer
+
+    def unsubscribe(self, message_id: int) -> None:
+        """
+        Removes every handler of the message ID.
+        """
+        self.__handlers.pop(message_id, None)
+        self.__pending.pop(message_id, None)
+
+    def feed(self, data: bytes) -> int:
+        """
+        Dispatches every complete packet in the data, incomplete packets wait for more data.
+
+        Returns the number of packets passed to handlers.
+        """
+        buffer = self.__buffer
+        buffer.extend(data)
+
+        observer = self.__observer
+        positions = [] if observer is not None else None
+
+        dispatched_count = 0
+        position = 0
+        size = len(buffer)
+        while position < size:
+            marker = buffer[position]
+            if marker == MAVLINK_V2_MARKER:
+                header_size = MAVLINK_V2_HEADER_SIZE
+            elif marker == MAVLINK_V1_MARKER:
+                header_size = MAVLINK_V1_HEADER_SIZE
+            else:
+                # Resynchronize on the next marker
+                next_v1 = buffer.find(MAVLINK_V1_MARKER, position + 1)
+                next_v2 = buffer.find(MAVLINK_V2_MARKER, position + 1)
+                candidates = [index for index in (next_v1, next_v2) if index >= 0]
+                position = min(candidates) if len(candidates) > 0 else size
+                continue
+
+            if size - position < header_size:
+                break
+
+            payload_size = buffer[position + 1]
+            if marker == MAVLINK_V2_MARKER:
+                message_id = (
+                    buffer[position + 7] | buffer[position + 8] << 8 | buffer[position + 9] << 16
+                )
+                signature_size = (
+                    MAVLINK_SIGNATURE_SIZE if buffer[position + 2] & MAVLINK_IFLAG_SIGNED else 0
+                )
+            else:
+                message_id = buffer[position + 5]
+                signature_size = 0
+
+            packet_size = header_size + payload_size + MAVLINK_CHECKSUM_SIZE + signature_size
+            if size - position < packet_size:
+                break
+
+            if positions is not None:
+                positions.append(position)
+
+            handlers = self.__handlers.get(message_id)
+            if handlers is None:
+                self.skipped_count += 1
+            else:
+                packet = bytes(buffer[position : position + packet_size])
+                for handler in handlers:
+                    handler(packet)
+
+                dispatched_count += 1
+
+            position += packet_size
+
+        # Packets fed together arrived together
+        if positions:
+            observer(buffer, positions, time.monotonic_ns())
+
+        del buffer[:position]
+        return dispatched_count
+
+    def receive(self, connection: mavutil.mavfile, timeout: float) -> int:
+        """
+        Waits for data from the connection and dispatches it.
+
+        connection: Anything with `select(timeout)` and `recv(n)` like `mavutil.mavfile` .
+        timeout: Time waiting in seconds for data.
+
+        Returns the number of packets passed to handlers.
+        """
+        if not connection.select(timeout):
+            return 0
+
+        data = connection.recv(RECEIVE_SIZE)
+        if not data:
+            return 0
+
+        return self.feed(data)
+
+    def recv_message(
+        self, connection: mavutil.mavfile, message_id: int, timeout: float
+    ) -> "mavutil.mavlink.MAVLink_message | None":
+        """
+        Returns the next message of the message ID like `mavfile.recv_match()`, but without
+        decoding or discarding messages of other IDs. Messages received together are kept
+        for the following calls.
+
+        connection: Anything with `select(timeout)` and `recv(n)` like `mavutil.mavfile` .
+        message_id: ID of the message to wait for.
+        timeout: Time waiting in seconds.
+
+        Returns None if there is no message in time.
+        """
+        pending = self.__pending.get(message_id)
+        if pending is None:
+            pending = collections.deque()
+            self.__pending[message_id] = pending
+            self.subscribe_decoded(message_id, pending.append)
+
+        deadline = time.monotonic() + timeout
+        while len(pending) == 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.0:
+                return None
+
+            self.receive(connection, remaining)
+
+        return pending.popleft()
@@ -0,0 +1,72 @@
+"""
+Sequence numbers of MAVLink packets sent from many encoders over one link.
+"""
+
+from pymavlink import mavutil
+
+from . import message_dispatcher
+
+
+class PacketSequencer:
+    """
+    Rewrites the sequence number of each outbound packet from one counter per sender,
+    and recomputes the checksum.
+
+    Every worker encodes with its own `MAVLink` object and so its own sequence counter, while
+    they all send as the same system and component. Stamping where the packets are interleaved
+    keeps the numbers consecutive, so the vehicle does not count false drops and reordering.
+    Signed packets are passed through unchanged, since the signature covers the sequence number.
+
+    Not thread safe, stamp from the one thread writing to the connection.
+    """
+
+    def __init__(self) -> None:
+        # (system ID, component ID) to the next sequence number
+        self.__sequences: "dict[tuple[int, int], int]" = {}
+
+    def stamp(self, packet: bytes) -> bytes:
+        """
+        Returns the packet with the next sequence number of its sender.
+        Anything that is not a whole packet of a known message is returned unchanged.
+        """
+        if len(packet) < message_dispatcher.MAVLINK_V1_HEADER_SIZE:
+            return packet
+
+        if packet[0] == message_dispatcher.MAVLINK_V2_MARKER:
+            if packet[2] & message_dispatcher.MAVLINK_IFLAG_SIGNED:
+                return packet
+
+            header_size = message_dispatcher.MAVLINK_V2_HEADER_SIZE
+            if len(packet) < header_size:
+                return packet
+
+            sequence_index = 4
+            message_id = int.from_bytes(packet[7:10], "little")
+        elif packet[0] == message_dispatcher.MAVLINK_V1_MARKER:
+            header_size = message_dispatcher.MAVLINK_V1_HEADER_SIZE
+            sequence_index = 2
+            message_id = packet[5]
+        else:
+            return packet
+
+        checksum_start = header_size + packet[1]
+        message_class = mavutil.mavlink.mavlink_map.get(message_id)
+        if (
+            message_class is None
+            or len(packet) < checksum_start + message_dispatcher.MAVLINK_CHECKSUM_SIZE
+        ):
+            return packet
+
+        sender = (packet[sequence_index + 1], packet[sequence_index + 2])
+        sequence = self.__sequences.get(sender, 0)
+        self.__sequences[sender] = (sequence + 1) % 256
+
+        stamped = bytearray(packet)
+        stamped[sequence_index] = sequence
+        checksum = mavutil.mavlink.x25crc(stamped[1:checksum_start])
+        checksum.accumulate(bytes([message_class.crc_extra]))
+        stamped[checksum_start : checksum_start + message_dispatcher.MAVLINK_CHECKSUM_SIZE] = (
+            checksum.crc.to_bytes(message_dispatcher.MAVLINK_CHECKSUM_SIZE, "little")
+        )
+
+        return bytes(stamped)
@@ -0,0 +1,177 @@
+"""
+Fixed layout binary records.
+"""
+
+import struct
+
+import numpy as np
+
+
+class RecordCodec:  # pylint: disable=too-many-instance-attributes
+    """
+    Packs objects with a fixed set of attributes into fixed size records.
+
+    The record is a presence bitmap followed by every field in schema order, little endian
+    without padding. A field that is None clears its bit in the bitmap and is packed as 0 .
+    The same layout is available as a NumPy structured dtype.
+    """
+
+    PRESENCE_FIELD = "presence"
+
+    # Struct format character to NumPy type, all little endian
+    __NUMPY_TYPES = {
+        "b": "<i1",
+        "B": "<u1",
+        "h": "<i2",
+        "H": "<u2",
+        "i": "<i4",
+        "I": "<u4",
+        "q": "<i8",
+        "Q": "<u8",
+        "f": "<f4",
+        "d": "<f8",
+    }
+
+    def __init__(self, record_type: type, schema: "list[tuple[str, str]]") -> None:
+        """
+        record_type: Class constructed on decode, takes every field as a keyword argument.
+        schema: Attribute name and struct format character for each field.
+        """
+        assert 0 < len(schema) <= 64, "Presence bitmap holds at most 64 fields"
+
+        self.__record_type = record_type
+        self.__names = tuple(name for name, _ in schema)
+        bitmap_format = next(
+            bitmap_format
+            for bitmap_format, bits in (("B", 8), ("H", 16), ("I", 32), ("Q", 64))
+            if len(schema) <= bits
+        )
+        self.__bitmap = struct.Struct("<" + bitmap_format)
+        self.__struct = struct.Struct(
+            "<" + bitmap_format + "".join(field_format for _, field_format in schema)
+        )
+        self.__all_present = (1 << len(schema)) - 1
+        self.__defaults = tuple(0.0 if field_format in "fd" else 0 for _, field_format in schema)
+
+        # Per field access for lazy decoding
+        self.__fields: "dict[str, tuple[int, struct.Struct, int]]" = {}
+        offset = self.__bitmap.size
+        for index, (name, field_format) in enumerate(schema):
+            field_struct = struct.Struct("<" + field_format)
+            self.__fields[name] = (index, field_struct, offset)
+            offset += field_struct.size
+
+        self.__dtype = np.dtype(
+            [(self.PRESENCE_FIELD, self.__NUMPY_TYPES[bitmap_format])]
+            + [(name, self.__NUMPY_TYPES[field_format]) for name, field_format in schema]
+        )
+        assert self.__dtype.itemsize == self.__struct.size
+
+    @property
+    def size(self) -> int:
+        """
+        Record size in bytes.
+        """
+        return self.__struct.size
+
+    @property
+    def names(self) -> "tuple[str, ...]":
+        """
+        Field names in schema order.
+        """
+        return self.__names
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        NumPy structured dtype with the same layout as the packed record.
+        """
+        return self.__dtype
+
+    def encode(self, record: object) -> bytes:
+        """
+        Packs the attributes of the record.
+        """
+        bitmap = 0
+        values = []
+        for index, name in enumerate(self.__names):
+            value = getattr(record, name)
+            if value is None:
+                values.append(self.__defaults[index])
+            else:
+                bitmap |= 1 << index
+                values.append(value)
+
+        return self.__struct.pack(bitmap, *values)
+
+    def decode_fields(self, data: "bytes | bytearray | memoryview") -> "dict[str, object]":
+        """
+        Unpacks the record into a dictionary of field name to value.
+        """
+        bitmap, *values = self.__struct.unpack(data)
+        if bitmap != self.__all_present:
+            values = [value if bitmap >> index & 1 else None for index, value in enumerate(values)]
+
+        return dict(zip(self.__names, values))
+
+    def decode(self, data: "bytes | bytearray | memoryview") -> object:
+        """
+        Unpacks the record into a new object of the record type.
+        """
+        return self.__record_type(**self.decode_fields(data))
+
+    def decode_field(self, data: "bytes | bytearray | memoryview", name: str) -> object:
+        """
+        Unpacks a single field without decoding the rest of the record.
+        Raises AttributeError if the field is not in the schema.
+        """
+        field = self.__fields.get(name)
+        if field is None:
+            raise AttributeError(name)
+
+        index, field_struct, offset = field
+        (bitmap,) = self.__bitmap.unpack_from(data, 0)
+        if not bitmap >> index & 1:
+            return None
+
+        return field_struct.unpack_from(data, offset)[0]
+
+    def view(self, data: "bytes | bytearray | memoryview") -> "RecordView":
+        """
+        Wraps the packed record for lazy attribute access.
+        """
+        return RecordView(self, data)
+
+    def decode_array(self, data: "bytes | bytearray | memoryview") -> np.ndarray:
+        """
+        Interprets one or more concatenated records as a NumPy structured array without copying.
+        """
+        return np.frombuffer(data, dtype=self.__dtype)
+
+
+class RecordView:
+    """
+    Attribute access to a packed record, the record is unpacked on the first attribute read.
+    """
+
+    def __init__(self, codec: RecordCodec, data: "bytes | bytearray | memoryview") -> None:
+        self.__codec = codec
+        self.__data = data
+
+    def __getattr__(self, name: str) -> object:
+        # Only called for attributes not found normally, so this runs once per view
+        fields = self.__codec.decode_fields(self.__data)
+        if name not in fields:
+            raise AttributeError(name)
+
+        self.__dict__.update(fields)
+        return fields[name]
+
+    def decode(self) -> object:
+        """
+        Returns the fully decoded record.
+        """
+        return self.__codec.decode(self.__data)
+
+    def __str__(self) -> str:
+        return str(self.decode())
@@ -0,0 +1,269 @@
+"""
+History of the most recent fixed layout records.
+"""
+
+import multiprocessing as mp
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import record_codec
+
+
+class RecordHistory:  # pylint: disable=too-many-instance-attributes
+    """
+    Ring of the most recent records in shared memory, held as a NumPy structured array
+    and ordered by a key field, such as the time.
+
+    Records are appended as packed bytes straight from the queues, and queries work on
+    the shared array without creating a Python object per record: lookup by key is a
+    binary search, and windows and aggregates are vectorized.
+    Can be passed to worker processes, every process sees the same records.
+    """
+
+    # Total number of records appended
+    __COUNT = struct.Struct("<Q")
+
+    def __init__(self, dtype: np.dtype, capacity: int, key_field: str) -> None:
+        """
+        dtype: Structured dtype of a record, such as `RecordCodec.dtype` .
+        capacity: Number of records kept, the oldest is overwritten when full.
+        key_field: Field the records are ordered by.
+        """
+        assert capacity > 0, "History requires at least one record"
+        assert key_field in dtype.names, f"Key field {key_field} is not in the record"
+
+        self.__dtype = dtype
+        self.__capacity = capacity
+        self.__key_field = key_field
+        self.__key_dtype = dtype.fields[key_field][0]
+
+        # Count, then the keys as a contiguous array for searching, then the records
+        self.__keys_offset = self.__COUNT.size
+        self.__records_offset = self.__keys_offset + capacity * self.__key_dtype.itemsize
+        self.__shared_memory = shared_memory.SharedMemory(
+            create=True,
+            size=self.__records_offset + capacity * dtype.itemsize,
+        )
+        self.__COUNT.pack_into(self.__shared_memory.buf, 0, 0)
+
+        # Writers and readers take the lock, so a query never sees a partly written record
+        self.__lock = mp.Lock()
+
+        # Views of the shared memory, created on first use in each process
+        self.__keys: "np.ndarray | None" = None
+        self.__records: "np.ndarray | None" = None
+
+    def __getstate__(self) -> dict:
+        """
+        Sends the shared memory to another process, not the views of it.
+        """
+        state = self.__dict__.copy()
+        state["_RecordHistory__keys"] = None
+        state["_RecordHistory__records"] = None
+        return state
+
+    def __views(self) -> "tuple[np.ndarray, np.ndarray]":
+        """
+        Returns the key and record arrays in ring order.
+        """
+        if self.__records is None:
+            buffer = self.__shared_memory.buf
+            self.__keys = np.ndarray(
+                (self.__capacity,), self.__key_dtype, buffer, self.__keys_offset
+            )
+            self.__records = np.ndarray(
+                (self.__capacity,), self.__dtype, buffer, self.__records_offset
+            )
+
+        return self.__keys, self.__records
+
+    def __count(self) -> int:
+        """
+        Returns the total number of records appended.
+        """
+        (count,) = self.__COUNT.unpack_from(self.__shared_memory.buf, 0)
+        return count
+
+    def __segments(self, start: float, end: float) -> "list[np.ndarray]":
+        """
+        Returns views of the records with start <= key <= end, oldest first.
+        Hold the lock while using them.
+        """
+        keys, records = self.__views()
+        count = self.__count()
+        if count <= self.__capacity:
+            ranges = [(0, count)]
+        else:
+            # Oldest record is where the next one is written
+            first = count % self.__capacity
+            ranges = [(first, self.__capacity), (0, first)]
+
+        segments = []
+        for low, high in ranges:
+            segment_keys = keys[low:high]
+            begin = low + int(np.searchsorted(segment_keys, start, "left"))
+            stop = low + int(np.searchsorted(segment_keys, end, "right"))
+            if begin < stop:
+                segments.append(records[begin:stop])
+
+        return segments
+
+    def __len__(self) -> int:
+        return min(self.__count(), self.__capacity)
+
+    def append(self, record: "bytes | bytearray | memoryview") -> bool:
+        """
+        Appends a packed record.
+
+        Returns False if its key is older than the latest record, the record is not kept.
+        """
+        return self.extend([record]) == 1
+
+    def extend(self, records: "list[bytes | bytearray | memoryview]") -> int:
+        """
+        Appends packed records in order, skipping any whose key is older than the latest record.
+
+        Returns the number of records appended.
+        """
+        if len(records) == 0:
+            return 0
+
+        batch = np.frombuffer(b"".join(records), self.__dtype)
+        batch_keys = batch[self.__key_field]
+
+        keys, ring = self.__views()
+        with self.__lock:
+            count = self.__count()
+            running_max = np.maximum.accumulate(batch_keys)
+            if count > 0:
+                running_max = np.maximum(running_max, keys[(count - 1) % self.__capacity])
+
+            in_order = batch_keys >= running_max
+            if not in_order.all():
+                batch = batch[in_order]
+                batch_keys = batch_keys[in_order]
+
+            appended = len(batch)
+            # Only the newest records fit
+            batch = batch[-self.__capacity :]
+            batch_keys = batch_keys[-self.__capacity :]
+
+            position = (count + appended - len(batch)) % self.__capacity
+            first = min(len(batch), self.__capacity - position)
+            ring[position : position + first] = batch[:first]
+            keys[position : position + first] = batch_keys[:first]
+            ring[: len(batch) - first] = batch[first:]
+            keys[: len(batch) - first] = batch_keys[first:]
+
+            self.__COUNT.pack_into(self.__shared_memory.buf, 0, count + appended)
+
+        return appended
+
+    def latest_key(self) -> "float | None":
+        """
+        Returns the key of the latest record, None if there is none.
+        """
+        keys, _ = self.__views()
+        with self.__lock:
+            count = self.__count()
+            if count == 0:
+                return None
+
+            return keys[(count - 1) % self.__capacity].item()
+
+    def lookup(self, key: float) -> "np.void | None":
+        """
+        Returns a copy of the latest record with a key at or before the key,
+        None if every record is later.
+        """
+        with self.__lock:
+            segments = self.__segments(-np.inf, key)
+            if len(segments) == 0:
+                return None
+
+            return segments[-1][-1].copy()
+
+    def window(self, start: float, end: float) -> np.ndarray:
+        """
+        Returns a copy of the records with start <= key <= end, oldest first.
+        """
+        with self.__lock:
+            segments = self.__segments(start, end)
+            if len(segments) == 0:
+                return np.empty(0, self.__dtype)
+
+            return np.concatenate(segments)
+
+    def values(self, field: str, start: float, end: float) -> np.ndarray:
+        """
+        Returns a copy of the field of the records with start <= key <= end, oldest first.
+        Records where the field is not present (None when encoded) are left out.
+        """
+        with self.__lock:
+            parts = [self.__present(segment, field) for segment in self.__segments(start, end)]
+
+        if len(parts) == 0:
+            return np.empty(0, self.__dtype.fields[field][0])
+
+        return np.concatenate(parts)
+
+    def mean(self, field: str, start: float, end: float) -> "float | None":
+        """
+        Returns the mean of the field over start <= key <= end, None if there are no values.
+        """
+        values = self.values(field, start, end)
+        if len(values) == 0:
+            return None
+
+        return float(values.mean())
+
+    def max(self, field: str, start: float, end: float) -> "float | None":
+        """
+        Returns the largest value of the field over start <= key <= end,
+        None if there are no values.
+        """
+        values = self.values(field, start, end)
+        if len(values) == 0:
+            return None
+
+        return values.max().item()
+
+    def min(self, field: str, start: float, end: float) -> "float | None":
+        """
+        Returns the smallest value of the field over start <= key <= end,
+        None if there are no values.
+        """
+        values = self.values(field, start, end)
+        if len(values) == 0:
+            return None
+
+        return values.min().item()
+
+    def __present(self, segment: np.ndarray, field: str) -> np.ndarray:
+        """
+        Returns the values of the field where its presence bit is set, if the record has one.
+        """
+        values = segment[field]
+        names = self.__dtype.names
+        if names[0] != record_codec.RecordCodec.PRESENCE_FIELD:
+            return values.copy()
+
+        bit = 1 << (names.index(field) - 1)
+        return values[(segment[record_codec.RecordCodec.PRESENCE_FIELD] & bit) != 0]
+
+    def close(self) -> None:
+        """
+        Closes access to the shared memory from this process.
+        """
+        # Shared memory cannot be closed while arrays still use it
+        self.__keys = None
+        self.__records = None
+        self.__shared_memory.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory, call once from the creating process after all users are done.
+        """
+        self.__shared_memory.unlink()
@@ -0,0 +1,98 @@
+"""
+Queue with batched put and get, served by a multiprocess manager.
+"""
+
+import multiprocessing.managers
+import queue
+import threading
+import time
+
+
+class BatchQueue(queue.Queue):
+    """
+    `queue.Queue` which can also move a batch of items with a single call.
+
+    Through a manager proxy, a single call is a single round trip to the manager process.
+    """
+
+    def __wait(
+        self,
+        condition: threading.Condition,
+        is_ready: "(...) -> bool",  # type: ignore
+        block: bool,
+        timeout: float | None,
+        exception: type,
+    ) -> None:
+        """
+        Waits on the condition (already held) until ready, otherwise raises the exception.
+        """
+        if is_ready():
+            return
+
+        if not block:
+            raise exception
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not is_ready():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0.0:
+                raise exception
+
+            condition.wait(remaining)
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: float | None = None
+    ) -> None:
+        """
+        Puts all of the items at the end of the queue, or none of them.
+
+        block: Whether to wait for enough free space.
+        timeout: Time waiting in seconds before raising queue.Full, None waits forever.
+        """
+        items = list(items)
+        if 0 < self.maxsize < len(items):
+            raise ValueError(f"Batch of {len(items)} items exceeds maxsize {self.maxsize}")
+
+        with self.not_full:
+            if self.maxsize > 0:
+                self.__wait(
+                    self.not_full,
+                    lambda: self._qsize() + len(items) <= self.maxsize,
+                    block,
+                    timeout,
+                    queue.Full,
+                )
+
+            for item in items:
+                self._put(item)
+
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify(len(items))
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: float | None = None
+    ) -> "list[object]":
+        """
+        Removes and returns up to max_items items from the front of the queue.
+        Only waits for the first item.
+
+        block: Whether to wait for an item.
+        timeout: Time waiting in seconds before raising queue.Empty, None waits forever.
+        """
+        with self.not_empty:
+            self.__wait(self.not_empty, lambda: self._qsize() > 0, block, timeout, queue.Empty)
+
+            count = min(max_items, self._qsize())
+            items = [self._get() for _ in range(count)]
+            self.not_full.notify(count)
+
+        return items
+
+
+class BatchQueueManager(multiprocessing.managers.SyncManager):
+    """
+    Multiprocess manager which can also create `BatchQueue` proxies.
+    """
+
+
+BatchQueueManager.register("BatchQueue", BatchQueue)
@@ -0,0 +1,208 @@
+"""
+Queue that records its own statistics.
+"""
+
+import queue
+import time
+
+from . import queue_stats
+
+
+class InstrumentedQueue:
+    """
+    Wraps a queue, timestamping items on put and recording statistics on put and get.
+
+    Provides the same `put()`/`get()` interface as the wrapped queue.
+    A put or get is first attempted without blocking, and only the time spent in
+    the blocking attempt counts as producer block time or consumer wait time.
+    """
+
+    def __init__(self, inner: object, stats: queue_stats.QueueStats) -> None:
+        """
+        inner: Queue to wrap, only this wrapper may put into and get from it.
+        stats: Where to record statistics.
+        """
+        self.__inner = inner
+        self.__stats = stats
+
+    def __inner_put_many(self, items: "list[object]", block: bool, timeout: float | None) -> None:
+        """
+        Batched put on the wrapped queue, one put per item if it has no batched put.
+        """
+        if hasattr(self.__inner, "put_many"):
+            self.__inner.put_many(items, block, timeout)
+            return
+
+        for item in items:
+            self.__inner.put(item, block, timeout)
+
+    def __inner_get_many(
+        self, max_items: int, block: bool, timeout: float | None
+    ) -> "list[object]":
+        """
+        Batched get on the wrapped queue, one get per item if it has no batched get.
+        """
+        if hasattr(self.__inner, "get_many"):
+            return self.__inner.get_many(max_items, block, timeout)
+
+        items = [self.__inner.get(block, timeout)]
+        try:
+            while len(items) < max_items:
+                items.append(self.__inner.get(False))
+        except queue.Empty:
+            pass
+
+        return items
+
+    def put(self, item: object, block: bool = True, timeout: float | None = None) -> None:
+        """
+        Puts the item at the end of the queue.
+        """
+        stamped = (time.monotonic_ns(), item)
+        try:
+            self.__inner.put(stamped, False)
+        except queue.Full:
+            if not block:
+                raise
+
+            start = time.monotonic_ns()
+            try:
+                self.__inner.put(stamped, True, timeout)
+            finally:
+                self.__stats.record_producer_block(time.monotonic_ns() - start)
+
+        self.__stats.record_put()
+
+    def get(self, block: bool = True, timeout: float | None = None) -> object:
+        """
+        Removes and returns the item at the front of the queue.
+        """
+        if hasattr(self.__inner, "get_latest"):
+            # Overwritten items also leave the queue
+            _, item, _ = self.get_latest(block, timeout)
+            return item
+
+        try:
+            enqueue_time_ns, item = self.__inner.get(False)
+        except queue.Empty:
+            if not block:
+                raise
+
+            start = time.monotonic_ns()
+            try:
+                enqueue_time_ns, item = self.__inner.get(True, timeout)
+            finally:
+                self.__stats.record_consumer_wait(time.monotonic_ns() - start)
+
+        self.__stats.record_get([enqueue_time_ns])
+        return item
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: float | None = None
+    ) -> None:
+        """
+        Puts all of the items at the end of the queue, or none of them.
+        """
+        now = time.monotonic_ns()
+        stamped = [(now, item) for item in items]
+        try:
+            self.__inner_put_many(stamped, False, None)
+        except queue.Full:
+            if not block:
+                raise
+
+            start = time.monotonic_ns()
+            try:
+                self.__inner_put_many(stamped, True, timeout)
+            finally:
+                self.__stats.record_producer_block(time.monotonic_ns() - start)
+
+        self.__stats.record_put(len(stamped))
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: float | None = None
+    ) -> "list[object]":
+        """
+        Removes and returns up to max_items items from the front of the queue.
+        """
+        try:
+            stamped = self.__inner_get_many(max_items, False, None)
+        except queue.Empty:
+            if not block:
+                raise
+
+            start = time.monotonic_ns()
+            try:
+                stamped = self.__inner_get_many(max_items, True, timeout)
+            finally:
+                self.__stats.record_consumer_wait(time.monotonic_ns() - start)
+
+        self.__stats.record_get([enqueue_time_ns for enqueue_time_ns, _ in stamped])
+        return [item for _, item in stamped]
+
+    def get_latest(
+        self, block: bool = True, timeout: float | None = None, key: int = 0
+    ) -> "tuple[int, object, int]":
+        """
+        Consumes the newest item of the key, only if the wrapped queue is a latest value mailbox.
+        """
+        try:
+            sequence, (enqueue_time_ns, item), overwritten = self.__inner.get_latest(False, key=key)
+        except queue.Empty:
+            if not block:
+                raise
+
+            start = time.monotonic_ns()
+            try:
+                sequence, (enqueue_time_ns, item), overwritten = self.__inner.get_latest(
+                    True, timeout, key
+                )
+            finally:
+                self.__stats.record_consumer_wait(time.monotonic_ns() - start)
+
+        self.__stats.record_get([enqueue_time_ns], overwritten)
+        return sequence, item, overwritten
+
+    def put_nowait(self, item: object) -> None:
+        """
+        Equivalent to put(item, False).
+        """
+        self.put(item, False)
+
+    def get_nowait(self) -> object:
+        """
+        Equivalent to get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Returns the approximate number of items in the queue.
+        """
+        return self.__inner.qsize()
+
+    def empty(self) -> bool:
+        """
+        Returns whether the queue is approximately empty.
+        """
+        return self.__inner.empty()
+
+    def full(self) -> bool:
+        """
+        Returns whether the queue is approximately full.
+        """
+        return self.__inner.full()
+
+    def close(self) -> None:
+        """
+        Closes the wrapped queue.
+        """
+        if hasattr(self.__inner, "close"):
+            self.__inner.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the wrapped queue.
+        """
+        if hasattr(self.__inner, "unlink"):
+            self.__inner.unlink()
@@ -0,0 +1,248 @@
+"""
+Mailbox that only keeps the latest value.
+"""
+
+import multiprocessing as mp
+import pickle
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+
+
+# Largest pickled item in bytes
+DEFAULT_SLOT_SIZE = 4096
+
+
+class LatestValueMailbox:
+    """
+    Conflating channel in shared memory: each key holds only the newest item.
+
+    A put never blocks and overwrites the previous item of the key. A get returns the
+    newest item not yet consumed, with its sequence number and how many items were
+    overwritten without being consumed. A peek reads the newest item without consuming
+    it and without taking the lock, using the version counter of the key like a seqlock.
+
+    Also provides the `put()`/`get()` interface of `queue.Queue` on key 0 .
+    """
+
+    # Per key: version (odd while writing), sequence of newest item,
+    # sequence of last consumed item, total overwritten, payload length
+    __HEADER = struct.Struct("<QQQQI")
+    __VERSION = struct.Struct("<Q")
+    # Header after the version
+    __FIELDS = struct.Struct("<QQQI")
+
+    def __init__(self, key_count: int = 1, slot_size: int = DEFAULT_SLOT_SIZE) -> None:
+        """
+        key_count: Number of keys, keys are 0 to key_count - 1 .
+        slot_size: Largest pickled item in bytes.
+        """
+        assert key_count > 0, "Mailbox requires at least one key"
+
+        self.__key_count = key_count
+        self.__slot_size = slot_size
+        self.__stride = self.__HEADER.size + slot_size
+
+        self.__shared_memory = shared_memory.SharedMemory(
+            create=True,
+            size=key_count * self.__stride,
+        )
+        for key in range(key_count):
+            self.__HEADER.pack_into(self.__shared_memory.buf, key * self.__stride, 0, 0, 0, 0, 0)
+
+        # Writers and consuming readers take the lock, peeking readers do not
+        self.__condition = mp.Condition(mp.Lock())
+
+    def __offset(self, key: int) -> int:
+        """
+        Returns the byte offset of the key.
+        """
+        assert 0 <= key < self.__key_count, f"Key {key} out of range"
+        return key * self.__stride
+
+    def __read_payload(self, offset: int, length: int) -> bytes:
+        """
+        Returns a copy of the payload of the key at the offset.
+        """
+        start = offset + self.__HEADER.size
+        return bytes(self.__shared_memory.buf[start : start + length])
+
+    def put(
+        self, item: object, block: bool = True, timeout: float | None = None, key: int = 0
+    ) -> None:
+        """
+        Replaces the item of the key, never blocks.
+
+        block, timeout: Unused, for compatibility with `queue.Queue` .
+        key: Key to write.
+        """
+        _ = block, timeout
+
+        payload = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.__slot_size:
+            raise ValueError(
+                f"Item of {len(payload)} bytes does not fit in slot of {self.__slot_size} bytes"
+            )
+
+        offset = self.__offset(key)
+        buffer = self.__shared_memory.buf
+        with self.__condition:
+            version, sequence, consumed, overwritten, _ = self.__HEADER.unpack_from(buffer, offset)
+            if sequence > consumed:
+                overwritten += 1
+
+            # Odd version tells peeking readers that the payload is being written
+            self.__VERSION.pack_into(buffer, offset, version + 1)
+            start = offset + self.__HEADER.size
+            buffer[start : start + len(payload)] = payload
+            self.__FIELDS.pack_into(
+                buffer,
+                offset + self.__VERSION.size,
+                sequence + 1,
+                consumed,
+                overwritten,
+                len(payload),
+            )
+            # Even version last, so a reader that sees it also sees the rest of the header
+            self.__VERSION.pack_into(buffer, offset, version + 2)
+
+            self.__condition.notify_all()
+
+    def get_latest(
+        self, block: bool = True, timeout: float | None = None, key: int = 0
+    ) -> "tuple[int, object, int]":
+        """
+        Consumes the newest item of the key.
+
+        block: Whether to wait for an item that has not been consumed yet.
+        timeout: Time waiting in seconds before raising queue.Empty, None waits forever.
+        key: Key to read.
+
+        Returns the sequence number of the item, the item, and the number of items
+        overwritten since the previous get.
+        """
+        offset = self.__offset(key)
+        buffer = self.__shared_memory.buf
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__condition:
+            while True:
+                _, sequence, consumed, _, length = self.__HEADER.unpack_from(buffer, offset)
+                if sequence > consumed:
+                    break
+
+                if not block:
+                    raise queue.Empty
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0.0:
+                    raise queue.Empty
+
+                self.__condition.wait(remaining)
+
+            payload = self.__read_payload(offset, length)
+            version, _, _, overwritten, _ = self.__HEADER.unpack_from(buffer, offset)
+            self.__HEADER.pack_into(
+                buffer, offset, version, sequence, sequence, overwritten, length
+            )
+
+        return sequence, pickle.loads(payload), sequence - consumed - 1
+
+    def peek(self, key: int = 0) -> "tuple[int, object]":
+        """
+        Reads the newest item of the key without consuming it.
+
+        Returns the sequence number of the item and the item, sequence 0 if nothing was put yet.
+        """
+        offset = self.__offset(key)
+        buffer = self.__shared_memory.buf
+        while True:
+            header = self.__HEADER.unpack_from(buffer, offset)
+            version, sequence, _, _, length = header
+            if version % 2 == 1:
+                continue
+
+            if sequence == 0:
+                return 0, None
+
+            payload = self.__read_payload(offset, length)
+            # Any write since the header was read may have changed the payload, read again
+            if self.__HEADER.unpack_from(buffer, offset) == header:
+                return sequence, pickle.loads(payload)
+
+    def overwritten_count(self, key: int = 0) -> int:
+        """
+        Returns the total number of items of the key that were overwritten without being consumed.
+        """
+        _, _, _, overwritten, _ = self.__HEADER.unpack_from(
+            self.__shared_memory.buf, self.__offset(key)
+        )
+        return overwritten
+
+    def get(self, block: bool = True, timeout: float | None = None) -> object:
+        """
+        Consumes the newest item of key 0 .
+        """
+        _, item, _ = self.get_latest(block, timeout)
+        return item
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: float | None = None
+    ) -> None:
+        """
+        Puts the items on key 0 in order, so only the last one is kept.
+        """
+        for item in items:
+            self.put(item, block, timeout)
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: float | None = None
+    ) -> "list[object]":
+        """
+        Consumes the newest item of key 0, there is never more than one.
+        """
+        _ = max_items
+        return [self.get(block, timeout)]
+
+    def put_nowait(self, item: object) -> None:
+        """
+        Equivalent to put(item, False).
+        """
+        self.put(item, False)
+
+    def get_nowait(self) -> object:
+        """
+        Equivalent to get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Returns 1 if key 0 holds an item that has not been consumed, otherwise 0 .
+        """
+        _, sequence, consumed, _, _ = self.__HEADER.unpack_from(self.__shared_memory.buf, 0)
+        return 1 if sequence > consumed else 0
+
+    def empty(self) -> bool:
+        """
+        Returns whether key 0 has no item that has not been consumed.
+        """
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        """
+        Always False, since a put overwrites instead of blocking.
+        """
+        return False
+
+    def close(self) -> None:
+        """
+        Closes access to the shared memory from this process.
+        """
+        self.__shared_memory.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory, call once from the creating process after all users are done.
+        """
+        self.__shared_memory.unlink()
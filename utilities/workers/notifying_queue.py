@@ -0,0 +1,174 @@
+"""
+Queue that wakes a waiting consumer of many queues.
+"""
+
+import multiprocessing as mp
+
+from . import latest_value_mailbox
+
+
+class Doorbell:
+    """
+    Counter in shared memory that any process increments to wake every process waiting on it.
+
+    A waiter reads the generation before checking its queues, and only waits while it
+    is unchanged, so a put between the check and the wait is never missed.
+    """
+
+    def __init__(self) -> None:
+        self.__generation = mp.RawValue("Q", 0)
+        self.__condition = mp.Condition(mp.Lock())
+
+    def ring(self) -> None:
+        """
+        Wakes every waiter.
+        """
+        with self.__condition:
+            self.__generation.value += 1
+            self.__condition.notify_all()
+
+    def generation(self) -> int:
+        """
+        Returns the number of rings so far.
+        """
+        return self.__generation.value
+
+    def wait(self, generation: int, timeout: float | None = None) -> bool:
+        """
+        Waits until a ring after the generation.
+
+        timeout: Time waiting in seconds, None waits forever.
+
+        Returns whether it rang, False on timeout.
+        """
+        with self.__condition:
+            return self.__condition.wait_for(lambda: self.__generation.value != generation, timeout)
+
+
+class NotifyingQueue:
+    """
+    Wraps a queue, ringing a doorbell after every successful put.
+
+    Provides the same `put()`/`get()` interface as the wrapped queue.
+    Can also keep a copy of the last item put in a latest value mailbox, so another
+    process can follow the items with `peek()` without taking them from the consumer.
+    """
+
+    def __init__(
+        self,
+        inner: object,
+        doorbell: Doorbell,
+        tap: latest_value_mailbox.LatestValueMailbox | None = None,
+    ) -> None:
+        """
+        inner: Queue to wrap, only this wrapper may put into it.
+        doorbell: Rung after each put, may be shared by many queues.
+        tap: Where to copy the last item put, None to not copy.
+        """
+        self.__inner = inner
+        self.__doorbell = doorbell
+        self.__tap = tap
+
+    def __notify(self, item: object) -> None:
+        """
+        Copies the item to the tap and rings the doorbell.
+        """
+        if self.__tap is not None:
+            self.__tap.put(item)
+
+        self.__doorbell.ring()
+
+    def put(self, item: object, block: bool = True, timeout: float | None = None) -> None:
+        """
+        Puts the item at the end of the queue.
+        """
+        self.__inner.put(item, block, timeout)
+        self.__notify(item)
+
+    def get(self, block: bool = True, timeout: float | None = None) -> object:
+        """
+        Removes and returns the item at the front of the queue.
+        """
+        return self.__inner.get(block, timeout)
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: float | None = None
+    ) -> None:
+        """
+        Puts all of the items at the end of the queue, one put per item if it has no batched put.
+        """
+        if len(items) == 0:
+            return
+
+        if hasattr(self.__inner, "put_many"):
+            self.__inner.put_many(items, block, timeout)
+        else:
+            for item in items:
+                self.__inner.put(item, block, timeout)
+
+        # One ring for the batch, the tap only keeps the last item anyway
+        self.__notify(items[-1])
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: float | None = None
+    ) -> "list[object]":
+        """
+        Removes and returns up to max_items items from the front of the queue.
+        """
+        if not hasattr(self.__inner, "get_many"):
+            # Plain manager queue proxy, one round trip per item
+            return [self.__inner.get(block, timeout)]
+
+        return self.__inner.get_many(max_items, block, timeout)
+
+    def get_latest(
+        self, block: bool = True, timeout: float | None = None, key: int = 0
+    ) -> "tuple[int, object, int]":
+        """
+        Consumes the newest item of the key, only if the wrapped queue is a latest value mailbox.
+        """
+        return self.__inner.get_latest(block, timeout, key)
+
+    def put_nowait(self, item: object) -> None:
+        """
+        Equivalent to put(item, False).
+        """
+        self.put(item, False)
+
+    def get_nowait(self) -> object:
+        """
+        Equivalent to get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Returns the approximate number of items in the queue.
+        """
+        return self.__inner.qsize()
+
+    def empty(self) -> bool:
+        """
+        Returns whether the queue is approximately empty.
+        """
+        return self.__inner.empty()
+
+    def full(self) -> bool:
+        """
+        Returns whether the queue is approximately full.
+        """
+        return self.__inner.full()
+
+    def close(self) -> None:
+        """
+        Closes the wrapped queue.
+        """
+        if hasattr(self.__inner, "close"):
+            self.__inner.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the wrapped queue.
+        """
+        if hasattr(self.__inner, "unlink"):
+            self.__inner.unlink()
@@ -0,0 +1,247 @@
+"""
+Queue with a policy for when it is full.
+"""
+
+import enum
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import struct
+
+
+class OverflowPolicy(enum.Enum):
+    """
+    What a put does when the queue is full.
+    """
+
+    # Wait for space, the default behaviour of a bounded queue
+    BLOCK = 0
+    # Discard the item being put
+    DROP_NEWEST = 1
+    # Discard the item at the front of the queue to make space
+    DROP_OLDEST = 2
+    # Append the item to an overflow file, which is read once the queue is empty
+    SPILL_TO_DISK = 3
+
+
+class OverflowQueue:
+    """
+    Wraps a bounded queue so that a put never blocks, applying a lossy or spilling policy instead.
+
+    Provides the same `put()`/`get()` interface as the wrapped queue.
+    Spilled items keep their order: while the overflow file holds items, new items are
+    also spilled, and consumers only read the file once the queue is empty.
+    """
+
+    __LENGTH = struct.Struct("<I")
+
+    def __init__(self, inner: object, policy: OverflowPolicy, spill_path: str | None) -> None:
+        """
+        inner: Queue to wrap, only this wrapper may put into and get from it.
+        policy: Overflow policy other than BLOCK .
+        spill_path: Overflow file, required for SPILL_TO_DISK .
+        """
+        assert policy != OverflowPolicy.BLOCK, "Blocking queues do not need an overflow policy"
+        assert policy != OverflowPolicy.SPILL_TO_DISK or spill_path is not None
+
+        self.__inner = inner
+        self.__policy = policy
+        self.__dropped = mp.Value("q", 0)
+
+        # Overflow file state is shared so that any producer or consumer process can use it
+        self.__spill_path = spill_path
+        self.__spill_lock = mp.Lock()
+        self.__spill_count = mp.RawValue("q", 0)
+        self.__spill_read_offset = mp.RawValue("q", 0)
+
+        if spill_path is not None:
+            # Start with an empty file
+            with open(spill_path, "wb"):
+                pass
+
+    def __record_dropped(self, count: int = 1) -> None:
+        """
+        Counts discarded items.
+        """
+        with self.__dropped.get_lock():
+            self.__dropped.value += count
+
+    def __spill(self, items: "list[object]") -> None:
+        """
+        Appends the items to the overflow file.
+        """
+        records = b"".join(
+            self.__LENGTH.pack(len(payload)) + payload
+            for payload in (pickle.dumps(item, pickle.HIGHEST_PROTOCOL) for item in items)
+        )
+        with self.__spill_lock:
+            with open(self.__spill_path, "ab") as file:
+                file.write(records)
+
+            self.__spill_count.value += len(items)
+
+    def __unspill(self, max_items: int) -> "list[object]":
+        """
+        Reads up to max_items items from the front of the overflow file.
+        """
+        items = []
+        with self.__spill_lock:
+            if self.__spill_count.value == 0:
+                return items
+
+            with open(self.__spill_path, "rb") as file:
+                file.seek(self.__spill_read_offset.value)
+                while len(items) < min(max_items, self.__spill_count.value):
+                    (length,) = self.__LENGTH.unpack(file.read(self.__LENGTH.size))
+                    items.append(pickle.loads(file.read(length)))
+
+                self.__spill_read_offset.value = file.tell()
+
+            self.__spill_count.value -= len(items)
+            if self.__spill_count.value == 0:
+                # Everything was read, so the file can be reused from the start
+                os.truncate(self.__spill_path, 0)
+                self.__spill_read_offset.value = 0
+
+        return items
+
+    def put(self, item: object, block: bool = True, timeout: float | None = None) -> None:
+        """
+        Puts the item at the end of the queue, never blocks.
+
+        block, timeout: Unused, for compatibility with `queue.Queue` .
+        """
+        _ = block, timeout
+
+        if self.__policy == OverflowPolicy.SPILL_TO_DISK:
+            if self.__spill_count.value > 0:
+                self.__spill([item])
+                return
+
+            try:
+                self.__inner.put(item, False)
+            except queue.Full:
+                self.__spill([item])
+
+            return
+
+        while True:
+            try:
+                self.__inner.put(item, False)
+                return
+            except queue.Full:
+                if self.__policy == OverflowPolicy.DROP_NEWEST:
+                    self.__record_dropped()
+                    return
+
+            # Drop oldest, a consumer may have made space in the meantime
+            try:
+                self.__inner.get(False)
+                self.__record_dropped()
+            except queue.Empty:
+                pass
+
+    def get(self, block: bool = True, timeout: float | None = None) -> object:
+        """
+        Removes and returns the item at the front of the queue, then the front of the overflow file.
+        """
+        try:
+            return self.__inner.get(False)
+        except queue.Empty:
+            pass
+
+        items = self.__unspill(1)
+        if len(items) > 0:
+            return items[0]
+
+        return self.__inner.get(block, timeout)
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: float | None = None
+    ) -> None:
+        """
+        Puts each of the items, never blocks.
+        """
+        for item in items:
+            self.put(item, block, timeout)
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: float | None = None
+    ) -> "list[object]":
+        """
+        Removes and returns up to max_items items, from the queue first, then the overflow file.
+        """
+        if not hasattr(self.__inner, "get_many"):
+            # Plain manager queue proxy, one round trip per item
+            return [self.get(block, timeout)]
+
+        try:
+            return self.__inner.get_many(max_items, False)
+        except queue.Empty:
+            pass
+
+        items = self.__unspill(max_items)
+        if len(items) > 0:
+            return items
+
+        return self.__inner.get_many(max_items, block, timeout)
+
+    def dropped_count(self) -> int:
+        """
+        Returns the number of items discarded by the policy.
+        """
+        return self.__dropped.value
+
+    def spilled_count(self) -> int:
+        """
+        Returns the number of items currently in the overflow file.
+        """
+        return self.__spill_count.value
+
+    def put_nowait(self, item: object) -> None:
+        """
+        Equivalent to put(item, False).
+        """
+        self.put(item, False)
+
+    def get_nowait(self) -> object:
+        """
+        Equivalent to get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Returns the approximate number of items in the queue and the overflow file.
+        """
+        return self.__inner.qsize() + self.__spill_count.value
+
+    def empty(self) -> bool:
+        """
+        Returns whether the queue and the overflow file are approximately empty.
+        """
+        return self.__inner.empty() and self.__spill_count.value == 0
+
+    def full(self) -> bool:
+        """
+        Always False, since a put never blocks.
+        """
+        return False
+
+    def close(self) -> None:
+        """
+        Closes the wrapped queue.
+        """
+        if hasattr(self.__inner, "close"):
+            self.__inner.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the wrapped queue and deletes the overflow file.
+        """
+        if hasattr(self.__inner, "unlink"):
+            self.__inner.unlink()
+
+        if self.__spill_path is not None and os.path.exists(self.__spill_path):
+            os.remove(self.__spill_path)
@@ -0,0 +1,228 @@
+"""
+For running many periodic jobs in one thread without drift.
+"""
+
+import time
+
+
+class JobStats:
+    """
+    Timing statistics of one periodic job.
+    """
+
+    def __init__(self) -> None:
+        self.run_count = 0
+        self.total_jitter = 0.0  # seconds
+        self.max_jitter = 0.0  # seconds
+        self.overrun_count = 0
+        self.skipped_count = 0
+
+    @property
+    def mean_jitter(self) -> float:
+        """
+        Mean time in seconds a run started after its deadline.
+        """
+        return self.total_jitter / self.run_count if self.run_count > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.run_count} runs, "
+            f"jitter mean {self.mean_jitter * 1000:.2f} ms max {self.max_jitter * 1000:.2f} ms, "
+            f"{self.overrun_count} overruns, {self.skipped_count} periods skipped"
+        )
+
+
+class PeriodicJob:
+    """
+    Job in the timer wheel.
+    """
+
+    __slots__ = ("name", "period", "run", "deadline", "tick", "stats")
+
+    def __init__(
+        self, name: str, period: float, run: "() -> object", deadline: float  # type: ignore
+    ) -> None:
+        self.name = name
+        self.period = period
+        self.run = run
+        self.deadline = deadline
+        self.tick = 0
+        self.stats = JobStats()
+
+
+class PeriodicScheduler:
+    """
+    Hashed timer wheel on the monotonic clock.
+
+    Each job is kept in the slot of the tick its deadline falls in, so finding due jobs only
+    looks at the slots of the ticks that passed. Deadlines advance by whole periods from the
+    first deadline, so time spent running jobs or waking up late does not accumulate as drift.
+    A job more than a period late runs once and skips the periods it missed.
+
+    Not thread safe, add and remove jobs from the thread running them.
+    """
+
+    def __init__(
+        self,
+        resolution: float = 0.01,
+        slot_count: int = 256,
+        clock: "() -> float" = time.monotonic,  # type: ignore
+    ) -> None:
+        """
+        resolution: Time in seconds covered by each slot.
+        slot_count: Number of slots, deadlines further than a turn of the wheel wait in their slot.
+        clock: Current time in seconds.
+        """
+        assert resolution > 0.0, "Resolution must be positive"
+        assert slot_count > 0, "Wheel needs a slot"
+
+        self.__resolution = resolution
+        self.__clock = clock
+        self.__slots: "list[list[PeriodicJob]]" = [[] for _ in range(slot_count)]
+        self.__jobs: "dict[str, PeriodicJob]" = {}
+        # Ticks before this one have been handled
+        self.__current_tick = self.__tick(clock())
+
+    def __tick(self, deadline: float) -> int:
+        """
+        Returns the tick the time falls in.
+        """
+        return int(deadline // self.__resolution)
+
+    def __insert(self, job: PeriodicJob) -> None:
+        """
+        Puts the job in the slot of its deadline.
+        """
+        # A deadline in a handled tick waits in the current one
+        job.tick = max(self.__tick(job.deadline), self.__current_tick)
+        self.__slots[job.tick % len(self.__slots)].append(job)
+
+    def add(
+        self,
+        name: str,
+        period: float,
+        run: "() -> object",  # type: ignore
+        delay: float = 0.0,
+    ) -> None:
+        """
+        Runs the job every period, the first time after the delay.
+
+        name: Unique name of the job, used for its statistics.
+        period: Time in seconds between deadlines.
+        delay: Time in seconds until the first deadline.
+        """
+        assert period > 0.0, "Period must be positive"
+        assert name not in self.__jobs, "Job names must be unique"
+
+        job = PeriodicJob(name, period, run, self.__clock() + delay)
+        self.__jobs[name] = job
+        self.__insert(job)
+
+    def remove(self, name: str) -> None:
+        """
+        Stops running the job.
+        """
+        job = self.__jobs.pop(name)
+        slot = self.__slots[job.tick % len(self.__slots)]
+        # Not in a slot while it is running
+        if job in slot:
+            slot.remove(job)
+
+    def run_pending(self) -> int:
+        """
+        Runs every job past its deadline, in deadline order within a tick.
+
+        Returns the number of jobs run.
+        """
+        now = self.__clock()
+        now_tick = self.__tick(now)
+        slot_count = len(self.__slots)
+        # After a full turn every slot has been looked at
+        last_tick = min(now_tick, self.__current_tick + slot_count - 1)
+
+        due: "list[PeriodicJob]" = []
+        for tick in range(self.__current_tick, last_tick + 1):
+            slot = self.__slots[tick % slot_count]
+            if len(slot) == 0:
+                continue
+
+            waiting = [job for job in slot if job.tick > now_tick or job.deadline > now]
+            if len(waiting) < len(slot):
+                due.extend(job for job in slot if job.tick <= now_tick and job.deadline <= now)
+                slot[:] = waiting
+
+        # The tick of now is looked at again, since its later deadlines may not have passed
+        self.__current_tick = now_tick
+
+        due.sort(key=lambda job: job.deadline)
+        run_count = 0
+        for job in due:
+            # Removed by an earlier job
+            if self.__jobs.get(job.name) is not job:
+                continue
+
+            start = self.__clock()
+            lateness = start - job.deadline
+            job.run()
+            end = self.__clock()
+
+            stats = job.stats
+            stats.run_count += 1
+            stats.total_jitter += lateness
+            stats.max_jitter = max(stats.max_jitter, lateness)
+            if end - start > job.period:
+                stats.overrun_count += 1
+
+            # Skipped periods keep the deadlines on the original grid
+            skipped = int((end - job.deadline) // job.period)
+            stats.skipped_count += skipped
+            job.deadline += (skipped + 1) * job.period
+            if self.__jobs.get(job.name) is job:
+                self.__insert(job)
+
+            run_count += 1
+
+        return run_count
+
+    def time_until_next(self) -> "float | None":
+        """
+        Returns the time in seconds until the next deadline, at most a turn of the wheel,
+        None if there are no jobs.
+        """
+        if len(self.__jobs) == 0:
+            return None
+
+        now = self.__clock()
+        now_tick = self.__tick(now)
+        slot_count = len(self.__slots)
+        # Jobs ran for more than a turn since the slots were last looked at
+        if now_tick - self.__current_tick >= slot_count:
+            return max(min(job.deadline for job in self.__jobs.values()) - now, 0.0)
+
+        for tick in range(self.__current_tick, now_tick + slot_count):
+            deadlines = [
+                job.deadline for job in self.__slots[tick % slot_count] if job.tick == tick
+            ]
+            if len(deadlines) > 0:
+                return max(min(deadlines) - now, 0.0)
+
+        return (now_tick + slot_count) * self.__resolution - now
+
+    def run(self, wait: "(float) -> bool") -> None:  # type: ignore
+        """
+        Runs jobs as their deadlines pass.
+
+        wait: Waits up to the time in seconds, returns True to stop,
+        such as `WorkerController.wait_for_exit_request()` .
+        """
+        while True:
+            self.run_pending()
+            timeout = self.time_until_next()
+            if wait(timeout if timeout is not None else len(self.__slots) * self.__resolution):
+                return
+
+    def get_stats(self) -> "dict[str, JobStats]":
+        """
+        Returns the statistics of each job.
+        """
+        return {name: job.stats for name, job in self.__jobs.items()}
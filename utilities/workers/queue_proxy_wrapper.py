@@ -2,9 +2,32 @@
 Queue.
 """
 
+import enum
 import multiprocessing.managers
+import os
 import queue
-import time
+import tempfile
+
+from . import batch_queue
+from . import instrumented_queue
+from . import latest_value_mailbox
+from . import notifying_queue
+from . import overflow_queue
+from . import queue_stats
+from . import shared_memory_queue
+
+
+class QueueBackend(enum.Enum):
+    """
+    Underlying queue implementation.
+    """
+
+    # Queue proxy from the multiprocess manager, each put and get goes through the manager process
+    MANAGER = 0
+    # Ring buffer in shared memory, each put and get is a copy into or out of shared memory
+    SHARED_MEMORY = 1
+    # Mailbox keeping only the newest item, a put overwrites instead of blocking
+    LATEST_VALUE = 2
 
 
 class QueueProxyWrapper:
@@ -12,49 +35,191 @@ class QueueProxyWrapper:
     Wrapper for an underlying queue proxy which also stores `maxsize`.
 
     `maxsize <= 0` means infinite size.
+    The shared memory backend cannot grow, so it uses a fixed default capacity instead.
+    The latest value backend holds a single item regardless of `maxsize`.
     """
 
-    __QUEUE_TIMEOUT = 0.1  # seconds
-    __QUEUE_DELAY = 0.1  # seconds
+    def __init__(
+        self,
+        mp_manager: multiprocessing.managers.SyncManager | None,
+        maxsize: int = 0,
+        backend: QueueBackend = QueueBackend.MANAGER,
+        instrument: bool = False,
+        overflow_policy: overflow_queue.OverflowPolicy = overflow_queue.OverflowPolicy.BLOCK,
+        spill_path: str | None = None,
+        doorbell: notifying_queue.Doorbell | None = None,
+        tap: bool = False,
+    ) -> None:
+        """
+        mp_manager: Multiprocess manager, only required for the manager backend.
+        maxsize: Maximum number of items in the queue.
+        backend: Underlying queue implementation.
+        instrument: Whether to timestamp items and record statistics, see stats() .
+        overflow_policy: What a put does when the queue is full, see dropped_count() .
+        spill_path: Overflow file for SPILL_TO_DISK, a temporary file is created if None .
+        doorbell: Rung after every put, for waiting on many queues with a `QueueSelector` .
+        tap: Whether to keep a copy of the last item put in `tap`, requires a doorbell.
+        """
+        assert doorbell is not None or not tap, "Tap requires a doorbell"
+
+        if backend == QueueBackend.SHARED_MEMORY:
+            self.queue = shared_memory_queue.SharedMemoryQueue(maxsize)
+        elif backend == QueueBackend.LATEST_VALUE:
+            self.queue = latest_value_mailbox.LatestValueMailbox()
+        else:
+            assert mp_manager is not None, "Manager backend requires a multiprocess manager"
+            # Batched put and get are a single round trip only with a BatchQueueManager
+            if isinstance(mp_manager, batch_queue.BatchQueueManager):
+                self.queue = mp_manager.BatchQueue(maxsize)
+            else:
+                self.queue = mp_manager.Queue(maxsize)
+
+        self.__stats = None
+        if instrument:
+            self.__stats = queue_stats.QueueStats()
+            self.queue = instrumented_queue.InstrumentedQueue(self.queue, self.__stats)
+
+        # Outermost, so that statistics only see items that are actually in the queue
+        self.__overflow_queue = None
+        # Latest value backend never fills up, so it never overflows
+        if (
+            overflow_policy != overflow_queue.OverflowPolicy.BLOCK
+            and backend != QueueBackend.LATEST_VALUE
+        ):
+            if (
+                overflow_policy == overflow_queue.OverflowPolicy.SPILL_TO_DISK
+                and spill_path is None
+            ):
+                file_descriptor, spill_path = tempfile.mkstemp(prefix="queue_spill_")
+                os.close(file_descriptor)
+
+            self.__overflow_queue = overflow_queue.OverflowQueue(
+                self.queue, overflow_policy, spill_path
+            )
+            self.queue = self.__overflow_queue
+
+        # Outermost, so that consumers are only woken once the item can be taken
+        # and overflow puts that never block also ring
+        self.tap = latest_value_mailbox.LatestValueMailbox() if tap else None
+        if doorbell is not None:
+            self.queue = notifying_queue.NotifyingQueue(self.queue, doorbell, self.tap)
 
-    def __init__(self, mp_manager: multiprocessing.managers.SyncManager, maxsize: int = 0) -> None:
-        self.queue = mp_manager.Queue(maxsize)
         self.maxsize = maxsize
+        self.backend = backend
+        self.overflow_policy = overflow_policy
 
-    def fill_queue_with_sentinel(self, timeout: float = 0.0) -> None:
+    def stats(self) -> "queue_stats.QueueStatsSnapshot | None":
+        """
+        Returns the statistics recorded so far by all processes using the queue,
+        or None if the queue is not instrumented. Does not disturb the workers.
         """
-        Fills the queue with sentinel (None).
+        if self.__stats is None:
+            return None
+
+        return self.__stats.snapshot()
 
-        timeout: Time waiting before giving up, must be greater than 0 .
+    def dropped_count(self) -> int:
         """
-        if timeout <= 0.0:
-            timeout = self.__QUEUE_TIMEOUT
+        Returns the number of items discarded by the overflow policy so far, by all processes.
+        """
+        if self.__overflow_queue is None:
+            return 0
+
+        return self.__overflow_queue.dropped_count()
+
+    def put_many(self, items: "list[object]", timeout: float | None = None) -> None:
+        """
+        Puts the items at the end of the queue in batches of at most `maxsize`.
+
+        timeout: Time waiting in seconds per batch before raising queue.Full, None waits forever.
+        """
+        items = list(items)
+        if not hasattr(self.queue, "put_many"):
+            # Plain manager queue proxy, one round trip per item
+            for item in items:
+                self.queue.put(item, timeout=timeout)
 
-        try:
-            for _ in range(self.maxsize):
-                self.queue.put(None, timeout=timeout)
-        except queue.Full:
             return
 
-    def drain_queue(self, timeout: float = 0.0) -> None:
+        batch_size = self.maxsize if self.maxsize > 0 else len(items)
+        for start in range(0, len(items), max(batch_size, 1)):
+            self.queue.put_many(items[start : start + batch_size], True, timeout)
+
+    def get_many(self, max_items: int, timeout: float | None = None) -> "list[object]":
+        """
+        Removes and returns up to max_items items, waiting only for the first one.
+
+        timeout: Time waiting in seconds before raising queue.Empty, None waits forever.
+        """
+        if not hasattr(self.queue, "get_many"):
+            # Plain manager queue proxy, one round trip per item
+            items = [self.queue.get(timeout=timeout)]
+            try:
+                while len(items) < max_items:
+                    items.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            return items
+
+        return self.queue.get_many(max_items, True, timeout)
+
+    def fill_queue_with_sentinel(self, count: int = 0) -> int:
         """
-        Drains the queue.
+        Puts sentinels (None) until the queue is full, never blocks.
+
+        count: Maximum number of sentinels, 0 fills up to `maxsize`, or puts 1 if infinite.
 
-        timeout: Time waiting in seconds before giving up, must be greater than 0 .
+        Returns the number of sentinels put.
         """
-        if timeout <= 0.0:
-            timeout = self.__QUEUE_TIMEOUT
+        if count <= 0:
+            count = max(self.maxsize, 1)
 
+        put_count = 0
         try:
-            for _ in range(self.maxsize):
-                self.queue.get(timeout=timeout)
+            while put_count < count:
+                self.queue.put_nowait(None)
+                put_count += 1
+        except queue.Full:
+            pass
+
+        return put_count
+
+    def drain_queue(self) -> int:
+        """
+        Removes items until the queue is empty, never blocks.
+
+        Returns the number of items removed.
+        """
+        drained_count = 0
+        try:
+            while True:
+                self.queue.get_nowait()
+                drained_count += 1
         except queue.Empty:
-            return
+            pass
+
+        return drained_count
 
     def fill_and_drain_queue(self) -> None:
         """
-        Fill with sentinel and then drain.
+        Drain to unblock producers and then fill with sentinel to unblock consumers.
+        See `worker_shutdown` for waiting until the workers have exited.
         """
-        self.fill_queue_with_sentinel()
-        time.sleep(self.__QUEUE_DELAY)
         self.drain_queue()
+        self.fill_queue_with_sentinel()
+
+    def close(self) -> None:
+        """
+        Releases resources held by the queue, call from main after all workers are joined.
+        """
+        if self.__overflow_queue is not None or self.backend in (
+            QueueBackend.SHARED_MEMORY,
+            QueueBackend.LATEST_VALUE,
+        ):
+            self.queue.close()
+            self.queue.unlink()
+
+        if self.tap is not None:
+            self.tap.close()
+            self.tap.unlink()
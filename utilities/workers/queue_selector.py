@@ -0,0 +1,139 @@
+"""
+For waiting on many queues at once in one thread.
+"""
+
+import queue
+import time
+
+from . import notifying_queue
+from . import queue_proxy_wrapper
+
+
+class QueueRegistration:
+    """
+    Queue or tap in the selector and what to do with its items.
+    """
+
+    __slots__ = ("queue_wrapper", "handler", "max_items", "is_tap", "sequence")
+
+    def __init__(
+        self,
+        queue_wrapper: queue_proxy_wrapper.QueueProxyWrapper,
+        handler: "(object) -> object",  # type: ignore
+        max_items: int,
+        is_tap: bool,
+    ) -> None:
+        self.queue_wrapper = queue_wrapper
+        self.handler = handler
+        self.max_items = max_items
+        self.is_tap = is_tap
+        # Last tap item handled
+        self.sequence = 0
+
+
+class QueueSelector:
+    """
+    Waits on a doorbell rung by every queue it selects from, instead of waiting on one
+    queue at a time, then calls the handlers of the queues that have items.
+
+    Queues are taken from in registration order, at most a batch each per pass, so a busy
+    queue does not starve the others. A tap only reads the last item put into its queue,
+    leaving the items for the queue's consumer.
+
+    Not thread safe, register and select from one thread.
+    """
+
+    def __init__(self, doorbell: notifying_queue.Doorbell) -> None:
+        """
+        doorbell: Doorbell of every queue registered.
+        """
+        self.__doorbell = doorbell
+        self.__registrations: "list[QueueRegistration]" = []
+
+    def register(
+        self,
+        queue_wrapper: queue_proxy_wrapper.QueueProxyWrapper,
+        handler: "(object) -> object",  # type: ignore
+        max_items: int = 1,
+    ) -> None:
+        """
+        Takes items from the queue and calls the handler with each of them.
+
+        queue_wrapper: Queue created with the selector's doorbell.
+        max_items: Most items taken from the queue per pass.
+        """
+        assert max_items > 0, "Must take at least one item per pass"
+
+        self.__registrations.append(QueueRegistration(queue_wrapper, handler, max_items, False))
+
+    def register_tap(
+        self,
+        queue_wrapper: queue_proxy_wrapper.QueueProxyWrapper,
+        handler: "(object) -> object",  # type: ignore
+    ) -> None:
+        """
+        Calls the handler with the last item put into the queue, without taking it.
+        Items put between two passes are only seen as the last of them.
+
+        queue_wrapper: Queue created with the selector's doorbell and a tap.
+        """
+        assert queue_wrapper.tap is not None, "Queue has no tap"
+
+        self.__registrations.append(QueueRegistration(queue_wrapper, handler, 1, True))
+
+    def __take(self, registration: QueueRegistration) -> "list[object]":
+        """
+        Returns the items of the registration that are ready, never blocks.
+        """
+        if registration.is_tap:
+            sequence, item = registration.queue_wrapper.tap.peek()
+            if sequence == registration.sequence:
+                return []
+
+            registration.sequence = sequence
+            return [item]
+
+        items = []
+        try:
+            while len(items) < registration.max_items:
+                items.append(registration.queue_wrapper.queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        return items
+
+    def poll(self) -> int:
+        """
+        Calls the handlers of every item that is ready, never blocks.
+
+        Returns the number of items handled.
+        """
+        handled_count = 0
+        for registration in self.__registrations:
+            for item in self.__take(registration):
+                registration.handler(item)
+                handled_count += 1
+
+        return handled_count
+
+    def select(self, timeout: float | None = None) -> int:
+        """
+        Waits until any queue has items and handles them.
+
+        timeout: Time waiting in seconds, None waits forever.
+
+        Returns the number of items handled, 0 on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            generation = self.__doorbell.generation()
+            handled_count = self.poll()
+            if handled_count > 0:
+                return handled_count
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0.0:
+                return 0
+
+            # Rings of puts already handled, or put into queues not registered, poll again
+            self.__doorbell.wait(generation, remaining)
@@ -0,0 +1,232 @@
+"""
+Queue statistics shared between processes.
+"""
+
+import multiprocessing as mp
+import time
+
+
+class HistogramSnapshot:
+    """
+    Copy of a streaming histogram with power of 2 microsecond buckets.
+
+    Bucket 0 counts values under 1 us, bucket i counts values in [2^(i-1), 2^i) us.
+    The last bucket also counts everything larger.
+    """
+
+    def __init__(self, buckets: "list[int]") -> None:
+        self.buckets = buckets
+        self.count = sum(buckets)
+
+    @staticmethod
+    def bucket_upper_bound(index: int) -> float:
+        """
+        Returns the upper bound of the bucket in seconds.
+        """
+        return (1 << index) / 1e6
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Returns the upper bound in seconds of the bucket containing the percentile.
+
+        fraction: Percentile between 0 and 1 .
+        """
+        if self.count == 0:
+            return 0.0
+
+        target = fraction * self.count
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            cumulative += bucket
+            if cumulative >= target:
+                return self.bucket_upper_bound(index)
+
+        return self.bucket_upper_bound(len(self.buckets) - 1)
+
+    def __str__(self) -> str:
+        return (
+            f"count: {self.count}, "
+            f"p50 <= {self.percentile(0.5) * 1e3:.3f} ms, "
+            f"p99 <= {self.percentile(0.99) * 1e3:.3f} ms"
+        )
+
+
+class QueueStatsSnapshot:  # pylint: disable=too-many-instance-attributes
+    """
+    Copy of the statistics of a queue at one point in time.
+    """
+
+    def __init__(
+        self,
+        put_count: int,
+        get_count: int,
+        depth: int,
+        max_depth: int,
+        mean_depth: float,
+        producer_block_count: int,
+        producer_block_time: float,  # s
+        consumer_wait_count: int,
+        consumer_wait_time: float,  # s
+        producer_block_histogram: HistogramSnapshot,
+        consumer_wait_histogram: HistogramSnapshot,
+        dwell_histogram: HistogramSnapshot,
+        elapsed: float,  # s
+    ) -> None:
+        self.put_count = put_count
+        self.get_count = get_count
+        self.depth = depth
+        self.max_depth = max_depth
+        self.mean_depth = mean_depth
+        self.producer_block_count = producer_block_count
+        self.producer_block_time = producer_block_time
+        self.consumer_wait_count = consumer_wait_count
+        self.consumer_wait_time = consumer_wait_time
+        self.producer_block_histogram = producer_block_histogram
+        self.consumer_wait_histogram = consumer_wait_histogram
+        self.dwell_histogram = dwell_histogram
+        # Time since the statistics started, for averages between two snapshots
+        self.elapsed = elapsed
+
+    def __str__(self) -> str:
+        return f"""{{
+            put_count: {self.put_count},
+            get_count: {self.get_count},
+            depth: {self.depth} (max {self.max_depth}, mean {self.mean_depth:.2f}),
+            producer blocked: {self.producer_block_count} times, {self.producer_block_time:.3f} s,
+            consumer waited: {self.consumer_wait_count} times, {self.consumer_wait_time:.3f} s,
+            producer block: {self.producer_block_histogram},
+            consumer wait: {self.consumer_wait_histogram},
+            dwell: {self.dwell_histogram}
+        }}"""
+
+
+class QueueStats:
+    """
+    Counters and histograms of a queue in shared memory.
+    Any process holding the queue records into them and any process can take a snapshot.
+    """
+
+    HISTOGRAM_BUCKET_COUNT = 32
+
+    # Counter indices
+    __PUT_COUNT = 0
+    __GET_COUNT = 1
+    __MAX_DEPTH = 2
+    __DEPTH_INTEGRAL = 3  # Items * ns
+    __LAST_CHANGE = 4  # ns
+    __START = 5  # ns
+    __PRODUCER_BLOCK_COUNT = 6
+    __PRODUCER_BLOCK_TIME = 7  # ns
+    __CONSUMER_WAIT_COUNT = 8
+    __CONSUMER_WAIT_TIME = 9  # ns
+    __COUNTER_COUNT = 10
+
+    # Histogram offsets
+    __PRODUCER_BLOCK_HISTOGRAM = __COUNTER_COUNT
+    __CONSUMER_WAIT_HISTOGRAM = __PRODUCER_BLOCK_HISTOGRAM + HISTOGRAM_BUCKET_COUNT
+    __DWELL_HISTOGRAM = __CONSUMER_WAIT_HISTOGRAM + HISTOGRAM_BUCKET_COUNT
+    __SIZE = __DWELL_HISTOGRAM + HISTOGRAM_BUCKET_COUNT
+
+    def __init__(self) -> None:
+        self.__values = mp.RawArray("q", self.__SIZE)
+        self.__lock = mp.Lock()
+
+        now = time.monotonic_ns()
+        self.__values[self.__START] = now
+        self.__values[self.__LAST_CHANGE] = now
+
+    @classmethod
+    def __bucket(cls, duration_ns: int) -> int:
+        """
+        Returns the histogram bucket of the duration.
+        """
+        return min((max(duration_ns, 0) // 1000).bit_length(), cls.HISTOGRAM_BUCKET_COUNT - 1)
+
+    def __change_depth(self, now: int, change: int) -> None:
+        """
+        Accumulates depth over time up to now, then applies the change. Lock must be held.
+        """
+        values = self.__values
+        depth = values[self.__PUT_COUNT] - values[self.__GET_COUNT]
+        values[self.__DEPTH_INTEGRAL] += depth * (now - values[self.__LAST_CHANGE])
+        values[self.__LAST_CHANGE] = now
+        if change > 0:
+            values[self.__PUT_COUNT] += change
+            values[self.__MAX_DEPTH] = max(values[self.__MAX_DEPTH], depth + change)
+        else:
+            values[self.__GET_COUNT] -= change
+
+    def record_put(self, count: int = 1) -> None:
+        """
+        Records items entering the queue.
+        """
+        now = time.monotonic_ns()
+        with self.__lock:
+            self.__change_depth(now, count)
+
+    def record_get(self, enqueue_times_ns: "list[int]", discarded: int = 0) -> None:
+        """
+        Records items leaving the queue with the time they were put.
+
+        discarded: Items that left the queue without being returned, such as overwritten ones.
+        """
+        now = time.monotonic_ns()
+        with self.__lock:
+            self.__change_depth(now, -len(enqueue_times_ns) - discarded)
+            for enqueue_time_ns in enqueue_times_ns:
+                self.__values[self.__DWELL_HISTOGRAM + self.__bucket(now - enqueue_time_ns)] += 1
+
+    def record_producer_block(self, duration_ns: int) -> None:
+        """
+        Records a producer waiting on a full queue.
+        """
+        with self.__lock:
+            self.__values[self.__PRODUCER_BLOCK_COUNT] += 1
+            self.__values[self.__PRODUCER_BLOCK_TIME] += duration_ns
+            self.__values[self.__PRODUCER_BLOCK_HISTOGRAM + self.__bucket(duration_ns)] += 1
+
+    def record_consumer_wait(self, duration_ns: int) -> None:
+        """
+        Records a consumer waiting on an empty queue.
+        """
+        with self.__lock:
+            self.__values[self.__CONSUMER_WAIT_COUNT] += 1
+            self.__values[self.__CONSUMER_WAIT_TIME] += duration_ns
+            self.__values[self.__CONSUMER_WAIT_HISTOGRAM + self.__bucket(duration_ns)] += 1
+
+    def snapshot(self) -> QueueStatsSnapshot:
+        """
+        Returns a consistent copy of the statistics, does not block recording for long.
+        """
+        now = time.monotonic_ns()
+        with self.__lock:
+            self.__change_depth(now, 0)
+            values = self.__values[:]
+
+        elapsed = max(now - values[self.__START], 1)
+        bucket_count = self.HISTOGRAM_BUCKET_COUNT
+        return QueueStatsSnapshot(
+            values[self.__PUT_COUNT],
+            values[self.__GET_COUNT],
+            values[self.__PUT_COUNT] - values[self.__GET_COUNT],
+            values[self.__MAX_DEPTH],
+            values[self.__DEPTH_INTEGRAL] / elapsed,
+            values[self.__PRODUCER_BLOCK_COUNT],
+            values[self.__PRODUCER_BLOCK_TIME] / 1e9,
+            values[self.__CONSUMER_WAIT_COUNT],
+            values[self.__CONSUMER_WAIT_TIME] / 1e9,
+            HistogramSnapshot(
+                values[
+                    self.__PRODUCER_BLOCK_HISTOGRAM : self.__PRODUCER_BLOCK_HISTOGRAM + bucket_count
+                ]
+            ),
+            HistogramSnapshot(
+                values[
+                    self.__CONSUMER_WAIT_HISTOGRAM : self.__CONSUMER_WAIT_HISTOGRAM + bucket_count
+                ]
+            ),
+            HistogramSnapshot(
+                values[self.__DWELL_HISTOGRAM : self.__DWELL_HISTOGRAM + bucket_count]
+            ),
+            elapsed / 1e9,
+        )
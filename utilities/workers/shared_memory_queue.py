@@ -0,0 +1,249 @@
+"""
+Bounded queue in shared memory.
+"""
+
+import multiprocessing as mp
+import pickle
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+
+
+# Capacity used when the requested `maxsize <= 0`, since shared memory cannot grow
+DEFAULT_CAPACITY = 1024
+# Largest pickled item in bytes
+DEFAULT_SLOT_SIZE = 4096
+
+
+class SharedMemoryQueue:  # pylint: disable=too-many-instance-attributes
+    """
+    FIFO ring buffer in shared memory with the `put()`/`get()` interface of `queue.Queue`.
+
+    Items are pickled into fixed size slots, so put and get do not go through a
+    manager server process. Producers and consumers each hold a separate lock,
+    so a producer never waits on a consumer unless the queue is full or empty.
+    """
+
+    # Head (next slot to read) and tail (next slot to write), both monotonically increasing
+    # Each is only written while holding its own lock
+    __INDEX = struct.Struct("<Q")
+    __HEAD_OFFSET = 0
+    __TAIL_OFFSET = __INDEX.size
+    __HEADER_SIZE = 2 * __INDEX.size
+    __LENGTH = struct.Struct("<I")
+
+    def __init__(self, maxsize: int = 0, slot_size: int = DEFAULT_SLOT_SIZE) -> None:
+        """
+        maxsize: Number of slots, `maxsize <= 0` uses DEFAULT_CAPACITY.
+        slot_size: Largest pickled item in bytes.
+        """
+        self.__capacity = maxsize if maxsize > 0 else DEFAULT_CAPACITY
+        self.__slot_size = slot_size
+        self.__stride = self.__LENGTH.size + slot_size
+
+        self.__shared_memory = shared_memory.SharedMemory(
+            create=True,
+            size=self.__HEADER_SIZE + self.__capacity * self.__stride,
+        )
+        self.__INDEX.pack_into(self.__shared_memory.buf, self.__HEAD_OFFSET, 0)
+        self.__INDEX.pack_into(self.__shared_memory.buf, self.__TAIL_OFFSET, 0)
+
+        # Counting semaphores provide blocking and timeouts, locks guard the indices
+        self.__free_slots = mp.Semaphore(self.__capacity)
+        self.__used_slots = mp.Semaphore(0)
+        self.__put_lock = mp.Lock()
+        self.__batch_lock = mp.Lock()
+        self.__get_lock = mp.Lock()
+
+    def __slot_offset(self, index: int) -> int:
+        """
+        Returns the byte offset of the slot for a monotonically increasing index.
+        """
+        return self.__HEADER_SIZE + (index % self.__capacity) * self.__stride
+
+    def __write_slot(self, index: int, payload: bytes) -> None:
+        """
+        Writes the length prefixed payload into the slot.
+        """
+        offset = self.__slot_offset(index)
+        buffer = self.__shared_memory.buf
+        self.__LENGTH.pack_into(buffer, offset, len(payload))
+        start = offset + self.__LENGTH.size
+        buffer[start : start + len(payload)] = payload
+
+    def __read_slot(self, index: int) -> bytes:
+        """
+        Returns the payload stored in the slot.
+        """
+        offset = self.__slot_offset(index)
+        buffer = self.__shared_memory.buf
+        (length,) = self.__LENGTH.unpack_from(buffer, offset)
+        start = offset + self.__LENGTH.size
+        return bytes(buffer[start : start + length])
+
+    def __serialize(self, item: object) -> bytes:
+        """
+        Pickles the item and checks that it fits into a slot.
+        """
+        payload = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.__slot_size:
+            raise ValueError(
+                f"Item of {len(payload)} bytes does not fit in slot of {self.__slot_size} bytes"
+            )
+
+        return payload
+
+    def put(self, item: object, block: bool = True, timeout: float | None = None) -> None:
+        """
+        Puts the item at the end of the queue.
+
+        block: Whether to wait for a free slot.
+        timeout: Time waiting in seconds before raising queue.Full, None waits forever.
+        """
+        payload = self.__serialize(item)
+
+        if not self.__free_slots.acquire(block, timeout):
+            raise queue.Full
+
+        with self.__put_lock:
+            (tail,) = self.__INDEX.unpack_from(self.__shared_memory.buf, self.__TAIL_OFFSET)
+            self.__write_slot(tail, payload)
+            self.__INDEX.pack_into(self.__shared_memory.buf, self.__TAIL_OFFSET, tail + 1)
+
+        self.__used_slots.release()
+
+    def get(self, block: bool = True, timeout: float | None = None) -> object:
+        """
+        Removes and returns the item at the front of the queue.
+
+        block: Whether to wait for an item.
+        timeout: Time waiting in seconds before raising queue.Empty, None waits forever.
+        """
+        if not self.__used_slots.acquire(block, timeout):
+            raise queue.Empty
+
+        with self.__get_lock:
+            (head,) = self.__INDEX.unpack_from(self.__shared_memory.buf, self.__HEAD_OFFSET)
+            payload = self.__read_slot(head)
+            self.__INDEX.pack_into(self.__shared_memory.buf, self.__HEAD_OFFSET, head + 1)
+
+        self.__free_slots.release()
+
+        return pickle.loads(payload)
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: float | None = None
+    ) -> None:
+        """
+        Puts all of the items at the end of the queue, or none of them.
+
+        block: Whether to wait for enough free slots.
+        timeout: Time waiting in seconds before raising queue.Full, None waits forever.
+        """
+        payloads = [self.__serialize(item) for item in items]
+        if len(payloads) > self.__capacity:
+            raise ValueError(f"Batch of {len(payloads)} items exceeds capacity {self.__capacity}")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Slots are taken before the put lock, in the same order as put, so a put holding a
+        # slot is never waiting on a batch that is waiting on that slot
+        # Batches take their slots one batch at a time, so two partial batches cannot wait
+        # on each other
+        if not self.__batch_lock.acquire(block, timeout):
+            raise queue.Full
+
+        try:
+            for acquired in range(len(payloads)):
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+                if not self.__free_slots.acquire(block, remaining):
+                    for _ in range(acquired):
+                        self.__free_slots.release()
+
+                    raise queue.Full
+        finally:
+            self.__batch_lock.release()
+
+        with self.__put_lock:
+            # Holding the put lock keeps the batch contiguous
+            (tail,) = self.__INDEX.unpack_from(self.__shared_memory.buf, self.__TAIL_OFFSET)
+            for i, payload in enumerate(payloads):
+                self.__write_slot(tail + i, payload)
+
+            self.__INDEX.pack_into(
+                self.__shared_memory.buf, self.__TAIL_OFFSET, tail + len(payloads)
+            )
+
+        for _ in payloads:
+            self.__used_slots.release()
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: float | None = None
+    ) -> "list[object]":
+        """
+        Removes and returns up to max_items items from the front of the queue.
+        Only waits for the first item.
+
+        block: Whether to wait for an item.
+        timeout: Time waiting in seconds before raising queue.Empty, None waits forever.
+        """
+        if not self.__used_slots.acquire(block, timeout):
+            raise queue.Empty
+
+        count = 1
+        while count < max_items and self.__used_slots.acquire(False):
+            count += 1
+
+        with self.__get_lock:
+            (head,) = self.__INDEX.unpack_from(self.__shared_memory.buf, self.__HEAD_OFFSET)
+            payloads = [self.__read_slot(head + i) for i in range(count)]
+            self.__INDEX.pack_into(self.__shared_memory.buf, self.__HEAD_OFFSET, head + count)
+
+        for _ in range(count):
+            self.__free_slots.release()
+
+        return [pickle.loads(payload) for payload in payloads]
+
+    def put_nowait(self, item: object) -> None:
+        """
+        Equivalent to put(item, False).
+        """
+        self.put(item, False)
+
+    def get_nowait(self) -> object:
+        """
+        Equivalent to get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Returns the approximate number of items in the queue.
+        """
+        (head,) = self.__INDEX.unpack_from(self.__shared_memory.buf, self.__HEAD_OFFSET)
+        (tail,) = self.__INDEX.unpack_from(self.__shared_memory.buf, self.__TAIL_OFFSET)
+        return max(tail - head, 0)
+
+    def empty(self) -> bool:
+        """
+        Returns whether the queue is approximately empty.
+        """
+        return self.qsize() <= 0
+
+    def full(self) -> bool:
+        """
+        Returns whether the queue is approximately full.
+        """
+        return self.qsize() >= self.__capacity
+
+    def close(self) -> None:
+        """
+        Closes access to the shared memory from this process.
+        """
+        self.__shared_memory.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory, call once from the creating process after all users are done.
+        """
+        self.__shared_memory.unlink()
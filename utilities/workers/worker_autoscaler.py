@@ -0,0 +1,178 @@
+"""
+For scaling the number of workers of a stage at runtime.
+"""
+
+import time
+
+from modules.common.modules.logger import logger
+from . import overflow_queue
+from . import queue_proxy_wrapper
+from . import queue_stats
+from . import worker_manager
+
+
+class WorkerAutoscaler:  # pylint: disable=too-many-instance-attributes
+    """
+    Adds a worker when the input queue backs up and the workers are busy,
+    removes one when the workers are mostly waiting on an empty input queue.
+
+    Decisions use the queue statistics since the previous run, so the input queue
+    must be instrumented. Removal puts a sentinel behind the queued items, so
+    the input queue must keep every item (BLOCK overflow policy, not the latest value backend).
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        manager: worker_manager.WorkerManager,
+        input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        min_count: int,
+        max_count: int,
+        local_logger: logger.Logger,
+        scale_up_depth: float = 0.0,
+        scale_down_idle: float = 0.5,
+        cooldown: float = 1.0,
+        clock: "() -> float" = time.monotonic,  # type: ignore
+    ) -> "tuple[bool, WorkerAutoscaler | None]":
+        """
+        Creates an autoscaler, call run() periodically.
+
+        manager: Manager of the workers of the stage.
+        input_queue: Queue the workers take items from.
+        min_count: Fewest workers.
+        max_count: Most workers.
+        local_logger: Existing logger from process.
+        scale_up_depth: Mean queue depth at which to add a worker,
+            0 uses half of `maxsize` (1 if infinite).
+        scale_down_idle: Fraction of time the workers wait on the queue at which to remove a worker.
+        cooldown: Time in seconds after a change before the next one, lets the change take effect.
+        clock: Current time in seconds.
+
+        Returns whether the autoscaler was able to be created and the autoscaler.
+        """
+        if min_count <= 0 or max_count < min_count:
+            local_logger.error("Worker count bounds must be positive and ordered", True)
+            return False, None
+
+        if input_queue.stats() is None:
+            local_logger.error("Autoscaling requires an instrumented input queue", True)
+            return False, None
+
+        if (
+            input_queue.backend == queue_proxy_wrapper.QueueBackend.LATEST_VALUE
+            or input_queue.overflow_policy != overflow_queue.OverflowPolicy.BLOCK
+        ):
+            local_logger.error("Autoscaling requires an input queue that keeps every item", True)
+            return False, None
+
+        if scale_up_depth <= 0.0:
+            scale_up_depth = max(input_queue.maxsize / 2, 1)
+
+        return True, WorkerAutoscaler(
+            cls.__create_key,
+            manager,
+            input_queue,
+            min_count,
+            max_count,
+            local_logger,
+            scale_up_depth,
+            scale_down_idle,
+            cooldown,
+            clock,
+        )
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        manager: worker_manager.WorkerManager,
+        input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        min_count: int,
+        max_count: int,
+        local_logger: logger.Logger,
+        scale_up_depth: float,
+        scale_down_idle: float,
+        cooldown: float,
+        clock: "() -> float",  # type: ignore
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is WorkerAutoscaler.__create_key, "Use create() method"
+
+        self.__manager = manager
+        self.__input_queue = input_queue
+        self.__min_count = min_count
+        self.__max_count = max_count
+        self.__local_logger = local_logger
+        self.__scale_up_depth = scale_up_depth
+        self.__scale_down_idle = scale_down_idle
+        self.__cooldown = cooldown
+        self.__clock = clock
+
+        self.__previous_stats: queue_stats.QueueStatsSnapshot = input_queue.stats()
+        self.__last_change_time = clock()
+
+    def __window(self, worker_count: int) -> "tuple[float, float]":
+        """
+        Returns the mean queue depth and the fraction of time the workers waited on the queue,
+        since the previous call.
+        """
+        stats = self.__input_queue.stats()
+        previous = self.__previous_stats
+        self.__previous_stats = stats
+
+        duration = stats.elapsed - previous.elapsed
+        if duration <= 0.0:
+            return 0.0, 0.0
+
+        mean_depth = (
+            stats.mean_depth * stats.elapsed - previous.mean_depth * previous.elapsed
+        ) / duration
+        # Waits are recorded when they end, so a long wait can land in a single window
+        idle = min(
+            (stats.consumer_wait_time - previous.consumer_wait_time)
+            / (duration * max(worker_count, 1)),
+            1.0,
+        )
+
+        return mean_depth, idle
+
+    def run(self) -> int:
+        """
+        Adds or removes at most one worker.
+
+        Returns the change in worker count: 1, -1, or 0 .
+        """
+        self.__manager.remove_exited_workers()
+        worker_count = self.__manager.get_alive_worker_count()
+        mean_depth, idle = self.__window(worker_count)
+
+        now = self.__clock()
+        if now - self.__last_change_time < self.__cooldown:
+            return 0
+
+        name = self.__manager.get_target_name()
+        description = f"{worker_count} workers, mean depth {mean_depth:.2f}, idle {idle:.0%}"
+        if worker_count < self.__min_count or (
+            mean_depth >= self.__scale_up_depth
+            and idle < self.__scale_down_idle
+            and worker_count < self.__max_count
+        ):
+            if not self.__manager.add_worker():
+                return 0
+
+            self.__last_change_time = now
+            self.__local_logger.info(f"Scaled up {name}: {description}", True)
+            return 1
+
+        if idle >= self.__scale_down_idle and mean_depth < 1.0 and worker_count > self.__min_count:
+            if not self.__manager.remove_worker(self.__cooldown):
+                return 0
+
+            self.__last_change_time = now
+            self.__local_logger.info(f"Scaled down {name}: {description}", True)
+            return -1
+
+        return 0
@@ -3,65 +3,94 @@ For controlling workers.
 """
 
 import multiprocessing as mp
-import time
 
 
 class WorkerController:
     """
     For interprocess communication from main to worker.
-    Contains exit and pause requests.
+    Contains exit and pause requests, and exit acknowledgements from worker to main.
+
+    Requests are bits of a flag word in shared memory, so checking them is a memory read.
+    Events are only used by workers that block until a request changes.
     """
 
-    __QUEUE_DELAY = 0.1  # seconds
+    # Flag bits
+    __EXIT = 1
+    __PAUSE = 2
 
     def __init__(self) -> None:
         """
-        Constructor creates internal queue and semaphore.
+        Constructor creates internal flag word, events, and semaphore.
+        """
+        self.__flags = mp.RawValue("i", 0)
+        # Writers only, readers do not take the lock
+        self.__flags_lock = mp.Lock()
+        self.__exit = mp.Event()
+        self.__resume = mp.Event()
+        self.__resume.set()
+        self.__exit_acknowledgements = mp.Semaphore(0)
+
+    def __set_flag(self, flag: int, is_set: bool) -> None:
+        """
+        Sets or clears the flag bit, call with the flags lock held.
         """
-        self.__pause = mp.BoundedSemaphore(1)
-        self.__is_paused = False
-        self.__exit_queue = mp.Queue(1)
+        if is_set:
+            self.__flags.value |= flag
+        else:
+            self.__flags.value &= ~flag
 
     def request_pause(self) -> None:
         """
         Requests worker processes to pause.
+        Does nothing if already requested.
         """
-        if not self.__is_paused:
-            self.__pause.acquire()
-            self.__is_paused = True
+        # Flag and event change together, so racing requests never leave them disagreeing
+        with self.__flags_lock:
+            self.__set_flag(self.__PAUSE, True)
+            self.__resume.clear()
 
     def request_resume(self) -> None:
         """
         Requests worker processes to resume.
+        Does nothing if already resumed.
+        """
+        with self.__flags_lock:
+            self.__set_flag(self.__PAUSE, False)
+            self.__resume.set()
+
+    def is_pause_requested(self) -> bool:
+        """
+        Returns whether main has requested the worker process to pause.
         """
-        if self.__is_paused:
-            self.__pause.release()
-            self.__is_paused = False
+        return bool(self.__flags.value & self.__PAUSE)
 
     def check_pause(self) -> None:
         """
         Blocks worker if main has requested it to pause, otherwise continues.
         """
-        self.__pause.acquire()
-        self.__pause.release()
+        while self.__flags.value & self.__PAUSE:
+            self.__resume.wait()
 
     def request_exit(self) -> None:
         """
         Requests worker processes to exit.
         Does nothing if already requested.
         """
-        time.sleep(self.__QUEUE_DELAY)
-        if self.__exit_queue.empty():
-            self.__exit_queue.put(None)
+        with self.__flags_lock:
+            self.__set_flag(self.__EXIT, True)
+            self.__exit.set()
 
     def clear_exit(self) -> None:
         """
-        Clears the exit request condition.
+        Clears the exit request condition and any acknowledgements.
         Does nothing if already cleared.
         """
-        time.sleep(self.__QUEUE_DELAY)
-        if not self.__exit_queue.empty():
-            _ = self.__exit_queue.get()
+        with self.__flags_lock:
+            self.__set_flag(self.__EXIT, False)
+            self.__exit.clear()
+
+        while self.__exit_acknowledgements.acquire(False):
+            pass
 
     def is_exit_requested(self) -> bool:
         """
@@ -69,4 +98,32 @@ class WorkerController:
         There is a race condition, but it's fine because the worker process
         will do at most 1 additional loop.
         """
-        return not self.__exit_queue.empty()
+        return bool(self.__flags.value & self.__EXIT)
+
+    def wait_for_exit_request(self, timeout: float | None = None) -> bool:
+        """
+        Blocks worker until main has requested it to exit, use instead of sleeping.
+
+        timeout: Time waiting in seconds, None waits forever.
+
+        Returns whether main has requested the worker process to exit.
+        """
+        return self.__exit.wait(timeout)
+
+    def acknowledge_exit(self) -> None:
+        """
+        Tells main that a worker process has left its loop and will not use its queues again.
+        Does nothing if exit has not been requested.
+        """
+        if self.is_exit_requested():
+            self.__exit_acknowledgements.release()
+
+    def wait_for_exit_acknowledgement(self, timeout: float | None = None) -> bool:
+        """
+        Blocks main until a worker process acknowledges the exit request.
+
+        timeout: Time waiting in seconds, None waits forever.
+
+        Returns whether a worker process acknowledged.
+        """
+        return self.__exit_acknowledgements.acquire(True, timeout)
@@ -3,12 +3,33 @@ For managing workers.
 """
 
 import multiprocessing as mp
+import queue
+import time
 
 from modules.common.modules.logger import logger
 from utilities.workers import worker_controller
 from utilities.workers import queue_proxy_wrapper
 
 
+def run_worker(
+    target: "(...) -> object",  # type: ignore
+    args: "tuple",
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Process entry point, runs the worker function and then acknowledges exit.
+    The acknowledgement is sent even if the worker function raises.
+
+    target: Function.
+    args: Target function arguments.
+    controller: Worker controller.
+    """
+    try:
+        target(*args)
+    finally:
+        controller.acknowledge_exit()
+
+
 class WorkerProperties:
     """
     Worker Properties.
@@ -104,6 +125,12 @@ class WorkerProperties:
         """
         return self.__target
 
+    def get_controller(self) -> worker_controller.WorkerController:
+        """
+        Returns the worker controller.
+        """
+        return self.__controller
+
     def get_input_queues(self) -> "list[queue_proxy_wrapper.QueueProxyWrapper]":
         """
         Returns the input queues.
@@ -125,6 +152,9 @@ class WorkerManager:
 
     __create_key = object()
 
+    # Time allowed for a terminated worker to exit before it is killed
+    __TERMINATE_TIMEOUT = 0.5  # seconds
+
     @classmethod
     def create(
         cls,
@@ -144,6 +174,7 @@ class WorkerManager:
             result, worker = WorkerManager.__create_single_worker(
                 worker_properties.get_worker_target(),
                 worker_properties.get_worker_arguments(),
+                worker_properties.get_controller(),
                 local_logger,
             )
             if not result:
@@ -176,18 +207,19 @@ class WorkerManager:
         self.__local_logger = local_logger
 
     @staticmethod
-    def __create_single_worker(target: "(...) -> object", args: "tuple", local_logger: logger.Logger) -> "tuple[bool, mp.Process | None]":  # type: ignore
+    def __create_single_worker(target: "(...) -> object", args: "tuple", controller: worker_controller.WorkerController, local_logger: logger.Logger) -> "tuple[bool, mp.Process | None]":  # type: ignore
         """
         Creates a single worker.
 
         target: Function.
         args: Target function arguments.
+        controller: Worker controller, acknowledges exit when the function returns.
         local_logger: Existing logger from process.
 
         Returns whether a worker was created and the worker.
         """
         try:
-            worker = mp.Process(target=target, args=args)
+            worker = mp.Process(target=run_worker, args=(target, args, controller))
         # Catching all exceptions for library call
         # pylint: disable-next=broad-exception-caught
         except Exception as e:
@@ -203,12 +235,172 @@ class WorkerManager:
         for worker in self.__workers:
             worker.start()
 
-    def join_workers(self) -> None:
+    def join_workers(self, timeout: float | None = None) -> bool:
         """
-        Join workers.
+        Join workers. Workers still running after the timeout are terminated,
+        and workers still running after termination are killed.
+
+        timeout: Time waiting in seconds for all workers to exit, None waits forever.
+
+        Returns whether all workers exited by themselves.
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
         for worker in self.__workers:
+            if deadline is None:
+                worker.join()
+            else:
+                worker.join(max(deadline - time.monotonic(), 0.0))
+
+        stuck_workers = [worker for worker in self.__workers if worker.is_alive()]
+        for worker in stuck_workers:
+            self.__local_logger.warning(
+                f"Worker did not exit, terminating {self.__worker_properties.get_target_name()} "
+                f"{worker.name}",
+                True,
+            )
+            worker.terminate()
+
+        for worker in stuck_workers:
+            worker.join(self.__TERMINATE_TIMEOUT)
+            if worker.is_alive():
+                self.__local_logger.error(
+                    f"Worker did not terminate, killing "
+                    f"{self.__worker_properties.get_target_name()} {worker.name}",
+                    True,
+                )
+                worker.kill()
+                worker.join()
+
+        return len(stuck_workers) == 0
+
+    def get_alive_worker_count(self) -> int:
+        """
+        Returns the number of workers that are running.
+        """
+        return sum(1 for worker in self.__workers if worker.is_alive())
+
+    def get_input_queues(self) -> "list[queue_proxy_wrapper.QueueProxyWrapper]":
+        """
+        Returns the input queues of the workers.
+        """
+        return self.__worker_properties.get_input_queues()
+
+    def get_workers(self) -> "list[mp.Process]":
+        """
+        Returns the worker processes.
+        """
+        return list(self.__workers)
+
+    def get_target_name(self) -> str:
+        """
+        Returns the name of the target of the workers.
+        """
+        return self.__worker_properties.get_target_name()
+
+    def restart_worker(self, worker: mp.Process) -> bool:
+        """
+        Replaces a dead worker with a new, started worker.
+
+        worker: Dead worker, must be one of this manager's workers.
+
+        Returns whether the worker was able to be restarted.
+        """
+        target_and_worker_name = f"{self.__worker_properties.get_target_name()} {worker.name}"
+        if worker not in self.__workers:
+            self.__local_logger.error(f"Not managed, cannot restart {target_and_worker_name}", True)
+            return False
+
+        # Reap the dead worker
+        worker.join()
+
+        result, new_worker = WorkerManager.__create_single_worker(
+            self.__worker_properties.get_worker_target(),
+            self.__worker_properties.get_worker_arguments(),
+            self.__worker_properties.get_controller(),
+            self.__local_logger,
+        )
+        if not result:
+            self.__local_logger.error(f"Failed to restart {target_and_worker_name}", True)
+            return False
+
+        # Get Pylance to stop complaining
+        assert new_worker is not None
+
+        new_worker.start()
+        self.__workers[self.__workers.index(worker)] = new_worker
+
+        return True
+
+    def add_worker(self) -> bool:
+        """
+        Creates and starts one more worker.
+
+        Returns whether the worker was able to be created.
+        """
+        result, worker = WorkerManager.__create_single_worker(
+            self.__worker_properties.get_worker_target(),
+            self.__worker_properties.get_worker_arguments(),
+            self.__worker_properties.get_controller(),
+            self.__local_logger,
+        )
+        if not result:
+            self.__local_logger.error(
+                f"Failed to add {self.__worker_properties.get_target_name()} worker", True
+            )
+            return False
+
+        # Get Pylance to stop complaining
+        assert worker is not None
+
+        worker.start()
+        self.__workers.append(worker)
+
+        return True
+
+    def remove_worker(self, timeout: float | None = None) -> bool:
+        """
+        Asks one worker to exit by putting a sentinel (None) at the end of each input queue.
+        The worker that takes the sentinel exits, so every item before it is still processed
+        and no item is lost. Only works if the input queues do not drop or overwrite items.
+
+        timeout: Time waiting in seconds for space in each input queue, None waits forever.
+
+        Returns whether the sentinels were put.
+        """
+        input_queues = self.__worker_properties.get_input_queues()
+        if len(input_queues) == 0:
+            self.__local_logger.error(
+                f"No input queue, cannot remove {self.__worker_properties.get_target_name()} worker",
+                True,
+            )
+            return False
+
+        try:
+            for input_queue in input_queues:
+                input_queue.queue.put(None, timeout=timeout)
+        except queue.Full:
+            self.__local_logger.error(
+                f"Input queue full, cannot remove {self.__worker_properties.get_target_name()} "
+                "worker",
+                True,
+            )
+            return False
+
+        return True
+
+    def remove_exited_workers(self) -> int:
+        """
+        Forgets workers that exited by themselves, such as removed workers.
+        Crashed workers are kept so that they can be restarted.
+
+        Returns the number of workers forgotten.
+        """
+        exited_workers = [worker for worker in self.__workers if worker.exitcode == 0]
+        for worker in exited_workers:
             worker.join()
+            self.__workers.remove(worker)
+
+        return len(exited_workers)
 
     def check_and_restart_dead_workers(self) -> bool:
         """
@@ -216,32 +408,18 @@ class WorkerManager:
 
         Returns whether the dead workers were able to be restarted.
         """
-        new_workers = []
-        for worker in self.__workers:
+        for worker in list(self.__workers):
             if worker.is_alive():
-                new_workers.append(worker)
                 continue
 
             # Log dead worker
-            target_and_worker_name = f"{self.__worker_properties.get_target_name()} {worker.name}"
             self.__local_logger.warning(
-                f"Worker died, restarting {target_and_worker_name}",
+                f"Worker died, restarting {self.__worker_properties.get_target_name()} "
+                f"{worker.name}",
                 True,
             )
 
-            # Create a new worker
-            result, new_worker = WorkerManager.__create_single_worker(
-                self.__worker_properties.get_worker_target(),
-                self.__worker_properties.get_worker_arguments(),
-                self.__local_logger,
-            )
-            if not result:
-                self.__local_logger.error(f"Failed to restart {target_and_worker_name}", True)
+            if not self.restart_worker(worker):
                 return False
 
-            # Append the new worker
-            new_workers.append(new_worker)
-
-        self.__workers = new_workers
-
         return True
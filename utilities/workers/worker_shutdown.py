@@ -0,0 +1,92 @@
+"""
+For stopping workers without fixed delays.
+"""
+
+import time
+
+from modules.common.modules.logger import logger
+from . import queue_proxy_wrapper
+from . import worker_controller
+from . import worker_manager
+
+
+# Longest wait between unblocking rounds, an acknowledgement ends the wait early
+POLL_PERIOD = 0.01  # seconds
+
+
+def unblock_workers(
+    worker_managers: "list[worker_manager.WorkerManager]",
+    queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+) -> None:
+    """
+    Drains every queue so that producers blocked on a full queue can put,
+    then gives every consumer blocked on an empty queue a sentinel.
+    """
+    for queue_wrapper in queues:
+        queue_wrapper.drain_queue()
+
+    for manager in worker_managers:
+        consumer_count = manager.get_alive_worker_count()
+        if consumer_count == 0:
+            continue
+
+        for queue_wrapper in manager.get_input_queues():
+            queue_wrapper.fill_queue_with_sentinel(consumer_count)
+
+
+def shutdown_workers(
+    controller: worker_controller.WorkerController,
+    worker_managers: "list[worker_manager.WorkerManager]",
+    queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+    local_logger: logger.Logger,
+    timeout: float = 2.0,
+) -> bool:
+    """
+    Requests exit and unblocks the workers until they all acknowledge,
+    then joins them, terminating any still running after the timeout.
+    Queues are empty afterwards. Order of the managers and queues does not matter.
+
+    controller: Worker controller shared by the workers.
+    worker_managers: Managers of all workers using the controller.
+    queues: All queues between the workers and main.
+    local_logger: Existing logger from process.
+    timeout: Time waiting in seconds before terminating workers.
+
+    Returns whether all workers exited by themselves.
+    """
+    deadline = time.monotonic() + timeout
+    controller.request_exit()
+
+    expected_count = sum(manager.get_alive_worker_count() for manager in worker_managers)
+    acknowledged_count = 0
+    while acknowledged_count < expected_count:
+        # Workers that died without acknowledging never will
+        if all(manager.get_alive_worker_count() == 0 for manager in worker_managers):
+            break
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0.0:
+            local_logger.warning(
+                f"Only {acknowledged_count} of {expected_count} workers acknowledged exit", True
+            )
+            break
+
+        unblock_workers(worker_managers, queues)
+
+        # Collect every acknowledgement that arrived before unblocking again
+        timeout_acknowledgement = min(remaining, POLL_PERIOD)
+        while controller.wait_for_exit_acknowledgement(timeout_acknowledgement):
+            acknowledged_count += 1
+            timeout_acknowledgement = 0.0
+
+    is_clean = True
+    for manager in worker_managers:
+        remaining = max(deadline - time.monotonic(), 0.0)
+        if not manager.join_workers(remaining):
+            is_clean = False
+
+    # Nothing puts anymore, so emptying once is enough
+    for queue_wrapper in queues:
+        queue_wrapper.drain_queue()
+
+    return is_clean
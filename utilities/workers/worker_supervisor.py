@@ -0,0 +1,281 @@
+"""
+For restarting crashed workers.
+"""
+
+import collections
+import multiprocessing.connection
+import threading
+import time
+
+from modules.common.modules.logger import logger
+from . import worker_controller
+from . import worker_manager
+
+
+class WorkerTypeStats:
+    """
+    Copy of the restart statistics of the workers of one manager.
+    """
+
+    def __init__(
+        self,
+        crash_count: int,
+        restart_count: int,
+        restart_failure_count: int,
+        downtime: float,  # s
+        is_crash_looping: bool,
+    ) -> None:
+        self.crash_count = crash_count
+        self.restart_count = restart_count
+        self.restart_failure_count = restart_failure_count
+        self.downtime = downtime
+        self.is_crash_looping = is_crash_looping
+
+    def __str__(self) -> str:
+        return (
+            f"crashes: {self.crash_count}, "
+            f"restarts: {self.restart_count}, "
+            f"failed restarts: {self.restart_failure_count}, "
+            f"downtime: {self.downtime:.3f} s"
+            f"{', gave up (crash loop)' if self.is_crash_looping else ''}"
+        )
+
+
+class WorkerSupervisor:  # pylint: disable=too-many-instance-attributes
+    """
+    Thread in the main process that restarts workers which exit with a non-zero exit code.
+
+    Waits on the process sentinels, so a crash is noticed immediately without polling.
+    Restarts of the same worker type back off exponentially, and a worker type is given up on
+    once it crashes more than the crash loop limit within the crash loop window.
+    Workers exiting with exit code 0 or after exit has been requested are not restarted.
+    A restart that fails is tried again after the next backoff, without counting as a crash.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        worker_managers: "list[worker_manager.WorkerManager]",
+        controller: worker_controller.WorkerController,
+        local_logger: logger.Logger,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 10.0,
+        crash_loop_limit: int = 5,
+        crash_loop_window: float = 60.0,
+        clock: "() -> float" = time.monotonic,  # type: ignore
+    ) -> "tuple[bool, WorkerSupervisor | None]":
+        """
+        Creates a supervisor, call start() after the workers are started.
+
+        worker_managers: Managers of the workers to supervise.
+        controller: Worker controller shared by the workers.
+        local_logger: Existing logger from process.
+        initial_backoff: Delay in seconds before restarting after the first crash.
+        max_backoff: Largest delay in seconds before restarting.
+        crash_loop_limit: Most crashes of a worker type within the window before giving up.
+        crash_loop_window: Time in seconds over which crashes are counted.
+        clock: Current time in seconds.
+
+        Returns whether the supervisor was able to be created and the supervisor.
+        """
+        if initial_backoff <= 0.0 or max_backoff < initial_backoff:
+            local_logger.error("Backoff must be positive and at most the maximum backoff", True)
+            return False, None
+
+        if crash_loop_limit <= 0 or crash_loop_window <= 0.0:
+            local_logger.error("Crash loop limit and window must be positive", True)
+            return False, None
+
+        return True, WorkerSupervisor(
+            cls.__create_key,
+            worker_managers,
+            controller,
+            local_logger,
+            initial_backoff,
+            max_backoff,
+            crash_loop_limit,
+            crash_loop_window,
+            clock,
+        )
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        worker_managers: "list[worker_manager.WorkerManager]",
+        controller: worker_controller.WorkerController,
+        local_logger: logger.Logger,
+        initial_backoff: float,
+        max_backoff: float,
+        crash_loop_limit: int,
+        crash_loop_window: float,
+        clock: "() -> float",  # type: ignore
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is WorkerSupervisor.__create_key, "Use create() method"
+
+        self.__worker_managers = worker_managers
+        self.__controller = controller
+        self.__local_logger = local_logger
+        self.__initial_backoff = initial_backoff
+        self.__max_backoff = max_backoff
+        self.__crash_loop_limit = crash_loop_limit
+        self.__crash_loop_window = crash_loop_window
+        self.__clock = clock
+
+        # Per manager, guarded by the lock
+        self.__lock = threading.Lock()
+        self.__crash_times = [collections.deque() for _ in worker_managers]
+        self.__crash_counts = [0] * len(worker_managers)
+        self.__restart_counts = [0] * len(worker_managers)
+        self.__restart_failure_counts = [0] * len(worker_managers)
+        self.__downtimes = [0.0] * len(worker_managers)
+        self.__is_crash_looping = [False] * len(worker_managers)
+
+        # Writing to the pipe wakes the thread up to stop or to watch new workers
+        self.__wake_reader, self.__wake_writer = multiprocessing.connection.Pipe(False)
+        self.__is_stop_requested = False
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def __backoff(self, index: int, now: float) -> "float | None":
+        """
+        Records a crash of the worker type and returns the delay before restarting,
+        or None if it is crash looping.
+        """
+        crash_times = self.__crash_times[index]
+        crash_times.append(now)
+        while crash_times[0] < now - self.__crash_loop_window:
+            crash_times.popleft()
+
+        with self.__lock:
+            self.__crash_counts[index] += 1
+            if len(crash_times) > self.__crash_loop_limit:
+                self.__is_crash_looping[index] = True
+                return None
+
+        return min(self.__initial_backoff * 2 ** (len(crash_times) - 1), self.__max_backoff)
+
+    def __run(self) -> None:
+        """
+        Waits for workers to exit and restarts them when their backoff is over.
+        """
+        # Restart time, manager index, dead worker, crash time, backoff before this restart
+        pending_restarts: "list[tuple[float, int, multiprocessing.Process, float, float]]" = []
+        # Exited workers that are pending restart or will never be restarted
+        exited_workers = set()
+        while not self.__is_stop_requested:
+            watched = {}
+            for index, manager in enumerate(self.__worker_managers):
+                for worker in manager.get_workers():
+                    if worker.pid is not None and worker not in exited_workers:
+                        watched[worker.sentinel] = (index, worker)
+
+            timeout = None
+            if len(pending_restarts) > 0:
+                timeout = max(min(restart[0] for restart in pending_restarts) - self.__clock(), 0)
+
+            ready = multiprocessing.connection.wait(
+                list(watched.keys()) + [self.__wake_reader], timeout
+            )
+            if self.__is_stop_requested or self.__controller.is_exit_requested():
+                break
+
+            if self.__wake_reader in ready:
+                self.__wake_reader.recv()
+
+            now = self.__clock()
+            for sentinel in ready:
+                if sentinel not in watched:
+                    continue
+
+                index, worker = watched[sentinel]
+                worker.join()
+                exited_workers.add(worker)
+                name = f"{self.__worker_managers[index].get_target_name()} {worker.name}"
+                if worker.exitcode == 0:
+                    self.__local_logger.info(f"Worker exited, not restarting {name}", True)
+                    continue
+
+                backoff = self.__backoff(index, now)
+                if backoff is None:
+                    self.__local_logger.error(
+                        f"Worker crash looping with exit code {worker.exitcode}, "
+                        f"not restarting {name}",
+                        True,
+                    )
+                    continue
+
+                self.__local_logger.warning(
+                    f"Worker crashed with exit code {worker.exitcode}, "
+                    f"restarting {name} in {backoff:.3f} s",
+                    True,
+                )
+                pending_restarts.append((now + backoff, index, worker, now, backoff))
+
+            still_pending = []
+            for restart in pending_restarts:
+                restart_time, index, worker, crash_time, backoff = restart
+                if restart_time > now:
+                    still_pending.append(restart)
+                    continue
+
+                if not self.__worker_managers[index].restart_worker(worker):
+                    # Still dead and still managed, so it stays skipped until restarted
+                    with self.__lock:
+                        self.__restart_failure_counts[index] += 1
+
+                    backoff = min(backoff * 2, self.__max_backoff)
+                    name = f"{self.__worker_managers[index].get_target_name()} {worker.name}"
+                    self.__local_logger.warning(
+                        f"Worker restart failed, retrying {name} in {backoff:.3f} s", True
+                    )
+                    still_pending.append((now + backoff, index, worker, crash_time, backoff))
+                    continue
+
+                # Replacement is a new process, so the dead one no longer needs to be skipped
+                exited_workers.discard(worker)
+                with self.__lock:
+                    self.__restart_counts[index] += 1
+                    self.__downtimes[index] += self.__clock() - crash_time
+
+            pending_restarts = still_pending
+
+    def start(self) -> None:
+        """
+        Starts supervising in a background thread.
+        """
+        self.__thread.start()
+
+    def refresh(self) -> None:
+        """
+        Starts watching workers added since start(), call after adding workers to a manager.
+        """
+        self.__wake_writer.send(None)
+
+    def stop(self) -> None:
+        """
+        Stops supervising, call before shutting down the workers.
+        Pending restarts are abandoned.
+        """
+        self.__is_stop_requested = True
+        self.__wake_writer.send(None)
+        self.__thread.join()
+
+    def get_stats(self) -> "dict[str, WorkerTypeStats]":
+        """
+        Returns the restart statistics of each worker type, by target name.
+        """
+        with self.__lock:
+            return {
+                manager.get_target_name(): WorkerTypeStats(
+                    self.__crash_counts[index],
+                    self.__restart_counts[index],
+                    self.__restart_failure_counts[index],
+                    self.__downtimes[index],
+                    self.__is_crash_looping[index],
+                )
+                for index, manager in enumerate(self.__worker_managers)
+            }